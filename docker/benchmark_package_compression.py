@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Benchmark the package compression settings, using docker.
+#
+# For each compression setting, make_package.* is run for the
+# selected OS version and package, and the following are recorded:
+#
+#   pack secs:    elapsed time to make the package
+#   size:         size of the .deb or .rpm file
+#   extract secs: time to unpack the package in the build image,
+#                 which is the decompression cost of an install
+#
+# The lrose build for the OS version must already have been done,
+# so that the build image exists.
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import subprocess
+from optparse import OptionParser
+import time
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global thisScriptDir
+    thisScriptDir = os.path.dirname(os.path.abspath(__file__))
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options]"
+    settingsDefault = 'xz:6:0,xz:9:0,zstd:3:0,zstd:19:0,gzip:6:0'
+    workDirDefault = '/tmp/compression_benchmark'
+    parser = OptionParser(usage)
+    parser.add_option('--debug',
+                      dest='debug', default=True,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--verbose',
+                      dest='verbose', default=False,
+                      action="store_true",
+                      help='Set verbose debugging on')
+    parser.add_option('--family',
+                      dest='family', default='debian',
+                      help='Scripts family: redhat, debian, suse or oracle')
+    parser.add_option('--osType',
+                      dest='osType', default='ubuntu',
+                      help='OS type, e.g. centos, ubuntu')
+    parser.add_option('--osVersion',
+                      dest='osVersion', default='20.04',
+                      help='OS version, e.g. 8, 20.04')
+    parser.add_option('--package',
+                      dest='package', default='lrose-core',
+                      help='Package to benchmark, default: lrose-core')
+    parser.add_option('--settings',
+                      dest='settings', default=settingsDefault,
+                      help='Comma-delimited list of type:level:threads ' + \
+                      'settings, default: ' + settingsDefault)
+    parser.add_option('--workDir',
+                      dest='workDir', default=workDirDefault,
+                      help='Dir for the packages and report, default: ' + \
+                      workDirDefault)
+
+    (options, args) = parser.parse_args()
+
+    if (options.verbose):
+        options.debug = True
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  family: ", options.family, file=sys.stderr)
+        print("  osType: ", options.osType, file=sys.stderr)
+        print("  osVersion: ", options.osVersion, file=sys.stderr)
+        print("  package: ", options.package, file=sys.stderr)
+        print("  settings: ", options.settings, file=sys.stderr)
+        print("  workDir: ", options.workDir, file=sys.stderr)
+
+    if (os.path.isdir(options.workDir) == False):
+        os.makedirs(options.workDir)
+
+    # run each setting in turn, so that they do not compete for CPUs
+
+    results = []
+    for setting in options.settings.split(','):
+        setting = setting.strip()
+        if (len(setting) > 0):
+            results.append(runSetting(setting))
+
+    writeReport(results)
+
+    sys.exit(0)
+
+########################################################################
+# make the package with a compression setting, and time it
+# returns a dict with the results
+
+def runSetting(setting):
+
+    result = {}
+    result["setting"] = setting
+    result["ok"] = False
+
+    releaseDir = os.path.join(options.workDir, setting.replace(":", "_"))
+    if (os.path.isdir(releaseDir) == False):
+        os.makedirs(releaseDir)
+    for fileName in os.listdir(releaseDir):
+        os.remove(os.path.join(releaseDir, fileName))
+
+    scriptPath = os.path.join(thisScriptDir, options.family,
+                              "make_package." + options.family)
+    cmd = [scriptPath,
+           "-t", options.osType,
+           "-v", options.osVersion,
+           "-p", options.package,
+           "-z", setting,
+           "-R", releaseDir]
+
+    logPath = os.path.join(options.workDir,
+                           "package." + setting.replace(":", "_") + ".log")
+
+    print("==>> packaging with compression: " + setting, file=sys.stderr)
+    startTime = time.time()
+    ok = runCmd(cmd, logPath)
+    result["packSecs"] = time.time() - startTime
+
+    pkgPaths = []
+    for fileName in os.listdir(releaseDir):
+        if (fileName.endswith(".deb") or fileName.endswith(".rpm")):
+            pkgPaths.append(os.path.join(releaseDir, fileName))
+
+    if (ok == False or len(pkgPaths) != 1):
+        print("ERROR - packaging failed, see: " + logPath, file=sys.stderr)
+        return result
+
+    pkgPath = pkgPaths[0]
+    result["size"] = os.path.getsize(pkgPath)
+
+    # time the extraction in the build image
+
+    extractSecs = timeExtract(pkgPath)
+    if (extractSecs < 0):
+        print("ERROR - extract failed: " + pkgPath, file=sys.stderr)
+        return result
+
+    result["extractSecs"] = extractSecs
+    result["ok"] = True
+
+    return result
+
+########################################################################
+# time the extraction of the package contents in the build image
+# the time is measured inside the container, so that the container
+# startup is not included
+# returns -1 on failure
+
+def timeExtract(pkgPath):
+
+    pkgName = os.path.basename(pkgPath)
+    if (pkgName.endswith(".deb")):
+        extractCmd = "dpkg-deb -x /pkgDir/" + pkgName + " /tmp/extract"
+    else:
+        extractCmd = "cd /tmp/extract && rpm2cpio /pkgDir/" + pkgName + \
+                     " | cpio -idm --quiet"
+
+    script = "mkdir -p /tmp/extract && " + \
+             "start=$(date +%s.%N) && " + \
+             "(" + extractCmd + ") && " + \
+             "end=$(date +%s.%N) && " + \
+             "echo EXTRACT_SECS $start $end"
+
+    image = "build." + options.package + "/" + \
+            options.osType + ":" + options.osVersion
+    cmd = ["docker", "run", "--rm",
+           "-v", os.path.dirname(pkgPath) + ":/pkgDir",
+           image, "bash", "-c", script]
+
+    if (options.verbose):
+        print("running cmd: " + " ".join(cmd), file=sys.stderr)
+
+    try:
+        pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        output = pipe.communicate()[0].decode('utf-8', 'replace')
+    except OSError as e:
+        print("Execution failed:", e, file=sys.stderr)
+        return -1
+
+    for line in output.splitlines():
+        toks = line.split()
+        if (len(toks) == 3 and toks[0] == "EXTRACT_SECS"):
+            return float(toks[2]) - float(toks[1])
+
+    return -1
+
+########################################################################
+# run a command, with output to the log file
+# returns True on success, False on failure
+
+def runCmd(cmd, logPath):
+
+    if (options.verbose):
+        print("running cmd: " + " ".join(cmd), file=sys.stderr)
+
+    try:
+        logFp = open(logPath, "w")
+        retcode = subprocess.call(cmd, stdout=logFp, stderr=subprocess.STDOUT)
+        logFp.close()
+    except (IOError, OSError) as e:
+        print("Execution failed:", e, file=sys.stderr)
+        return False
+
+    return (retcode == 0)
+
+########################################################################
+# write the report, to stdout and to the report file
+
+def writeReport(results):
+
+    lines = []
+    lines.append("=" * 64)
+    lines.append("LROSE package compression benchmark")
+    lines.append("  package: " + options.package)
+    lines.append("  target: " + options.osType + ":" + options.osVersion)
+    lines.append("=" * 64)
+    lines.append("%-16s  %12s  %12s  %14s" %
+                 ("setting", "pack secs", "size MB", "extract secs"))
+    lines.append("-" * 64)
+
+    for result in results:
+        if (result["ok"]):
+            lines.append("%-16s  %12.1f  %12.1f  %14.1f" %
+                         (result["setting"], result["packSecs"],
+                          result["size"] / 1.0e6, result["extractSecs"]))
+        else:
+            lines.append("%-16s  %12s" % (result["setting"], "FAILED"))
+
+    lines.append("=" * 64)
+
+    report = "\n".join(lines) + "\n"
+    print(report)
+
+    reportPath = os.path.join(options.workDir, "compression_report.txt")
+    try:
+        fp = open(reportPath, "w")
+        fp.write(report)
+        fp.close()
+        print("Report written to: " + reportPath, file=sys.stderr)
+    except IOError as e:
+        print("ERROR - cannot write report file: " + reportPath,
+              file=sys.stderr)
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,790 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Run the release matrix for the LROSE packages, using docker.
+#
+# The distro x package matrix is read from release_matrix.txt.
+#
+# For each target in the matrix the following steps are run in order:
+#
+#   1. build:   do_lrose_build.*        - build in the custom image
+#   2. package: make_package.*          - create the .rpm or .deb file
+#   3. test:    install_pkg_and_test.*  - install in a clean container and test
+#
+# Several targets are run at once, up to the --maxJobs limit, so that
+# the build, package and test steps for different targets overlap
+# instead of running as three serial sweeps.
+#
+# Each job can be restricted to its own set of CPUs, and to a memory
+# limit, so that the jobs do not compete for the same resources.
+# In the build step, the memory limit is applied by the build governor.
+#
+# With --subsetBuild, the subset packages such as lrose-radx are not
+# built on their own. They are packaged from the lrose-core build for
+# the same OS version, once that build is done.
+#
+# With --portable, each package is built once, on the oldest distro,
+# and the portable tree is packaged and tested for all of the targets.
+#
+# With --cpuTargets, each target is run once for each x86-64 level,
+# giving a package variant for each level.
+#
+# A consolidated pass/fail/timing report is written at the end.
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import subprocess
+import threading
+from optparse import OptionParser
+import time
+from datetime import datetime
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# steps in the order they are run, with the script for each step
+
+stepNames = ["build", "package", "test"]
+stepScripts = {
+    "build": "do_lrose_build",
+    "package": "make_package",
+    "test": "install_pkg_and_test"
+}
+
+# packages that can be made from the build of a superset package
+
+supersetPackages = {
+    "lrose-radx": "lrose-core",
+    "apar": "lrose-core"
+}
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global thisScriptDir
+    thisScriptDir = os.path.dirname(os.path.abspath(__file__))
+
+    global options
+    global printLock
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options]"
+    matrixFileDefault = os.path.join(thisScriptDir, 'release_matrix.txt')
+    logDirDefault = '/tmp/release_matrix/logs'
+    parser = OptionParser(usage)
+    parser.add_option('--debug',
+                      dest='debug', default=True,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--verbose',
+                      dest='verbose', default=False,
+                      action="store_true",
+                      help='Set verbose debugging on')
+    parser.add_option('--matrixFile',
+                      dest='matrixFile', default=matrixFileDefault,
+                      help='File with the distro x package matrix, default: ' + \
+                      matrixFileDefault)
+    parser.add_option('--package',
+                      dest='package', default='',
+                      help='Comma-delimited list of packages to run, ' + \
+                      'e.g. lrose-core,lrose-radx. ' + \
+                      'Default is all packages in the matrix file.')
+    parser.add_option('--target',
+                      dest='target', default='',
+                      help='Comma-delimited list of os_type:os_version ' + \
+                      'targets to run, e.g. centos:7,debian:10. ' + \
+                      'Default is all targets in the matrix file.')
+    parser.add_option('--releaseDate',
+                      dest='releaseDate', default='latest',
+                      help='Release date, e.g. latest, 20190105')
+    parser.add_option('--steps',
+                      dest='steps', default='build,package,test',
+                      help='Comma-delimited list of steps to run, ' + \
+                      'default: build,package,test')
+    parser.add_option('--maxJobs',
+                      dest='maxJobs', default=4, type='int',
+                      help='Max number of targets running at once, default: 4')
+    parser.add_option('--cpusPerJob',
+                      dest='cpusPerJob', default=0, type='int',
+                      help='Number of CPUs allocated to each job. ' + \
+                      'Each running job gets its own cpuset, and builds ' + \
+                      'with this number of make jobs. ' + \
+                      'Default is 0 - no cpuset, 8 make jobs.')
+    parser.add_option('--memPerJob',
+                      dest='memPerJob', default='',
+                      help='Memory limit for each job, e.g. 16g. ' + \
+                      'A container limit for the package and test steps, ' + \
+                      'and the build governor budget for the build step. ' + \
+                      'Default is no limit.')
+    parser.add_option('--compression',
+                      dest='compression', default='',
+                      help='Package compression, type:level:threads, ' + \
+                      'e.g. xz:6:0, zstd:19:0. ' + \
+                      'Default is the make_package default.')
+    parser.add_option('--split',
+                      dest='split', default=False,
+                      action="store_true",
+                      help='Split the packages into subpackages, ' + \
+                      'plus a metapackage')
+    parser.add_option('--subsetBuild',
+                      dest='subsetBuild', default=False,
+                      action="store_true",
+                      help='Make the subset packages, e.g. lrose-radx, ' + \
+                      'from the lrose-core build for the same OS version, ' + \
+                      'instead of building them separately')
+    parser.add_option('--portable',
+                      dest='portable', default=False,
+                      action="store_true",
+                      help='Build each package once, as a portable tree, ' + \
+                      'and package it for all of the targets')
+    parser.add_option('--portableBase',
+                      dest='portableBase', default='redhat:centos:7',
+                      help='family:os_type:os_version for the portable ' + \
+                      'build, default: redhat:centos:7')
+    parser.add_option('--cpuTargets',
+                      dest='cpuTargets', default='',
+                      help='Comma-delimited list of x86-64 levels to ' + \
+                      'build package variants for, ' + \
+                      'e.g. x86-64,x86-64-v3. ' + \
+                      'x86-64 is the generic package. ' + \
+                      'Default is the generic package only.')
+    parser.add_option('--governor',
+                      dest='governor', default=False,
+                      action="store_true",
+                      help='Run the builds under the memory-aware build ' + \
+                      'governor, so that a high number of make jobs ' + \
+                      'does not get the compiles OOM-killed')
+    parser.add_option('--distccHosts',
+                      dest='distccHosts', default='',
+                      help='distcc hosts to spread the compiles over, ' + \
+                      'comma-delimited, host[:port][/limit]. ' + \
+                      'The hosts are shared by all of the builds. ' + \
+                      'See run_distcc_workers.')
+    parser.add_option('--logDir',
+                      dest='logDir', default=logDirDefault,
+                      help='Dir for the step logs, default: ' + logDirDefault)
+    parser.add_option('--reportPath',
+                      dest='reportPath', default='',
+                      help='Path for the report file. ' + \
+                      'Default is release_report.txt in the log dir.')
+    parser.add_option('--dryRun',
+                      dest='dryRun', default=False,
+                      action="store_true",
+                      help='Print the commands, but do not run them')
+
+    (options, args) = parser.parse_args()
+
+    if (options.verbose):
+        options.debug = True
+
+    # check the steps
+
+    options.stepList = []
+    for step in options.steps.split(','):
+        step = step.strip()
+        if (len(step) == 0):
+            continue
+        if (step not in stepNames):
+            print("ERROR: invalid step: %s" % step, file=sys.stderr)
+            print("  options: " + ",".join(stepNames), file=sys.stderr)
+            sys.exit(1)
+        options.stepList.append(step)
+
+    if (options.maxJobs < 1):
+        options.maxJobs = 1
+
+    if (len(options.reportPath) == 0):
+        options.reportPath = os.path.join(options.logDir, "release_report.txt")
+
+    # read the matrix
+
+    targets = readMatrix(options.matrixFile)
+    if (len(targets) == 0):
+        print("ERROR: no targets to run, matrix file: " + options.matrixFile,
+              file=sys.stderr)
+        sys.exit(1)
+
+    # run each target for each cpu target
+
+    if (len(options.cpuTargets) > 0):
+        targets = expandCpuTargets(targets)
+
+    # link the targets to the builds they are packaged from
+
+    if (options.portable):
+        targets = setupPortableBuilds(targets) + targets
+    elif (options.subsetBuild):
+        setupSubsetBuilds(targets)
+
+    # debug print
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  matrixFile: ", options.matrixFile, file=sys.stderr)
+        print("  releaseDate: ", options.releaseDate, file=sys.stderr)
+        print("  steps: ", options.stepList, file=sys.stderr)
+        print("  maxJobs: ", options.maxJobs, file=sys.stderr)
+        print("  cpusPerJob: ", options.cpusPerJob, file=sys.stderr)
+        print("  memPerJob: ", options.memPerJob, file=sys.stderr)
+        print("  compression: ", options.compression, file=sys.stderr)
+        print("  split: ", options.split, file=sys.stderr)
+        print("  subsetBuild: ", options.subsetBuild, file=sys.stderr)
+        print("  portable: ", options.portable, file=sys.stderr)
+        print("  portableBase: ", options.portableBase, file=sys.stderr)
+        print("  cpuTargets: ", options.cpuTargets, file=sys.stderr)
+        print("  governor: ", options.governor, file=sys.stderr)
+        print("  distccHosts: ", options.distccHosts, file=sys.stderr)
+        print("  logDir: ", options.logDir, file=sys.stderr)
+        print("  reportPath: ", options.reportPath, file=sys.stderr)
+        print("  targets:", file=sys.stderr)
+        for target in targets:
+            if ("buildFrom" in target):
+                print("    " + target["name"] + ", from " +
+                      target["buildFrom"]["name"], file=sys.stderr)
+            else:
+                print("    " + target["name"], file=sys.stderr)
+
+    if (os.path.isdir(options.logDir) == False):
+        os.makedirs(options.logDir)
+
+    # run the jobs
+
+    printLock = threading.Lock()
+    startTime = time.time()
+    runJobs(targets)
+    endTime = time.time()
+
+    # write the report
+
+    nFailed = writeReport(targets, startTime, endTime)
+
+    if (nFailed > 0):
+        sys.exit(1)
+    sys.exit(0)
+
+########################################################################
+# read the distro x package matrix
+# returns the list of targets, filtered by the command line options
+
+def readMatrix(matrixPath):
+
+    packageList = []
+    if (len(options.package) > 0):
+        packageList = options.package.split(',')
+
+    targetList = []
+    if (len(options.target) > 0):
+        targetList = options.target.split(',')
+
+    try:
+        fp = open(matrixPath, 'r')
+    except IOError as e:
+        print("ERROR - ", thisScriptName, file=sys.stderr)
+        print("  Cannot open matrix file:", matrixPath, file=sys.stderr)
+        sys.exit(1)
+
+    lines = fp.readlines()
+    fp.close()
+
+    targets = []
+    for line in lines:
+
+        line = line.strip()
+        if (len(line) == 0 or line[0] == '#'):
+            continue
+
+        toks = line.split()
+        if (len(toks) < 4):
+            print("WARNING - bad line in matrix file: " + line, file=sys.stderr)
+            continue
+
+        family = toks[0]
+        osType = toks[1]
+        osVersion = toks[2]
+
+        if (len(targetList) > 0 and
+            (osType + ":" + osVersion) not in targetList):
+            continue
+
+        for pkg in toks[3:]:
+            if (len(packageList) > 0 and pkg not in packageList):
+                continue
+            target = {}
+            target["family"] = family
+            target["osType"] = osType
+            target["osVersion"] = osVersion
+            target["package"] = pkg
+            target["name"] = pkg + " " + osType + ":" + osVersion
+            target["cpuTarget"] = ""
+            target["results"] = {}
+            targets.append(target)
+
+    return targets
+
+########################################################################
+# expand the targets, with a copy for each cpu target
+# the generic x86-64 target keeps the plain name
+#
+# Returns the expanded list
+
+def expandCpuTargets(targets):
+
+    cpuTargets = []
+    for cpuTarget in options.cpuTargets.split(','):
+        cpuTarget = cpuTarget.strip()
+        if (cpuTarget not in ["x86-64", "x86-64-v2", "x86-64-v3"]):
+            print("ERROR: invalid cpu target: %s" % cpuTarget, file=sys.stderr)
+            print("  options: x86-64,x86-64-v2,x86-64-v3", file=sys.stderr)
+            sys.exit(1)
+        if (cpuTarget == "x86-64"):
+            cpuTarget = ""
+        cpuTargets.append(cpuTarget)
+
+    expanded = []
+    for target in targets:
+        for cpuTarget in cpuTargets:
+            variant = dict(target)
+            variant["results"] = {}
+            variant["cpuTarget"] = cpuTarget
+            if (len(cpuTarget) > 0):
+                variant["name"] = target["name"] + " " + cpuTarget
+            expanded.append(variant)
+
+    return expanded
+
+########################################################################
+# link the subset targets to the superset target for the same OS version
+#
+# The superset build also produces the subset, and signals buildDone
+# when it is finished. Subsets without a superset target in the
+# matrix are built on their own.
+
+def setupSubsetBuilds(targets):
+
+    for target in targets:
+        if (target["package"] not in supersetPackages):
+            continue
+        supersetPkg = supersetPackages[target["package"]]
+        for superset in targets:
+            if (superset["package"] == supersetPkg and
+                superset["osType"] == target["osType"] and
+                superset["osVersion"] == target["osVersion"] and
+                superset["cpuTarget"] == target["cpuTarget"]):
+                target["buildFrom"] = superset
+                superset.setdefault("subsets", []).append(target["package"])
+                superset["buildDone"] = threading.Event()
+                break
+
+########################################################################
+# create the portable build targets, one for each package
+#
+# The portable build runs only the build step, on the base distro.
+# All of the targets for the package are packaged from it. With
+# --subsetBuild, the subset packages are packaged from the portable
+# build of their superset. Each cpu target has its own portable build.
+#
+# Returns the list of portable build targets
+
+def setupPortableBuilds(targets):
+
+    (family, osType, osVersion) = options.portableBase.split(":")
+
+    matrixPackages = set()
+    for target in targets:
+        matrixPackages.add(target["package"])
+
+    builders = []
+    builderByPkg = {}
+    for target in targets:
+
+        pkg = target["package"]
+        if (options.subsetBuild and pkg in supersetPackages and
+            supersetPackages[pkg] in matrixPackages):
+            pkg = supersetPackages[pkg]
+
+        cpuTarget = target["cpuTarget"]
+        if ((pkg, cpuTarget) not in builderByPkg):
+            builder = {}
+            builder["family"] = family
+            builder["osType"] = osType
+            builder["osVersion"] = osVersion
+            builder["package"] = pkg
+            builder["cpuTarget"] = cpuTarget
+            builder["name"] = pkg + " portable"
+            if (len(cpuTarget) > 0):
+                builder["name"] = builder["name"] + " " + cpuTarget
+            builder["results"] = {}
+            builder["buildOnly"] = True
+            builder["subsets"] = []
+            builder["buildDone"] = threading.Event()
+            builderByPkg[(pkg, cpuTarget)] = builder
+            builders.append(builder)
+
+        builder = builderByPkg[(pkg, cpuTarget)]
+        target["buildFrom"] = builder
+        if (pkg != target["package"] and
+            target["package"] not in builder["subsets"]):
+            builder["subsets"].append(target["package"])
+
+    return builders
+
+########################################################################
+# run the jobs, with up to maxJobs running at once
+#
+# Each worker thread owns a job slot, which determines the cpuset
+# for its containers. A worker takes the next target from the queue
+# and runs all of the steps for it, before taking the next target.
+
+def runJobs(targets):
+
+    # the targets that are packaged from another build go last,
+    # so that those builds are started before they wait for them
+
+    targetQueue = queue.Queue()
+    for target in targets:
+        if ("buildFrom" not in target):
+            targetQueue.put(target)
+    for target in targets:
+        if ("buildFrom" in target):
+            targetQueue.put(target)
+
+    nWorkers = min(options.maxJobs, len(targets))
+
+    # check we have enough CPUs for the cpusets
+
+    if (options.cpusPerJob > 0):
+        nCpus = getCpuCount()
+        if (nWorkers * options.cpusPerJob > nCpus):
+            print("WARNING - not enough CPUs for cpusets", file=sys.stderr)
+            print("  nCpus: ", nCpus, file=sys.stderr)
+            print("  cpus needed: ", nWorkers * options.cpusPerJob,
+                  file=sys.stderr)
+            print("  cpusets will overlap", file=sys.stderr)
+
+    workers = []
+    for slot in range(0, nWorkers):
+        worker = threading.Thread(target=runWorker,
+                                  args=(slot, targetQueue))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+
+    for worker in workers:
+        worker.join()
+
+########################################################################
+# worker thread - run targets from the queue until it is empty
+
+def runWorker(slot, targetQueue):
+
+    while True:
+        try:
+            target = targetQueue.get_nowait()
+        except queue.Empty:
+            return
+        runTarget(target, slot)
+
+########################################################################
+# run the steps for a target
+# if a step fails, the remaining steps are skipped
+
+def runTarget(target, slot):
+
+    try:
+        runTargetSteps(target, slot)
+    finally:
+        # let the subsets go ahead, even if the build failed
+        if ("buildDone" in target):
+            target["buildDone"].set()
+
+########################################################################
+# run the steps for a target, in order
+
+def runTargetSteps(target, slot):
+
+    failed = False
+    for step in stepNames:
+
+        if (step not in options.stepList):
+            continue
+
+        if (step != "build" and target.get("buildOnly", False)):
+            continue
+
+        if (failed):
+            target["results"][step] = ("skipped", 0.0)
+            continue
+
+        # the target is packaged from another build, so wait for it
+
+        if (step == "build" and "buildFrom" in target):
+            buildFrom = target["buildFrom"]
+            logMessage("==>> waiting for build: " + buildFrom["name"] +
+                       ", for " + target["name"])
+            buildFrom["buildDone"].wait()
+            if (buildFrom["results"].get("build", ("FAILED", 0.0))[0] == "ok"):
+                target["results"][step] = ("reused", 0.0)
+            else:
+                target["results"][step] = ("skipped", 0.0)
+                logMessage("==>> FAILED build: " + buildFrom["name"] +
+                           ", skipping " + target["name"])
+                failed = True
+            continue
+
+        cmd = getStepCmd(target, step, slot)
+        logName = target["package"] + "." + \
+                  target["osType"] + "_" + target["osVersion"] + "."
+        if (len(target["cpuTarget"]) > 0):
+            logName = logName + target["cpuTarget"] + "."
+        logPath = os.path.join(options.logDir, logName + step + ".log")
+
+        logMessage("==>> starting " + step + ": " + target["name"] +
+                   ", slot " + str(slot))
+        if (options.verbose):
+            logMessage("  cmd: " + " ".join(cmd))
+            logMessage("  log: " + logPath)
+
+        stepStart = time.time()
+        ok = runStepCmd(cmd, logPath)
+        stepSecs = time.time() - stepStart
+
+        if (ok):
+            target["results"][step] = ("ok", stepSecs)
+            logMessage("==>> done " + step + ": " + target["name"] +
+                       ", " + formatSecs(stepSecs))
+        else:
+            target["results"][step] = ("FAILED", stepSecs)
+            logMessage("==>> FAILED " + step + ": " + target["name"] +
+                       ", see " + logPath)
+            failed = True
+
+        if (step == "build" and "buildDone" in target):
+            target["buildDone"].set()
+
+########################################################################
+# get the command line for a step
+
+def getStepCmd(target, step, slot):
+
+    family = target["family"]
+    scriptPath = os.path.join(thisScriptDir, family,
+                              stepScripts[step] + "." + family)
+
+    cmd = [scriptPath,
+           "-t", target["osType"],
+           "-v", target["osVersion"],
+           "-p", target["package"]]
+
+    if (step != "test"):
+        cmd = cmd + ["-r", options.releaseDate]
+
+    if (step == "build"):
+        njobs = 8
+        if (options.cpusPerJob > 0):
+            njobs = options.cpusPerJob
+        cmd = cmd + ["-j", str(njobs)]
+        if (len(target.get("subsets", [])) > 0):
+            cmd = cmd + ["-S", ",".join(target["subsets"])]
+        if (options.governor):
+            cmd = cmd + ["-G"]
+        if (len(options.distccHosts) > 0):
+            cmd = cmd + ["-D", options.distccHosts]
+
+    if (step != "test" and options.portable):
+        cmd = cmd + ["-P"]
+
+    if (len(target["cpuTarget"]) > 0):
+        cmd = cmd + ["-T", target["cpuTarget"]]
+
+    if (step == "package" and len(options.compression) > 0):
+        cmd = cmd + ["-z", options.compression]
+
+    if (step == "package" and options.split):
+        cmd = cmd + ["-s"]
+
+    cpuset = getCpuset(slot)
+    if (len(cpuset) > 0):
+        cmd = cmd + ["-c", cpuset]
+
+    if (len(options.memPerJob) > 0):
+        cmd = cmd + ["-m", options.memPerJob]
+
+    return cmd
+
+########################################################################
+# get the cpuset for a job slot, e.g. 4-7
+# returns empty string if cpusets are not in use
+
+def getCpuset(slot):
+
+    if (options.cpusPerJob < 1):
+        return ""
+
+    nCpus = getCpuCount()
+    nPerJob = min(options.cpusPerJob, nCpus)
+    nSets = max(1, nCpus // nPerJob)
+    firstCpu = (slot % nSets) * nPerJob
+    lastCpu = firstCpu + nPerJob - 1
+
+    return str(firstCpu) + "-" + str(lastCpu)
+
+########################################################################
+# get the number of CPUs on the host
+
+def getCpuCount():
+
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+########################################################################
+# run the command for a step, with output to the log file
+# returns True on success, False on failure
+
+def runStepCmd(cmd, logPath):
+
+    if (options.dryRun):
+        logMessage("  dry run: " + " ".join(cmd))
+        return True
+
+    try:
+        logFp = open(logPath, "w")
+    except IOError as e:
+        logMessage("ERROR - cannot open log file: " + logPath)
+        return False
+
+    logFp.write("===========================================\n")
+    logFp.write("Log file from script: " + thisScriptName + "\n")
+    logFp.write("Cmd: " + " ".join(cmd) + "\n")
+    logFp.write("===========================================\n")
+    logFp.flush()
+
+    try:
+        retcode = subprocess.call(cmd, stdout=logFp, stderr=subprocess.STDOUT,
+                                  cwd=thisScriptDir)
+    except OSError as e:
+        logFp.write("Execution failed: " + str(e) + "\n")
+        logFp.close()
+        return False
+
+    logFp.close()
+
+    if (retcode != 0):
+        return False
+
+    return True
+
+########################################################################
+# write the report, to stdout and to the report file
+# returns the number of failed targets
+
+def writeReport(targets, startTime, endTime):
+
+    lines = []
+    lines.append("=" * 92)
+    lines.append("LROSE release matrix report")
+    lines.append("  matrix file: " + options.matrixFile)
+    lines.append("  release date: " + options.releaseDate)
+    lines.append("  started: " + formatTime(startTime))
+    lines.append("  finished: " + formatTime(endTime))
+    lines.append("  elapsed: " + formatSecs(endTime - startTime))
+    lines.append("  max jobs: " + str(options.maxJobs))
+    lines.append("=" * 92)
+
+    header = "%-30s" % "target"
+    for step in stepNames:
+        header = header + "  %-17s" % step
+    header = header + "  total"
+    lines.append(header)
+    lines.append("-" * 92)
+
+    nPassed = 0
+    nFailed = 0
+    for target in targets:
+        line = "%-30s" % target["name"]
+        totalSecs = 0.0
+        targetFailed = False
+        for step in stepNames:
+            if (step in target["results"]):
+                (status, secs) = target["results"][step]
+                totalSecs = totalSecs + secs
+                if (status != "ok" and status != "reused"):
+                    targetFailed = True
+                if (status == "skipped"):
+                    line = line + "  %-17s" % status
+                else:
+                    line = line + "  %-7s %9s" % (status, formatSecs(secs))
+            else:
+                line = line + "  %-17s" % "-"
+        line = line + "  " + formatSecs(totalSecs)
+        lines.append(line)
+        if (targetFailed):
+            nFailed = nFailed + 1
+        else:
+            nPassed = nPassed + 1
+
+    lines.append("-" * 92)
+    lines.append("passed: " + str(nPassed) + "  failed: " + str(nFailed))
+    lines.append("=" * 92)
+
+    report = "\n".join(lines) + "\n"
+    print(report)
+
+    try:
+        fp = open(options.reportPath, "w")
+        fp.write(report)
+        fp.close()
+        print("Report written to: " + options.reportPath, file=sys.stderr)
+    except IOError as e:
+        print("ERROR - cannot write report file: " + options.reportPath,
+              file=sys.stderr)
+
+    return nFailed
+
+########################################################################
+# format elapsed secs as hh:mm:ss
+
+def formatSecs(secs):
+
+    isecs = int(secs + 0.5)
+    return "%02d:%02d:%02d" % (isecs // 3600, (isecs // 60) % 60, isecs % 60)
+
+########################################################################
+# format unix time as a date-time string
+
+def formatTime(utime):
+
+    return datetime.fromtimestamp(utime).strftime("%Y/%m/%d-%H:%M:%S")
+
+########################################################################
+# print a message, holding the lock so that the threads do not interleave
+
+def logMessage(message):
+
+    printLock.acquire()
+    try:
+        print(message, file=sys.stderr)
+        sys.stderr.flush()
+    finally:
+        printLock.release()
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+   main()
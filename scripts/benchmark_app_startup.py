@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Benchmark the startup cost of the installed LROSE apps.
+#
+# This script performs the following steps, for each ELF binary in
+# the bin dir:
+#
+#   1. count the shared libs that are loaded, using ldd, and the
+#      dirs in the rpath, using readelf
+#   2. run the app with -h several times, with LD_DEBUG=statistics,
+#      and read the time spent in the dynamic loader, and the number
+#      of relocations (symbol lookups) that it performed
+#   3. take the median over the runs
+#
+# The apps are run one at a time, to keep the timing repeatable.
+#
+# To measure the effect of a change to the build, such as --asNeeded
+# or --libVisibility in checkout_and_build_cmake.py, run this before
+# and after, and pass the first report as --baselinePath. The
+# savings are then reported for each app, and in total.
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import re
+import subprocess
+import threading
+import time
+from optparse import OptionParser
+
+# LD_DEBUG=statistics lines, with the key for each value
+
+statsPatterns = [
+    ("cycles", re.compile(r"total startup time in dynamic loader:\s*(\d+)")),
+    ("relocs", re.compile(r"number of relocations:\s*(\d+)")),
+    ("relative", re.compile(r"number of relative relocations:\s*(\d+)"))
+]
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options]"
+    prefixDefault = '/usr/local/lrose'
+    parser = OptionParser(usage)
+    parser.add_option('--debug',
+                      dest='debug', default=False,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--verbose',
+                      dest='verbose', default=False,
+                      action="store_true",
+                      help='Set verbose debugging on')
+    parser.add_option('--prefix',
+                      dest='prefix', default=prefixDefault,
+                      help='Install prefix, default: ' + prefixDefault)
+    parser.add_option('--binDir',
+                      dest='binDir', default='',
+                      help='Dir with the apps to benchmark. ' + \
+                      'Default: bin under the prefix')
+    parser.add_option('--apps',
+                      dest='apps', default='',
+                      help='Comma-delimited list of apps to benchmark. ' + \
+                      'Default: all of the apps in the bin dir')
+    parser.add_option('--nRuns',
+                      dest='nRuns', default=5, type='int',
+                      help='Number of runs of each app, default: 5')
+    parser.add_option('--testArgs',
+                      dest='testArgs', default='-h',
+                      help='Args for running each app, default: -h')
+    parser.add_option('--timeout',
+                      dest='timeout', default=10.0, type='float',
+                      help='Timeout for each run, in secs, default: 10')
+    parser.add_option('--baselinePath',
+                      dest='baselinePath', default='',
+                      help='Report from an earlier run, to compute ' + \
+                      'the savings against')
+    parser.add_option('--reportPath',
+                      dest='reportPath', default='',
+                      help='Path for the report file. Default: stdout only')
+
+    (options, args) = parser.parse_args()
+
+    if (options.verbose):
+        options.debug = True
+
+    if (len(options.binDir) == 0):
+        options.binDir = os.path.join(options.prefix, "bin")
+
+    if (options.nRuns < 1):
+        options.nRuns = 1
+
+    if (os.path.isdir(options.binDir) == False):
+        print("ERROR - bin dir does not exist: ", options.binDir,
+              file=sys.stderr)
+        sys.exit(1)
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  prefix: ", options.prefix, file=sys.stderr)
+        print("  binDir: ", options.binDir, file=sys.stderr)
+        print("  apps: ", options.apps, file=sys.stderr)
+        print("  nRuns: ", options.nRuns, file=sys.stderr)
+        print("  testArgs: ", options.testArgs, file=sys.stderr)
+        print("  timeout: ", options.timeout, file=sys.stderr)
+        print("  baselinePath: ", options.baselinePath, file=sys.stderr)
+        print("  reportPath: ", options.reportPath, file=sys.stderr)
+
+    # find the apps
+
+    appPaths = findApps(options.binDir)
+    if (len(appPaths) == 0):
+        print("ERROR - no apps found in: ", options.binDir, file=sys.stderr)
+        sys.exit(1)
+
+    # benchmark the apps, one at a time
+
+    results = []
+    for appPath in appPaths:
+        results.append(benchmarkApp(appPath))
+
+    # write the report
+
+    baseline = {}
+    if (len(options.baselinePath) > 0):
+        baseline = readBaseline(options.baselinePath)
+
+    writeReport(results, baseline)
+
+    sys.exit(0)
+
+########################################################################
+# find the ELF executables in the bin dir
+
+def findApps(binDir):
+
+    appNames = []
+    if (len(options.apps) > 0):
+        for appName in options.apps.split(","):
+            if (len(appName.strip()) > 0):
+                appNames.append(appName.strip())
+    else:
+        appNames = sorted(os.listdir(binDir))
+
+    appPaths = []
+    for appName in appNames:
+        appPath = os.path.join(binDir, appName)
+        if (os.path.isfile(appPath) == False or
+            os.access(appPath, os.X_OK) == False):
+            if (len(options.apps) > 0):
+                print("WARNING - app not found: ", appPath, file=sys.stderr)
+            continue
+        fp = open(appPath, "rb")
+        magic = fp.read(4)
+        fp.close()
+        if (magic == b'\x7fELF'):
+            appPaths.append(appPath)
+
+    if (options.debug):
+        print("  n apps: ", len(appPaths), file=sys.stderr)
+
+    return appPaths
+
+########################################################################
+# benchmark an app
+# returns a dict with the lib and rpath counts, and the medians of
+# the loader stats and wall clock time over the runs
+
+def benchmarkApp(appPath):
+
+    result = {}
+    result["name"] = os.path.basename(appPath)
+    result["libs"] = countLibs(appPath)
+    result["rpath"] = countRpathDirs(appPath)
+
+    runs = []
+    for iRun in range(0, options.nRuns):
+        stats = runApp(appPath)
+        if (stats == None):
+            break
+        runs.append(stats)
+
+    if (len(runs) == 0):
+        result["ok"] = False
+        print("WARNING - cannot get loader stats for: ", result["name"],
+              file=sys.stderr)
+        return result
+
+    result["ok"] = True
+    for key in ["cycles", "relocs", "relative", "wallMs"]:
+        values = sorted([stats.get(key, 0) for stats in runs])
+        result[key] = values[len(values) // 2]
+
+    if (options.verbose):
+        print("  benchmarked: " + result["name"], file=sys.stderr)
+
+    return result
+
+########################################################################
+# run an app once, with LD_DEBUG=statistics
+# returns a dict of the loader stats, or None if it did not run
+
+def runApp(appPath):
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+    env["LD_DEBUG"] = "statistics"
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    env.pop("DISPLAY", None)
+
+    cmd = [appPath] + options.testArgs.split()
+
+    startTime = time.time()
+    try:
+        devNull = open(os.devnull, "r+")
+        pipe = subprocess.Popen(cmd, env=env, stdin=devNull,
+                                stdout=devNull, stderr=subprocess.PIPE)
+    except OSError as e:
+        print("ERROR - cannot run: ", appPath, e, file=sys.stderr)
+        return None
+
+    timer = threading.Timer(options.timeout, pipe.kill)
+    timer.start()
+    try:
+        output = pipe.communicate()[1]
+    finally:
+        timer.cancel()
+        devNull.close()
+    wallSecs = time.time() - startTime
+
+    # the stats are printed for the initial load, so take the first
+    # value for each key
+
+    stats = {}
+    for line in output.decode('utf-8', 'replace').splitlines():
+        for (key, pattern) in statsPatterns:
+            match = pattern.search(line)
+            if (match and key not in stats):
+                stats[key] = int(match.group(1))
+
+    if ("cycles" not in stats):
+        return None
+
+    stats["wallMs"] = wallSecs * 1000.0
+    return stats
+
+########################################################################
+# count the shared libs that are loaded for an app
+
+def countLibs(appPath):
+
+    output = runCmdOutput(["ldd", appPath])
+    nLibs = 0
+    for line in output.splitlines():
+        if (line.find("=>") >= 0):
+            nLibs = nLibs + 1
+    return nLibs
+
+########################################################################
+# count the dirs in the rpath or runpath of an app
+
+def countRpathDirs(appPath):
+
+    output = runCmdOutput(["readelf", "-d", "-W", appPath])
+    for line in output.splitlines():
+        if (line.find("(RPATH)") >= 0 or line.find("(RUNPATH)") >= 0):
+            start = line.find("[")
+            end = line.rfind("]")
+            if (start > 0 and end > start):
+                return len(line[start + 1:end].split(":"))
+    return 0
+
+########################################################################
+# read the results from an earlier report
+# returns a dict of the results, keyed on the app name
+
+def readBaseline(baselinePath):
+
+    baseline = {}
+    try:
+        fp = open(baselinePath, "r")
+    except IOError as e:
+        print("WARNING - cannot read baseline: ", baselinePath,
+              file=sys.stderr)
+        return baseline
+
+    for line in fp.readlines():
+        toks = line.split()
+        if (len(toks) < 6 or toks[1].isdigit() == False):
+            continue
+        try:
+            result = {}
+            result["libs"] = int(toks[1])
+            result["rpath"] = int(toks[2])
+            result["cycles"] = int(toks[3])
+            result["relocs"] = int(toks[4])
+            result["wallMs"] = float(toks[5])
+            baseline[toks[0]] = result
+        except ValueError:
+            continue
+    fp.close()
+
+    return baseline
+
+########################################################################
+# write the report, to stdout and to the report file
+
+def writeReport(results, baseline):
+
+    lines = []
+    lines.append("=" * 92)
+    lines.append("LROSE app startup benchmark")
+    lines.append("  bin dir: " + options.binDir)
+    lines.append("  test args: " + options.testArgs)
+    lines.append("  n runs: " + str(options.nRuns) + ", median values")
+    if (len(baseline) > 0):
+        lines.append("  baseline: " + options.baselinePath)
+        lines.append("  savings are the % reduction from the baseline")
+    lines.append("=" * 92)
+
+    header = "%-28s %5s %5s %12s %9s %9s" % \
+             ("app", "libs", "rpath", "cycles", "relocs", "wallMs")
+    if (len(baseline) > 0):
+        header = header + "  %8s %8s %8s" % ("cycles%", "relocs%", "wall%")
+    lines.append(header)
+    lines.append("-" * 92)
+
+    totals = {"cycles": 0, "relocs": 0, "wallMs": 0.0}
+    matchTotals = {"cycles": 0, "relocs": 0, "wallMs": 0.0}
+    baseTotals = {"cycles": 0, "relocs": 0, "wallMs": 0.0}
+    nFailed = 0
+    for result in results:
+        if (result["ok"] == False):
+            lines.append("%-28s %5d %5d %12s" %
+                         (result["name"], result["libs"], result["rpath"],
+                          "no stats"))
+            nFailed = nFailed + 1
+            continue
+        line = "%-28s %5d %5d %12d %9d %9.2f" % \
+               (result["name"], result["libs"], result["rpath"],
+                result["cycles"], result["relocs"], result["wallMs"])
+        for key in totals.keys():
+            totals[key] = totals[key] + result[key]
+        if (result["name"] in baseline):
+            base = baseline[result["name"]]
+            line = line + "  %8s %8s %8s" % \
+                   (formatSaving(base["cycles"], result["cycles"]),
+                    formatSaving(base["relocs"], result["relocs"]),
+                    formatSaving(base["wallMs"], result["wallMs"]))
+            for key in totals.keys():
+                matchTotals[key] = matchTotals[key] + result[key]
+                baseTotals[key] = baseTotals[key] + base[key]
+        lines.append(line)
+
+    lines.append("-" * 92)
+    lines.append("n apps: " + str(len(results)) +
+                 "  no stats: " + str(nFailed))
+    lines.append("total loader cycles: %d  relocations: %d  wall ms: %.1f" %
+                 (totals["cycles"], totals["relocs"], totals["wallMs"]))
+    if (len(baseline) > 0):
+        lines.append("savings for the apps in the baseline: " +
+                     "cycles %s  relocations %s  wall %s" %
+                     (formatSaving(baseTotals["cycles"], matchTotals["cycles"]),
+                      formatSaving(baseTotals["relocs"], matchTotals["relocs"]),
+                      formatSaving(baseTotals["wallMs"], matchTotals["wallMs"])))
+    lines.append("=" * 92)
+
+    report = "\n".join(lines) + "\n"
+    print(report)
+
+    if (len(options.reportPath) > 0):
+        try:
+            fp = open(options.reportPath, "w")
+            fp.write(report)
+            fp.close()
+            print("Report written to: " + options.reportPath, file=sys.stderr)
+        except IOError as e:
+            print("ERROR - cannot write report file: " + options.reportPath,
+                  file=sys.stderr)
+
+########################################################################
+# format the saving relative to the baseline, as a percentage
+
+def formatSaving(baseValue, value):
+
+    if (baseValue <= 0):
+        return "-"
+    return "%.1f%%" % ((baseValue - value) * 100.0 / baseValue)
+
+########################################################################
+# Run a command, and return its stdout
+
+def runCmdOutput(cmd):
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+    try:
+        pipe = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        output = pipe.communicate()[0]
+    except OSError as e:
+        print("Execution failed:", e, file=sys.stderr)
+        return ""
+
+    return output.decode('utf-8', 'replace')
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()
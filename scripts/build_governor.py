@@ -0,0 +1,780 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Run a make build, adapting the parallelism to the memory available.
+#
+# Large C++ translation units can use several GB each. With many make
+# jobs in a memory-limited container, the compiler is OOM-killed and
+# the build fails. This script has two modes.
+#
+# Make mode, the default:
+#
+#   build_governor.py [options] make [targets]
+#
+#   1. run make, with -j jobs, sampling the system and cgroup
+#      memory while it runs. With --budgetMb, the memory used by the
+#      make process tree is also held under that budget, as if it
+#      were a cgroup limit.
+#   2. if the build fails, and a compiler was killed for lack of
+#      memory, halve the jobs and run make again, down to --minJobs.
+#      make only rebuilds the targets that failed.
+#   3. write a report with the memory peaks, the attempts, and the
+#      translation units that used the most memory
+#   4. compact the stats file, to the latest entry for each
+#      translation unit
+#
+# Compile mode, --compile, used as the compiler launcher:
+#
+#   build_governor.py --compile [options] compiler args ...
+#
+#   1. wait until there is enough memory for the translation unit,
+#      using its peak RSS from earlier builds, and reserve it in a
+#      ledger shared by the compiles. This holds back make jobs when
+#      the memory pressure rises, even if they start together.
+#   2. run the compiler, record its peak RSS in the stats file,
+#      and release the reservation
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import signal
+import fcntl
+import subprocess
+import threading
+import time
+from optparse import OptionParser
+
+# compiler messages when it is killed, usually by the OOM killer
+
+oomMessages = ["Killed signal terminated program",
+               "internal compiler error: Killed",
+               "fatal error: Killed signal"]
+
+sourceExtensions = [".c", ".cc", ".cpp", ".cxx", ".C", ".f", ".f90"]
+
+# environment variable with the pid of the make mode governor,
+# used by the compile launchers for the budget
+
+budgetPidEnvName = "BUILD_GOVERNOR_PID"
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options] cmd [args]"
+    parser = OptionParser(usage)
+    parser.disable_interspersed_args()
+    parser.add_option('--debug',
+                      dest='debug', default=False,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--compile',
+                      dest='compile', default=False,
+                      action="store_true",
+                      help='Compile mode, as the compiler launcher. ' + \
+                      'Default is make mode.')
+    parser.add_option('--jobs',
+                      dest='jobs', default=8, type='int',
+                      help='Number of make jobs to start with, default: 8')
+    parser.add_option('--minJobs',
+                      dest='minJobs', default=1, type='int',
+                      help='Min number of make jobs for the retries, ' + \
+                      'default: 1')
+    parser.add_option('--minFreeMb',
+                      dest='minFreeMb', default=1024, type='int',
+                      help='Memory to keep free, in MB. A compile waits ' + \
+                      'until this much is free, as well as its own ' + \
+                      'expected peak. Default: 1024')
+    parser.add_option('--budgetMb',
+                      dest='budgetMb', default=0, type='int',
+                      help='Memory budget for the build, in MB. The ' + \
+                      'compiles are held back so that the make process ' + \
+                      'tree stays under it, as for a cgroup limit. ' + \
+                      'Default: 0, no budget')
+    parser.add_option('--maxWaitSecs',
+                      dest='maxWaitSecs', default=300, type='int',
+                      help='Max time a compile waits for memory, ' + \
+                      'default: 300')
+    parser.add_option('--sampleSecs',
+                      dest='sampleSecs', default=1.0, type='float',
+                      help='Interval for sampling the memory, default: 1')
+    parser.add_option('--statsPath',
+                      dest='statsPath', default='',
+                      help='File for the peak RSS of each translation ' + \
+                      'unit. Kept across builds. Default: none')
+    parser.add_option('--reportPath',
+                      dest='reportPath', default='',
+                      help='Path for the report file, in make mode. ' + \
+                      'Default: stdout only')
+
+    (options, args) = parser.parse_args()
+
+    if (len(args) == 0):
+        parser.print_help()
+        sys.exit(1)
+
+    if (options.compile):
+        sys.exit(runCompile(args))
+
+    if (options.minJobs < 1):
+        options.minJobs = 1
+    if (options.jobs < options.minJobs):
+        options.jobs = options.minJobs
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  cmd: ", " ".join(args), file=sys.stderr)
+        print("  jobs: ", options.jobs, file=sys.stderr)
+        print("  minJobs: ", options.minJobs, file=sys.stderr)
+        print("  minFreeMb: ", options.minFreeMb, file=sys.stderr)
+        print("  budgetMb: ", options.budgetMb, file=sys.stderr)
+        print("  statsPath: ", options.statsPath, file=sys.stderr)
+        print("  reportPath: ", options.reportPath, file=sys.stderr)
+        print("  cgroup limit MB: ", getCgroupLimitMb(), file=sys.stderr)
+
+    sys.exit(runMake(args))
+
+########################################################################
+# make mode - run make, retrying with fewer jobs after an OOM kill
+# returns the exit code of the last attempt
+
+def runMake(args):
+
+    sampler = MemSampler(options.sampleSecs)
+    sampler.start()
+
+    attempts = []
+    jobs = options.jobs
+    while True:
+
+        print("==>> build_governor: running make, jobs: " + str(jobs),
+              file=sys.stderr)
+        sys.stderr.flush()
+
+        statsOffset = getFileSize(options.statsPath)
+        startTime = time.time()
+        (retcode, nOomMessages) = runMakeAttempt(args, jobs)
+        # the launcher records the kill, and the compiler driver reports it
+        nKilled = max(nOomMessages,
+                      countKilled(options.statsPath, statsOffset))
+        attempts.append((jobs, retcode, nKilled, time.time() - startTime))
+
+        if (retcode == 0):
+            break
+
+        if (nKilled == 0):
+            print("==>> build_governor: make failed, not from lack of memory",
+                  file=sys.stderr)
+            break
+
+        if (jobs <= options.minJobs):
+            print("==>> build_governor: make failed from lack of memory, " +
+                  "at the min jobs: " + str(jobs), file=sys.stderr)
+            break
+
+        jobs = max(options.minJobs, jobs // 2)
+        print("==>> build_governor: compiler killed, n: " + str(nKilled) +
+              ", retrying with jobs: " + str(jobs), file=sys.stderr)
+
+    sampler.stop()
+    writeReport(args, attempts, sampler)
+    compactStats()
+
+    return retcode
+
+########################################################################
+# run make once, copying the output to stdout
+# returns the exit code, and the number of OOM kill messages
+
+def runMakeAttempt(args, jobs):
+
+    cmd = [args[0], "-j", str(jobs)] + args[1:]
+
+    # the compile launchers measure the budget against this process tree
+
+    env = os.environ.copy()
+    env[budgetPidEnvName] = str(os.getpid())
+
+    pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, env=env)
+
+    nOomMessages = 0
+    for line in iter(pipe.stdout.readline, b''):
+        line = line.decode('utf-8', 'replace')
+        sys.stdout.write(line)
+        for message in oomMessages:
+            if (line.find(message) >= 0):
+                nOomMessages = nOomMessages + 1
+                break
+    sys.stdout.flush()
+
+    pipe.stdout.close()
+    retcode = pipe.wait()
+
+    return (retcode, nOomMessages)
+
+########################################################################
+# compile mode - wait for memory, then run the compiler
+# returns the exit code of the compiler
+
+def runCompile(args):
+
+    srcPath = getSourcePath(args)
+
+    # wait until there is enough memory for this translation unit,
+    # and reserve it. If the wait is too long, run anyway, to avoid
+    # stalling the build.
+
+    expectedMb = getExpectedRssMb(srcPath)
+    reserveMemory(expectedMb)
+    try:
+        return runCompiler(args, srcPath)
+    finally:
+        releaseMemory()
+
+########################################################################
+# run the compiler, and record its peak RSS
+# returns the exit code of the compiler
+
+def runCompiler(args, srcPath):
+
+    startTime = time.time()
+    try:
+        pid = os.fork()
+    except OSError as e:
+        print("ERROR - cannot fork: " + str(e), file=sys.stderr)
+        return 1
+    if (pid == 0):
+        try:
+            os.execvp(args[0], args)
+        except OSError as e:
+            print("ERROR - cannot run: " + args[0] + ", " + str(e),
+                  file=sys.stderr)
+        os._exit(127)
+
+    (pid, status, rusage) = os.wait4(pid, 0)
+    secs = time.time() - startTime
+    rssMb = rusage.ru_maxrss / 1024.0
+
+    if (os.WIFSIGNALED(status)):
+        retcode = 128 + os.WTERMSIG(status)
+        result = "FAILED"
+        if (os.WTERMSIG(status) == signal.SIGKILL):
+            result = "KILLED"
+    else:
+        retcode = os.WEXITSTATUS(status)
+        result = "ok"
+        if (retcode != 0):
+            result = "FAILED"
+
+    if (len(options.statsPath) > 0 and len(srcPath) > 0):
+        appendStats(rssMb, secs, result, srcPath)
+
+    return retcode
+
+########################################################################
+# get the source file from the compiler args
+
+def getSourcePath(args):
+
+    for arg in reversed(args):
+        if (os.path.splitext(arg)[1] in sourceExtensions):
+            return os.path.abspath(arg)
+    return ""
+
+########################################################################
+# append the stats for a translation unit
+# the line is written in one call, so the lines from parallel
+# compiles are not interleaved
+
+def appendStats(rssMb, secs, result, srcPath):
+
+    line = "%9.1f %8.2f %-7s %s\n" % (rssMb, secs, result, srcPath)
+    try:
+        fd = os.open(options.statsPath,
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(fd, line.encode('utf-8'))
+        os.close(fd)
+    except OSError as e:
+        print("WARNING - cannot write stats file: " + options.statsPath,
+              file=sys.stderr)
+
+########################################################################
+# read the stats file
+# returns a dict of (rssMb, secs, result), keyed on the source path.
+# The latest entry for each source is kept.
+
+def readStats(statsPath):
+
+    stats = {}
+    if (len(statsPath) == 0 or os.path.isfile(statsPath) == False):
+        return stats
+
+    try:
+        fp = open(statsPath, "r")
+        lines = fp.readlines()
+        fp.close()
+    except IOError as e:
+        return stats
+
+    for line in lines:
+        toks = line.split(None, 3)
+        if (len(toks) < 4):
+            continue
+        try:
+            stats[toks[3].strip()] = (float(toks[0]), float(toks[1]), toks[2])
+        except ValueError:
+            continue
+
+    return stats
+
+########################################################################
+# rewrite the stats file with the latest entry for each translation
+# unit, so that it does not grow from build to build. This is done
+# at the end of make mode, when no compiles are running.
+
+def compactStats():
+
+    if (len(options.statsPath) == 0 or
+        os.path.isfile(options.statsPath) == False):
+        return
+
+    stats = readStats(options.statsPath)
+    tmpPath = options.statsPath + ".tmp." + str(os.getpid())
+    try:
+        fp = open(tmpPath, "w")
+        for srcPath in sorted(stats.keys()):
+            (rssMb, secs, result) = stats[srcPath]
+            fp.write("%9.1f %8.2f %-7s %s\n" % (rssMb, secs, result, srcPath))
+        fp.close()
+        os.rename(tmpPath, options.statsPath)
+    except (IOError, OSError) as e:
+        print("WARNING - cannot compact stats file: " + options.statsPath,
+              file=sys.stderr)
+
+########################################################################
+# get the expected peak RSS for a translation unit, from earlier builds
+# if it has not been compiled before, the median of the other
+# translation units is used, or 0 if there are none
+
+def getExpectedRssMb(srcPath):
+
+    stats = readStats(options.statsPath)
+    if (srcPath in stats):
+        return stats[srcPath][0]
+    if (len(stats) == 0):
+        return 0.0
+    rssValues = sorted([entry[0] for entry in stats.values()])
+    return rssValues[len(rssValues) // 2]
+
+########################################################################
+# wait for memory for a compile, and reserve it in the ledger
+#
+# The ledger is shared by the compiles, next to the stats file. It has
+# a line for each running compile, with the launcher pid and the MB
+# reserved. It is read and updated under an exclusive lock, so that
+# compiles that start together see each other's reservations.
+#
+# The memory a compile has already allocated shows up in the available
+# memory, so only the part of the reservation above the current RSS
+# of the compile is subtracted. Entries for launchers that are gone
+# are dropped.
+
+def reserveMemory(expectedMb):
+
+    if (len(options.statsPath) == 0):
+        waitStart = time.time()
+        while (getAvailableMb() < options.minFreeMb + expectedMb and
+               time.time() - waitStart < options.maxWaitSecs):
+            time.sleep(options.sampleSecs)
+        return
+
+    waitStart = time.time()
+    while True:
+        fd = lockLedger()
+        try:
+            ledger = readLedger(fd)
+            outstandingMb = getOutstandingMb(ledger)
+            availableMb = getAvailableMb() - outstandingMb
+            if (availableMb >= options.minFreeMb + expectedMb or
+                time.time() - waitStart >= options.maxWaitSecs):
+                ledger[os.getpid()] = expectedMb
+                writeLedger(fd, ledger)
+                return
+            writeLedger(fd, ledger)
+        finally:
+            unlockLedger(fd)
+        time.sleep(options.sampleSecs)
+
+########################################################################
+# release the reservation for this compile
+
+def releaseMemory():
+
+    if (len(options.statsPath) == 0):
+        return
+
+    fd = lockLedger()
+    try:
+        ledger = readLedger(fd)
+        if (os.getpid() in ledger):
+            del ledger[os.getpid()]
+        writeLedger(fd, ledger)
+    finally:
+        unlockLedger(fd)
+
+########################################################################
+# open and lock the ledger file
+# returns the file descriptor
+
+def lockLedger():
+
+    ledgerPath = options.statsPath + ".reserved"
+    fd = os.open(ledgerPath, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return fd
+
+########################################################################
+# unlock and close the ledger file
+
+def unlockLedger(fd):
+
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+########################################################################
+# read the ledger
+# returns a dict of the MB reserved, keyed on the launcher pid,
+# for the launchers that are still running
+
+def readLedger(fd):
+
+    os.lseek(fd, 0, os.SEEK_SET)
+    contents = b""
+    while True:
+        chunk = os.read(fd, 65536)
+        if (len(chunk) == 0):
+            break
+        contents = contents + chunk
+
+    ledger = {}
+    for line in contents.decode('utf-8', 'replace').splitlines():
+        toks = line.split()
+        if (len(toks) != 2):
+            continue
+        try:
+            pid = int(toks[0])
+            reservedMb = float(toks[1])
+        except ValueError:
+            continue
+        if (os.path.isdir("/proc/" + str(pid))):
+            ledger[pid] = reservedMb
+
+    return ledger
+
+########################################################################
+# write the ledger, replacing the contents
+
+def writeLedger(fd, ledger):
+
+    lines = ""
+    for pid in sorted(ledger.keys()):
+        lines = lines + "%d %.1f\n" % (pid, ledger[pid])
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.ftruncate(fd, 0)
+    os.write(fd, lines.encode('utf-8'))
+
+########################################################################
+# get the MB reserved in the ledger, and not yet allocated
+# the RSS of a compile is summed over the launcher's descendants,
+# i.e. the compiler driver, cc1plus and the assembler
+
+def getOutstandingMb(ledger):
+
+    if (len(ledger) == 0):
+        return 0.0
+
+    children = getChildPids()
+    outstandingMb = 0.0
+    for (pid, reservedMb) in ledger.items():
+        rssMb = getTreeRssMb(pid, children)
+        outstandingMb = outstandingMb + max(0.0, reservedMb - rssMb)
+
+    return outstandingMb
+
+########################################################################
+# get the child pids of each process, from /proc
+# returns a dict of the lists of child pids, keyed on the parent pid
+
+def getChildPids():
+
+    children = {}
+    for name in os.listdir("/proc"):
+        if (name.isdigit() == False):
+            continue
+        statLine = readFirstLine("/proc/" + name + "/stat")
+        if (len(statLine) == 0):
+            continue
+        try:
+            ppid = int(statLine.rsplit(")", 1)[1].split()[1])
+        except (IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    return children
+
+########################################################################
+# get the RSS of the descendants of a process, in MB
+
+def getTreeRssMb(pid, children):
+
+    pageMb = os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    rssMb = 0.0
+    pending = list(children.get(pid, []))
+    while (len(pending) > 0):
+        childPid = pending.pop()
+        pending.extend(children.get(childPid, []))
+        toks = readFirstLine("/proc/" + str(childPid) + "/statm").split()
+        if (len(toks) >= 2):
+            rssMb = rssMb + int(toks[1]) * pageMb
+
+    return rssMb
+
+########################################################################
+# count the compiles recorded as killed, after the offset in the stats file
+
+def countKilled(statsPath, offset):
+
+    if (len(statsPath) == 0 or os.path.isfile(statsPath) == False):
+        return 0
+
+    fp = open(statsPath, "r")
+    fp.seek(offset)
+    lines = fp.readlines()
+    fp.close()
+
+    nKilled = 0
+    for line in lines:
+        toks = line.split()
+        if (len(toks) >= 3 and toks[2] == "KILLED"):
+            nKilled = nKilled + 1
+
+    return nKilled
+
+########################################################################
+# get the size of a file, 0 if it does not exist
+
+def getFileSize(path):
+
+    if (len(path) == 0 or os.path.isfile(path) == False):
+        return 0
+    return os.path.getsize(path)
+
+########################################################################
+# get the memory available, in MB
+# this is the lower of the system available memory, the room left
+# under the cgroup limit, if there is one, and the room left under
+# the budget, if there is one
+
+def getAvailableMb():
+
+    availableMb = readMeminfoMb("MemAvailable")
+    limitMb = getCgroupLimitMb()
+    if (limitMb > 0):
+        availableMb = min(availableMb, limitMb - getCgroupUsageMb())
+    if (options.budgetMb > 0):
+        availableMb = min(availableMb, options.budgetMb - getBudgetUsageMb())
+    return availableMb
+
+########################################################################
+# get the memory used by the build, for the budget, in MB
+# this is the RSS of the process tree under the make mode governor.
+# A launcher run outside make mode measures its own tree.
+
+def getBudgetUsageMb():
+
+    rootPid = os.getpid()
+    try:
+        rootPid = int(os.environ.get(budgetPidEnvName, rootPid))
+    except ValueError:
+        pass
+    return getTreeRssMb(rootPid, getChildPids())
+
+########################################################################
+# read a value from /proc/meminfo, in MB
+
+def readMeminfoMb(key):
+
+    try:
+        fp = open("/proc/meminfo", "r")
+        lines = fp.readlines()
+        fp.close()
+    except IOError as e:
+        return 0.0
+
+    for line in lines:
+        toks = line.split()
+        if (len(toks) >= 2 and toks[0] == key + ":"):
+            return int(toks[1]) / 1024.0
+
+    return 0.0
+
+########################################################################
+# get the cgroup memory limit, in MB, for cgroup v2 or v1
+# returns 0 if there is no limit
+
+def getCgroupLimitMb():
+
+    value = readFirstLine("/sys/fs/cgroup/memory.max")
+    if (len(value) == 0):
+        value = readFirstLine("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    if (len(value) == 0 or value == "max"):
+        return 0.0
+
+    limitMb = int(value) / (1024.0 * 1024.0)
+
+    # v1 reports a very large number if there is no limit
+
+    if (limitMb > readMeminfoMb("MemTotal")):
+        return 0.0
+
+    return limitMb
+
+########################################################################
+# get the cgroup memory usage, in MB, for cgroup v2 or v1
+# the inactive page cache is left out, since it can be reclaimed
+
+def getCgroupUsageMb():
+
+    usage = readFirstLine("/sys/fs/cgroup/memory.current")
+    statPath = "/sys/fs/cgroup/memory.stat"
+    inactiveKey = "inactive_file"
+    if (len(usage) == 0):
+        usage = readFirstLine("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+        statPath = "/sys/fs/cgroup/memory/memory.stat"
+        inactiveKey = "total_inactive_file"
+    if (len(usage) == 0):
+        return 0.0
+
+    usageBytes = int(usage)
+    try:
+        fp = open(statPath, "r")
+        for line in fp.readlines():
+            toks = line.split()
+            if (len(toks) == 2 and toks[0] == inactiveKey):
+                usageBytes = usageBytes - int(toks[1])
+                break
+        fp.close()
+    except IOError as e:
+        pass
+
+    return usageBytes / (1024.0 * 1024.0)
+
+########################################################################
+# read the first line of a file, empty if it cannot be read
+
+def readFirstLine(path):
+
+    try:
+        fp = open(path, "r")
+        line = fp.readline().strip()
+        fp.close()
+        return line
+    except IOError as e:
+        return ""
+
+########################################################################
+# thread to sample the memory while make runs
+
+class MemSampler(threading.Thread):
+
+    def __init__(self, sampleSecs):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.sampleSecs = sampleSecs
+        self.stopEvent = threading.Event()
+        self.nSamples = 0
+        self.minAvailableMb = -1.0
+        self.peakCgroupMb = 0.0
+
+    def run(self):
+        while (self.stopEvent.is_set() == False):
+            availableMb = getAvailableMb()
+            if (self.minAvailableMb < 0 or availableMb < self.minAvailableMb):
+                self.minAvailableMb = availableMb
+            self.peakCgroupMb = max(self.peakCgroupMb, getCgroupUsageMb())
+            self.nSamples = self.nSamples + 1
+            self.stopEvent.wait(self.sampleSecs)
+
+    def stop(self):
+        self.stopEvent.set()
+        self.join()
+
+########################################################################
+# write the report, to stdout and to the report file
+
+def writeReport(args, attempts, sampler):
+
+    lines = []
+    lines.append("=" * 78)
+    lines.append("Build governor report")
+    lines.append("  cmd: " + " ".join(args))
+    lines.append("  cgroup limit MB: %.0f" % getCgroupLimitMb())
+    lines.append("  budget MB: %d" % options.budgetMb)
+    lines.append("  peak cgroup usage MB: %.0f" % sampler.peakCgroupMb)
+    lines.append("  min available MB: %.0f" % sampler.minAvailableMb)
+    lines.append("  n samples: " + str(sampler.nSamples))
+    lines.append("=" * 78)
+    lines.append("%-8s %6s %8s %10s %10s" %
+                 ("attempt", "jobs", "exit", "n killed", "secs"))
+    lines.append("-" * 78)
+    for ii in range(0, len(attempts)):
+        (jobs, retcode, nKilled, secs) = attempts[ii]
+        lines.append("%-8d %6d %8d %10d %10.1f" %
+                     (ii + 1, jobs, retcode, nKilled, secs))
+
+    # the translation units with the highest peak RSS
+
+    stats = readStats(options.statsPath)
+    if (len(stats) > 0):
+        lines.append("-" * 78)
+        lines.append("%9s %8s %-7s %s" % ("peak MB", "secs", "result",
+                                          "translation unit"))
+        lines.append("-" * 78)
+        srcPaths = sorted(stats.keys(), key=lambda x: -stats[x][0])
+        for srcPath in srcPaths[:20]:
+            (rssMb, secs, result) = stats[srcPath]
+            lines.append("%9.1f %8.2f %-7s %s" % (rssMb, secs, result, srcPath))
+
+    lines.append("=" * 78)
+
+    report = "\n".join(lines) + "\n"
+    print(report)
+
+    if (len(options.reportPath) > 0):
+        try:
+            fp = open(options.reportPath, "w")
+            fp.write(report)
+            fp.close()
+            print("Report written to: " + options.reportPath, file=sys.stderr)
+        except IOError as e:
+            print("ERROR - cannot write report file: " + options.reportPath,
+                  file=sys.stderr)
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()
@@ -23,12 +23,36 @@ import os
 import sys
 import shutil
 import subprocess
+import hashlib
+import shlex
+import threading
 from optparse import OptionParser
 import time
 from datetime import datetime
 from datetime import date
 from datetime import timedelta
 import glob
+try:
+    from shlex import quote
+except ImportError:
+    from pipes import quote
+
+# fixed path for the build dir in the compiled objects, so that
+# builds in different dirs give the same objects
+
+mappedBuildDir = "/usr/src/lrose-build"
+
+# x86-64 micro-architecture levels, and the instruction set
+# extensions each adds to the previous level
+
+cpuTargets = ["x86-64", "x86-64-v2", "x86-64-v3"]
+cpuTargetExtensions = {
+    "x86-64": [],
+    "x86-64-v2": ["cx16", "sahf", "popcnt", "sse3", "sse4.1", "sse4.2",
+                  "ssse3"],
+    "x86-64-v3": ["avx", "avx2", "bmi", "bmi2", "f16c", "fma", "lzcnt",
+                  "movbe", "xsave"]
+}
 
 def main():
 
@@ -141,16 +165,39 @@ def main():
                       dest='use_cmake3', default=False,
                       action="store_true",
                       help='Use cmake3 instead of cmake for samurai')
+    parser.add_option('--jobs',
+                      dest='jobs', default=8, type='int',
+                      help='Number of parallel make jobs, default: 8')
     parser.add_option('--noApps',
                       dest='noApps', default=False,
                       action="store_true",
                       help='Do not build the lrose core apps')
+    parser.add_option('--cpuTarget',
+                      dest='cpuTarget', default='x86-64',
+                      help='x86-64 micro-architecture level to compile ' + \
+                      'for: ' + ", ".join(cpuTargets) + '. ' + \
+                      'Default: x86-64, the generic baseline')
+    parser.add_option('--mocCacheDir',
+                      dest='mocCacheDir', default='',
+                      help='Dir for caching the Qt moc files. ' + \
+                      'Kept across builds. Default: not used')
 
     (options, args) = parser.parse_args()
     
     if (options.verbose):
         options.debug = True
 
+    if (options.cpuTarget not in cpuTargets):
+        print("ERROR: invalid cpuTarget: " + options.cpuTarget,
+              file=sys.stderr)
+        print("  options: " + ", ".join(cpuTargets), file=sys.stderr)
+        sys.exit(1)
+
+    if (options.cpuTarget != "x86-64" and os.uname()[4] != "x86_64"):
+        print("WARNING: cpuTarget only applies to x86_64, ignoring: " +
+              options.cpuTarget, file=sys.stderr)
+        options.cpuTarget = "x86-64"
+
     # check package name
 
     if (options.package != "lrose-core" and
@@ -251,7 +298,10 @@ def main():
         print("  build_fractl: ", options.build_fractl, file=sys.stderr)
         print("  build_vortrac: ", options.build_vortrac, file=sys.stderr)
         print("  build_samurai: ", options.build_samurai, file=sys.stderr)
+        print("  jobs: ", options.jobs, file=sys.stderr)
         print("  noApps: ", options.noApps, file=sys.stderr)
+        print("  cpuTarget: ", options.cpuTarget, file=sys.stderr)
+        print("  mocCacheDir: ", options.mocCacheDir, file=sys.stderr)
 
     # create build dir
     
@@ -304,6 +354,7 @@ def main():
     # run qmake for QT apps to create moc_ files
 
     logPath = prepareLogFile("create-qt-moc-files");
+    mocDirs = []
     if (options.package.find("lrose-core") >= 0):
         mocDirs = ["apps/radar/src/HawkEye",
                    "apps/radar/src/HawkEdit",
@@ -311,9 +362,7 @@ def main():
     elif (options.package.find("lrose") >= 0):
         mocDirs = ["apps/radar/src/HawkEye"]
         
-    for dir in mocDirs:
-        mocPath = os.path.join(codebaseDir, dir)
-        createQtMocFiles(mocPath)
+    createQtMocFiles([os.path.join(codebaseDir, dir) for dir in mocDirs])
 
     # prune any empty directories
 
@@ -494,16 +543,255 @@ def setupAutoconf():
 
 ########################################################################
 # Run qmake for QT apps such as HawkEye to create _moc files
+#
+# qmake is run in all of the app dirs at once. The moc commands are
+# taken from the qmake makefiles, and run in parallel. Each moc file
+# is only rewritten if its contents change, so that make does not
+# recompile the app. With --mocCacheDir, the moc files are cached,
+# keyed on a hash of the moc version, the command, and the header.
 
-def createQtMocFiles(appDir):
+def createQtMocFiles(appDirs):
     
-    if (os.path.isdir(appDir) == False):
+    appDirs = [appDir for appDir in appDirs if os.path.isdir(appDir)]
+    if (len(appDirs) == 0):
         return
 
-    os.chdir(appDir)
-    shellCmd("rm -f moc*");
-    shellCmd("qmake -o Makefile.qmake");
-    shellCmd("make -f Makefile.qmake mocables");
+    # run qmake in all of the dirs
+
+    print("Running qmake in: " + " ".join(appDirs), file=sys.stderr)
+    logFp.flush()
+    procs = []
+    for appDir in appDirs:
+        procs.append(subprocess.Popen(["qmake", "-o", "Makefile.qmake"],
+                                      cwd=appDir, stdout=logFp,
+                                      stderr=subprocess.STDOUT))
+    for (appDir, proc) in zip(appDirs, procs):
+        if (proc.wait() != 0):
+            print("ERROR - qmake failed in: " + appDir, file=sys.stderr)
+            sys.exit(1)
+
+    # get the commands for the moc files
+    # moc_predefs.h is used by the other moc commands, so it goes first
+
+    predefsCmds = []
+    mocCmds = []
+    outputs = {}
+    for appDir in appDirs:
+        outputs[appDir] = []
+        for args in getMocCommands(appDir):
+            outName = getCmdOutput(args)
+            outputs[appDir].append(outName)
+            if (outName == "moc_predefs.h"):
+                predefsCmds.append((appDir, args))
+            else:
+                mocCmds.append((appDir, args))
+
+    global mocLock, mocVersions, mocCounts
+    mocLock = threading.Lock()
+    mocVersions = {}
+    mocCounts = {"run": 0, "cached": 0, "rewritten": 0}
+
+    runMocCommands(predefsCmds)
+    runMocCommands(mocCmds)
+
+    # remove moc files left over from headers that are gone
+
+    for appDir in appDirs:
+        for path in glob.glob(os.path.join(appDir, "moc_*")):
+            if (os.path.basename(path) not in outputs[appDir]):
+                os.remove(path)
+
+    print("Qt moc files, moc runs: " + str(mocCounts["run"]) +
+          ", from cache: " + str(mocCounts["cached"]) +
+          ", rewritten: " + str(mocCounts["rewritten"]), file=sys.stderr)
+
+########################################################################
+# get the moc commands for an app dir, from the qmake makefile
+# returns a list of the args for each command
+
+def getMocCommands(appDir):
+
+    pipe = subprocess.Popen(["make", "-n", "-B", "-f", "Makefile.qmake",
+                             "mocables"], cwd=appDir,
+                            stdout=subprocess.PIPE)
+    output = pipe.communicate()[0].decode('utf-8', 'replace')
+    if (pipe.returncode != 0):
+        print("ERROR - cannot get the moc commands in: " + appDir,
+              file=sys.stderr)
+        sys.exit(1)
+
+    cmds = []
+    for line in output.splitlines():
+        args = shlex.split(line)
+        if (len(getCmdOutput(args)) > 0):
+            cmds.append(args)
+
+    return cmds
+
+########################################################################
+# get the output file of a moc command, from the -o arg
+# returns empty string if it is not a moc file
+
+def getCmdOutput(args):
+
+    for ii in range(len(args) - 1):
+        if (args[ii] == "-o"):
+            outName = args[ii + 1]
+            if (os.path.basename(outName) == outName and
+                outName.startswith("moc_")):
+                return outName
+            return ""
+    return ""
+
+########################################################################
+# run the moc commands, using up to options.jobs threads
+# exits if any of the commands fail
+
+def runMocCommands(cmds):
+
+    cmds = list(cmds)
+    failed = []
+
+    def worker():
+        while True:
+            with mocLock:
+                if (len(cmds) == 0):
+                    return
+                (appDir, args) = cmds.pop(0)
+            if (runMocCommand(appDir, args) == False):
+                with mocLock:
+                    failed.append(os.path.join(appDir, getCmdOutput(args)))
+
+    threads = []
+    for ii in range(max(1, min(options.jobs, len(cmds)))):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    if (len(failed) > 0):
+        print("ERROR - moc failed for: " + " ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+########################################################################
+# run a moc command, writing to a scratch file in the app dir, since
+# moc writes the header include relative to the output file.
+# The output file is only replaced if its contents change.
+# returns True on success, False on failure
+
+def runMocCommand(appDir, args):
+
+    outName = getCmdOutput(args)
+    outPath = os.path.join(appDir, outName)
+    cachePath = ""
+    if (len(options.mocCacheDir) > 0 and outName != "moc_predefs.h"):
+        key = getMocCacheKey(appDir, args)
+        cachePath = os.path.join(options.mocCacheDir, key[:2], key)
+        if (os.path.isfile(cachePath)):
+            rewritten = updateMocFile(cachePath, outPath, False)
+            with mocLock:
+                mocCounts["cached"] = mocCounts["cached"] + 1
+                if (rewritten):
+                    mocCounts["rewritten"] = mocCounts["rewritten"] + 1
+            return True
+
+    scratchName = outName + ".tmp." + str(os.getpid()) + "." + \
+                  str(threading.current_thread().ident)
+    scratchArgs = list(args)
+    scratchArgs[scratchArgs.index("-o") + 1] = scratchName
+    cmd = " ".join([quote(arg) for arg in scratchArgs])
+    pipe = subprocess.Popen(cmd, shell=True, cwd=appDir,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+    output = pipe.communicate()[0].decode('utf-8', 'replace')
+    with mocLock:
+        logFp.write("Running cmd: " + cmd + "\n" + output)
+    scratchPath = os.path.join(appDir, scratchName)
+    if (pipe.returncode != 0 or os.path.isfile(scratchPath) == False):
+        if (os.path.isfile(scratchPath)):
+            os.remove(scratchPath)
+        return False
+
+    if (len(cachePath) > 0):
+        if (os.path.isdir(os.path.dirname(cachePath)) == False):
+            try:
+                os.makedirs(os.path.dirname(cachePath))
+            except OSError:
+                pass
+        tmpPath = cachePath + ".tmp." + str(os.getpid())
+        shutil.copyfile(scratchPath, tmpPath)
+        os.rename(tmpPath, cachePath)
+
+    rewritten = updateMocFile(scratchPath, outPath, True)
+    with mocLock:
+        mocCounts["run"] = mocCounts["run"] + 1
+        if (rewritten):
+            mocCounts["rewritten"] = mocCounts["rewritten"] + 1
+    return True
+
+########################################################################
+# compute the cache key for a moc command
+# This covers the moc version, the command, and the contents of the
+# files it reads: the header and moc_predefs.h
+# The build dir in the command is mapped to a fixed path, as for the
+# objects, so that builds in different dirs share the entries.
+
+def getMocCacheKey(appDir, args):
+
+    mocExec = args[0]
+    with mocLock:
+        if (mocExec not in mocVersions):
+            pipe = subprocess.Popen(mocExec + " -v", shell=True,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT)
+            mocVersions[mocExec] = pipe.communicate()[0]
+        mocVersion = mocVersions[mocExec]
+
+    hasher = hashlib.sha256()
+    hasher.update(mocVersion)
+    hasher.update(b"\0")
+    buildDir = os.path.abspath(options.buildDir)
+    mappedArgs = [arg.replace(buildDir, mappedBuildDir) for arg in args]
+    hasher.update("\0".join(mappedArgs).encode('utf-8'))
+    for arg in args[1:]:
+        path = os.path.join(appDir, arg)
+        if (arg == "-o" or os.path.basename(arg) == getCmdOutput(args) or
+            os.path.isfile(path) == False):
+            continue
+        fp = open(path, "rb")
+        hasher.update(b"\0")
+        hasher.update(fp.read())
+        fp.close()
+
+    return hasher.hexdigest()
+
+########################################################################
+# replace a moc file, unless it already has the same contents
+# the source file is moved if it is a scratch file, otherwise copied
+# returns True if the file was replaced
+
+def updateMocFile(srcPath, destPath, isScratch):
+
+    same = False
+    if (os.path.isfile(destPath)):
+        fp = open(srcPath, "rb")
+        srcContents = fp.read()
+        fp.close()
+        fp = open(destPath, "rb")
+        same = (fp.read() == srcContents)
+        fp.close()
+
+    if (same):
+        if (isScratch):
+            os.remove(srcPath)
+        return False
+
+    if (isScratch):
+        os.rename(srcPath, destPath)
+    else:
+        shutil.copyfile(srcPath, destPath)
+    return True
 
 ########################################################################
 # write release information file
@@ -678,6 +966,17 @@ def buildPackage():
     else:
         os.environ["CXXFLAGS"] = " -std=c++11 "
 
+    # do not depend on the build dir or time, and compile for the cpu target
+    # the CSU builds pick these up from the environment as well
+
+    setReproducibleEnv()
+    extraFlags = " ".join(getPrefixMapFlags() + getCpuTargetFlags())
+    if (len(extraFlags) > 0):
+        os.environ["CFLAGS"] = os.environ.get("CFLAGS", "") + " " + \
+                               extraFlags
+        os.environ["CXXFLAGS"] = os.environ.get("CXXFLAGS", "") + " " + \
+                                 extraFlags
+
     # print out environment
 
     logPath = prepareLogFile("print-environment");
@@ -700,7 +999,7 @@ def buildPackage():
 
     logPath = prepareLogFile("build-libs");
     os.chdir(os.path.join(codebaseDir, "libs"))
-    cmd = "make -k -j 8"
+    cmd = "make -k -j " + str(options.jobs)
     shellCmd(cmd)
 
     # install the libraries
@@ -714,13 +1013,13 @@ def buildPackage():
 
         logPath = prepareLogFile("build-apps");
         os.chdir(os.path.join(codebaseDir, "apps/tdrp/src/tdrp_gen"))
-        cmd = "make -j 8 install-strip"
+        cmd = "make -j " + str(options.jobs) + " install-strip"
         shellCmd(cmd)
         
         # build the apps
 
         os.chdir(os.path.join(codebaseDir, "apps"))
-        cmd = "make -k -j 8"
+        cmd = "make -k -j " + str(options.jobs)
         shellCmd(cmd)
         
         # install the apps
@@ -738,6 +1037,78 @@ def buildPackage():
         os.chdir(scriptsDir)
         shellCmd("./install_scripts.lrose " + prefixBinDir)
 
+########################################################################
+# set the environment so that the build does not depend on the
+# build dir or the build time
+#
+# SOURCE_DATE_EPOCH is used by the compiler for __DATE__ and __TIME__.
+# It is set to the time of the last lrose-core commit, so the same
+# source always gives the same objects.
+
+def setReproducibleEnv():
+
+    if ("SOURCE_DATE_EPOCH" not in os.environ):
+        try:
+            pipe = subprocess.Popen(["git", "log", "-1", "--format=%ct"],
+                                    cwd=coreDir, stdout=subprocess.PIPE)
+            epoch = pipe.communicate()[0].decode('utf-8', 'replace').strip()
+            if (epoch.isdigit()):
+                os.environ["SOURCE_DATE_EPOCH"] = epoch
+        except OSError as e:
+            print("WARNING: cannot get lrose-core commit time: " + str(e),
+                  file=sys.stderr)
+
+########################################################################
+# get the flags to map the build dir to a fixed path in the objects
+# this applies to the debug info, and to __FILE__
+#
+# -ffile-prefix-map needs gcc 8 or later. Older versions only
+# support the mapping for the debug info.
+
+def getPrefixMapFlags():
+
+    buildDir = os.path.abspath(options.buildDir)
+    if (getGccMajorVersion() >= 8):
+        return ["-ffile-prefix-map=" + buildDir + "=" + mappedBuildDir]
+    return ["-fdebug-prefix-map=" + buildDir + "=" + mappedBuildDir]
+
+########################################################################
+# get the compile flags for the cpu target
+#
+# gcc 11 and later support the levels directly, with -march.
+# For older compilers, the extensions for the level, and the
+# levels below it, are enabled one at a time.
+
+def getCpuTargetFlags():
+
+    if (options.cpuTarget == "x86-64"):
+        return []
+
+    if (getGccMajorVersion() >= 11):
+        return ["-march=" + options.cpuTarget]
+
+    flags = ["-march=x86-64", "-mtune=generic"]
+    for cpuTarget in cpuTargets:
+        for extension in cpuTargetExtensions[cpuTarget]:
+            flags.append("-m" + extension)
+        if (cpuTarget == options.cpuTarget):
+            break
+    return flags
+
+########################################################################
+# get the major version of gcc, 0 if not known
+
+def getGccMajorVersion():
+
+    compiler = os.environ.get("CC", "gcc")
+    try:
+        pipe = subprocess.Popen([compiler, "-dumpversion"],
+                                stdout=subprocess.PIPE)
+        version = pipe.communicate()[0].decode('utf-8', 'replace').strip()
+        return int(version.split(".")[0])
+    except (OSError, ValueError):
+        return 0
+
 ########################################################################
 # perform final install
 
@@ -849,7 +1220,7 @@ def buildFractl():
     
     # do the build and install
 
-    cmd = "make -k -j 8 install/strip"
+    cmd = "make -k -j " + str(options.jobs) + " install/strip"
     shellCmd(cmd)
 
     return
@@ -888,7 +1259,7 @@ def buildVortrac():
     
     # do the build and install
     
-    cmd = "make -k -j 8 install/strip"
+    cmd = "make -k -j " + str(options.jobs) + " install/strip"
     shellCmd(cmd)
     
     # install resources
@@ -937,7 +1308,7 @@ def buildSamurai():
 
     # do the build and install
 
-    cmd = "make -k -j 8 install/strip"
+    cmd = "make -k -j " + str(options.jobs) + " install/strip"
     shellCmd(cmd)
 
     return
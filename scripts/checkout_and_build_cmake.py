@@ -14,6 +14,21 @@
 #
 # You can optionally specify a release date.
 #
+# With --subsetPackages, the packages that are subsets of lrose-core,
+# such as lrose-radx, can be packaged from this build. The contents of
+# each subset are found from its package makefiles, and a list of its
+# installed files is written to --subsetListDir.
+#
+# With --portable, the tree is built to run on all of the supported
+# distros. Build on the oldest distro, e.g. centos 7, so that the tree
+# needs only its version of glibc. The other runtime libs are bundled
+# in the bin dir, and found using $ORIGIN rpaths.
+#
+# With --pgo, the build is done twice. The first build is instrumented,
+# and is run on the training workload in pgo_training.txt, using the
+# sample data in --pgoDataDir. The second build is optimized using the
+# profiles from the training runs.
+#
 # Use --help to see the command line options.
 #
 #===========================================================================
@@ -29,8 +44,45 @@ from datetime import datetime
 from datetime import date
 from datetime import timedelta
 import glob
+import fnmatch
+import re
 from sys import platform
 
+try:
+    from configparser import ConfigParser
+except ImportError:
+    from ConfigParser import ConfigParser
+
+# fixed path for the build dir in the compiled objects, so that
+# builds in different dirs give the same objects
+
+mappedBuildDir = "/usr/src/lrose-build"
+
+# x86-64 micro-architecture levels, and the instruction set
+# extensions each adds to the previous level
+
+cpuTargets = ["x86-64", "x86-64-v2", "x86-64-v3"]
+cpuTargetExtensions = {
+    "x86-64": [],
+    "x86-64-v2": ["cx16", "sahf", "popcnt", "sse3", "sse4.1", "sse4.2",
+                  "ssse3"],
+    "x86-64-v3": ["avx", "avx2", "bmi", "bmi2", "f16c", "fma", "lzcnt",
+                  "movbe", "xsave"]
+}
+
+# libs that a portable tree takes from the host, not bundled
+
+hostLibPatterns = [ "ld-linux*", "libc.so*", "libm.so*", "libmvec.so*",
+                    "libpthread.so*", "libdl.so*", "librt.so*",
+                    "libresolv.so*", "libutil.so*", "libnsl.so*",
+                    "libanl.so*", "libcrypt.so*", "libnss_*",
+                    "libthread_db*", "libBrokenLocale*",
+                    "libstdc++.so*", "libgcc_s.so*",
+                    "libGL.so*", "libGLX*", "libGLdispatch*", "libEGL*",
+                    "libOpenGL*", "libglapi*", "libdrm*",
+                    "libX11.so*", "libX11-xcb*", "libxcb.so*",
+                    "libfontconfig*", "libfreetype*", "libasound*" ]
+
 def main():
 
     # globals
@@ -39,7 +91,7 @@ def main():
     thisScriptName = os.path.basename(__file__)
 
     global thisScriptDir
-    thisScriptDir = os.path.dirname(__file__)
+    thisScriptDir = os.path.dirname(os.path.abspath(__file__))
 
     global options
     global package
@@ -115,6 +167,16 @@ def main():
                       'Install dynamic runtime libraries for all binaries, ' + \
                       'in a directory relative to the bin dir. ' + \
                       'System libraries are included.')
+    parser.add_option('--portable',
+                      dest='portable', default=False,
+                      action="store_true",
+                      help=\
+                      'Build a portable tree, to be packaged for all ' + \
+                      'of the distros. Build on the oldest supported ' + \
+                      'distro. The runtime libs, except for glibc and ' + \
+                      'the display driver libs, are bundled and found ' + \
+                      'relative to the binaries. ' + \
+                      'Implies --installAllRuntimeLibs.')
     parser.add_option('--installLroseRuntimeLibs',
                       dest='installLroseRuntimeLibs', default=False,
                       action="store_true",
@@ -142,10 +204,155 @@ def main():
                       dest='use_cmake3', default=False,
                       action="store_true",
                       help='Use cmake3 instead of cmake')
+    parser.add_option('--jobs',
+                      dest='jobs', default=8, type='int',
+                      help='Number of parallel make jobs, default: 8')
+    parser.add_option('--ccache',
+                      dest='ccache', default=False,
+                      action="store_true",
+                      help='Use ccache as the compiler launcher, if available')
+    parser.add_option('--asNeeded',
+                      dest='asNeeded', default=False,
+                      action="store_true",
+                      help='Link with -Wl,-O1,--as-needed, so that the ' + \
+                      'apps only load the libs that they use')
+    parser.add_option('--libVisibility',
+                      dest='libVisibility', default=False,
+                      action="store_true",
+                      help='Compile with -fvisibility-inlines-hidden, and ' + \
+                      'link the shared libs with -Bsymbolic-functions, ' + \
+                      'to reduce the symbol lookups at startup')
+    parser.add_option('--fastLink',
+                      dest='fastLink', default=False,
+                      action="store_true",
+                      help='Link with mold, lld or gold, if available. ' + \
+                      'The apps are not relinked when only the code in ' + \
+                      'a shared lib changes. With --debugInfo, the ' + \
+                      'debug info is split out, and a gdb index is added.')
+    parser.add_option('--debugInfo',
+                      dest='debugInfo', default=False,
+                      action="store_true",
+                      help='Compile with debug info, -g')
+    parser.add_option('--cpuTarget',
+                      dest='cpuTarget', default='x86-64',
+                      help='x86-64 micro-architecture level to compile ' + \
+                      'for: ' + ", ".join(cpuTargets) + '. ' + \
+                      'Default: x86-64, the generic baseline')
+    parser.add_option('--distcc',
+                      dest='distcc', default='',
+                      help='Spread the compiles across these distcc ' + \
+                      'hosts, comma-delimited, as host[:port][/limit]. ' + \
+                      'e.g. localhost/4,worker1/16,172.17.0.1:3633/8. ' + \
+                      'Preprocessing and linking are done locally. ' + \
+                      'The make jobs are raised to the total limit.')
+    parser.add_option('--governor',
+                      dest='governor', default=False,
+                      action="store_true",
+                      help='Run make under build_governor.py, which holds ' + \
+                      'back compiles when memory is short, and retries ' + \
+                      'with fewer jobs if a compiler is OOM-killed')
+    parser.add_option('--governorMinFreeMb',
+                      dest='governorMinFreeMb', default=1024, type='int',
+                      help='Memory for the governor to keep free, in MB, ' + \
+                      'default: 1024')
+    parser.add_option('--governorBudgetMb',
+                      dest='governorBudgetMb', default=0, type='int',
+                      help='Memory budget for the build, in MB. The ' + \
+                      'governor holds the make process tree under it. ' + \
+                      'Turns on --governor. Default: 0, no budget')
+    parser.add_option('--governorStatsPath',
+                      dest='governorStatsPath', default='',
+                      help='File for the peak memory of each compile, ' + \
+                      'used by the governor in later builds. ' + \
+                      'Default: compile-mem-stats.txt in the build dir')
+    parser.add_option('--pch',
+                      dest='pch', default=False,
+                      action="store_true",
+                      help='Use precompiled headers for each lib and app, ' + \
+                      'from the most common includes in its sources. ' + \
+                      'Needs cmake 3.16 or later.')
+    parser.add_option('--pchMaxHeaders',
+                      dest='pchMaxHeaders', default=10, type='int',
+                      help='Max number of headers to precompile for ' + \
+                      'each lib or app, default: 10')
+    parser.add_option('--pchMinFraction',
+                      dest='pchMinFraction', default=0.5, type='float',
+                      help='Only precompile headers included by at least ' + \
+                      'this fraction of the sources, default: 0.5')
+    parser.add_option('--tdrpCacheDir',
+                      dest='tdrpCacheDir', default='',
+                      help='Dir for caching the Params sources created ' + \
+                      'by tdrp_gen. Kept across builds. Default: not used')
+    parser.add_option('--unityBuild',
+                      dest='unityBuild', default=0, type='int',
+                      help='Use a unity build for the libs and apps, ' + \
+                      'combining this number of sources into each unit. ' + \
+                      'Needs cmake 3.16 or later. Default: 0, not used')
+    parser.add_option('--unityExclude',
+                      dest='unityExclude', default='',
+                      help='File with the dirs and sources to leave out ' + \
+                      'of the unity build. Default: ' + \
+                      'lrose_unity_exclude.txt in the scripts dir')
+    parser.add_option('--optProfile',
+                      dest='optProfile', default='',
+                      help='Optimization profile, with the compiler ' + \
+                      'flags for each lib and app dir. ' + \
+                      'e.g. scripts/lrose_opt_profile.cfg. Default: none')
+    parser.add_option('--lto',
+                      dest='lto', default=False,
+                      action="store_true",
+                      help='Use link-time optimization')
+    parser.add_option('--pgo',
+                      dest='pgo', default=False,
+                      action="store_true",
+                      help='Use profile-guided optimization. The apps ' + \
+                      'are built with instrumentation, run on the ' + \
+                      'training workload, then rebuilt using the profiles. ' + \
+                      'Needs --pgoDataDir.')
+    parser.add_option('--pgoDataDir',
+                      dest='pgoDataDir', default='',
+                      help='Dir with the sample data for the PGO ' + \
+                      'training runs')
+    parser.add_option('--pgoTraining',
+                      dest='pgoTraining', default='',
+                      help='File with the commands for the PGO ' + \
+                      'training runs. Default: pgo_training.txt ' + \
+                      'in the scripts dir')
+    parser.add_option('--gitMirrorDir',
+                      dest='gitMirrorDir', default='',
+                      help='Dir for local mirrors of the git repos. ' + \
+                      'If set, repos are fetched into the mirror, ' + \
+                      'and cloned from there. Default: not used.')
+    parser.add_option('--checkoutOnly',
+                      dest='checkoutOnly', default=False,
+                      action="store_true",
+                      help='Check out the repos into the build dir, and exit')
+    parser.add_option('--useCheckout',
+                      dest='useCheckout', default=False,
+                      action="store_true",
+                      help='Use the repos already checked out in the build dir. ' + \
+                      'See --checkoutOnly.')
+    parser.add_option('--subsetPackages',
+                      dest='subsetPackages', default='',
+                      help='Comma-delimited list of packages that are ' + \
+                      'subsets of lrose-core, e.g. lrose-radx. ' + \
+                      'A list of the installed files for each subset ' + \
+                      'is written to the subset list dir, so that it ' + \
+                      'can be packaged from this build.')
+    parser.add_option('--subsetListDir',
+                      dest='subsetListDir', default='',
+                      help='Dir for the subset file lists. ' + \
+                      'Default: <prefix>_subsets')
     parser.add_option('--noApps',
                       dest='noApps', default=False,
                       action="store_true",
                       help='Do not build the lrose core apps')
+    parser.add_option('--strictVerify',
+                      dest='strictVerify', default=False,
+                      action="store_true",
+                      help='Fail the build if any installed app does not ' + \
+                      'run. See verify_install.py. ' + \
+                      'Default is to print a warning.')
     parser.add_option('--withJasper',
                       dest='withJasper', default=False,
                       action="store_true",
@@ -171,6 +378,46 @@ def main():
     if (options.verbose):
         options.debug = True
 
+    if (options.portable):
+        options.installAllRuntimeLibs = True
+        options.installLroseRuntimeLibs = False
+
+    if (options.cpuTarget not in cpuTargets):
+        print("ERROR: invalid cpuTarget: " + options.cpuTarget,
+              file=sys.stderr)
+        print("  options: " + ", ".join(cpuTargets), file=sys.stderr)
+        sys.exit(1)
+
+    if (options.cpuTarget != "x86-64" and os.uname()[4] != "x86_64"):
+        print("WARNING: cpuTarget only applies to x86_64, ignoring: " +
+              options.cpuTarget, file=sys.stderr)
+        options.cpuTarget = "x86-64"
+
+    if (options.pgo and options.checkoutOnly == False and
+        os.path.isdir(options.pgoDataDir) == False):
+        print("ERROR: --pgo needs the sample data dir, --pgoDataDir",
+              file=sys.stderr)
+        sys.exit(1)
+
+    if (len(options.governorStatsPath) == 0):
+        options.governorStatsPath = os.path.join(options.buildDir,
+                                                 "compile-mem-stats.txt")
+
+    if (options.governorBudgetMb > 0):
+        options.governor = True
+
+    if (len(options.pgoTraining) == 0):
+        options.pgoTraining = os.path.join(thisScriptDir, "pgo_training.txt")
+
+    if (len(options.unityExclude) == 0):
+        options.unityExclude = os.path.join(thisScriptDir,
+                                            "lrose_unity_exclude.txt")
+
+    if (options.checkoutOnly and options.useCheckout):
+        print("ERROR: use only one of --checkoutOnly and --useCheckout",
+              file=sys.stderr)
+        sys.exit(1)
+
     # check package name
 
     if (options.package != "lrose-core" and
@@ -183,6 +430,28 @@ def main():
               file=sys.stderr)
         sys.exit(1)
 
+    # check subset packages
+    # these are built as part of lrose-core
+
+    global subsetPackages
+    subsetPackages = []
+    for subset in options.subsetPackages.split(","):
+        if (len(subset.strip()) > 0):
+            subsetPackages.append(subset.strip())
+
+    if (len(subsetPackages) > 0 and options.package != "lrose-core"):
+        print("ERROR: subset packages need --package lrose-core",
+              file=sys.stderr)
+        sys.exit(1)
+
+    for subset in subsetPackages:
+        if (subset != "lrose-radx" and
+            subset != "apar") :
+            print("ERROR: invalid subset package: %s:" % subset,
+                  file=sys.stderr)
+            print("  options: lrose-radx, apar", file=sys.stderr)
+            sys.exit(1)
+
     # For Centos 7, use cmake3
 
     getOSType()
@@ -195,6 +464,39 @@ def main():
     cmakeExec = 'cmake'
     if (options.use_cmake3):
         cmakeExec = 'cmake3'
+
+    # the portable tree runs on distros with this glibc or later
+
+    if (options.portable and (osId != "centos" or osVersion != "7")):
+        print("WARNING: portable build on %s %s" % (osId, osVersion),
+              file=sys.stderr)
+        print("  the oldest supported distro is centos 7", file=sys.stderr)
+
+    # check ccache is available
+
+    if (options.ccache and findExecutable('ccache') == None):
+        print("WARNING: ccache not found, building without it", file=sys.stderr)
+        options.ccache = False
+
+    # check distcc is available, and set the hosts and the jobs
+
+    if (len(options.distcc) > 0):
+        if (findExecutable('distcc') == None):
+            print("WARNING: distcc not found, building without it",
+                  file=sys.stderr)
+            options.distcc = ''
+        else:
+            setupDistcc()
+
+    # select the fast linker
+
+    global fastLinker
+    fastLinker = ''
+    if (options.fastLink):
+        fastLinker = getFastLinker()
+        if (len(fastLinker) == 0):
+            print("WARNING: no fast linker found, using the default linker",
+                  file=sys.stderr)
     
     # for CIDD, set to static linkage
     if (options.package == "lrose-cidd"):
@@ -243,6 +545,9 @@ def main():
     prefixIncludeDir = os.path.join(prefixDir, 'include')
     prefixShareDir = os.path.join(prefixDir, 'share')
 
+    if (len(options.subsetListDir) == 0):
+        options.subsetListDir = os.path.normpath(prefixDir) + "_subsets"
+
     # debug print
 
     if (options.debug):
@@ -254,6 +559,7 @@ def main():
         print("  releaseName: ", releaseName, file=sys.stderr)
         print("  releaseTag: ", releaseTag, file=sys.stderr)
         print("  static: ", options.static, file=sys.stderr)
+        print("  portable: ", options.portable, file=sys.stderr)
         print("  buildDir: ", options.buildDir, file=sys.stderr)
         print("  logDir: ", options.logDir, file=sys.stderr)
         print("  coreDir: ", coreDir, file=sys.stderr)
@@ -271,13 +577,48 @@ def main():
         print("  build_fractl: ", options.build_fractl, file=sys.stderr)
         print("  build_vortrac: ", options.build_vortrac, file=sys.stderr)
         print("  build_samurai: ", options.build_samurai, file=sys.stderr)
+        print("  jobs: ", options.jobs, file=sys.stderr)
+        print("  ccache: ", options.ccache, file=sys.stderr)
+        print("  asNeeded: ", options.asNeeded, file=sys.stderr)
+        print("  libVisibility: ", options.libVisibility, file=sys.stderr)
+        print("  fastLink: ", options.fastLink, file=sys.stderr)
+        print("  fastLinker: ", fastLinker, file=sys.stderr)
+        print("  debugInfo: ", options.debugInfo, file=sys.stderr)
+        print("  cpuTarget: ", options.cpuTarget, file=sys.stderr)
+        print("  distcc: ", options.distcc, file=sys.stderr)
+        print("  governor: ", options.governor, file=sys.stderr)
+        print("  governorMinFreeMb: ", options.governorMinFreeMb,
+              file=sys.stderr)
+        print("  governorBudgetMb: ", options.governorBudgetMb,
+              file=sys.stderr)
+        print("  governorStatsPath: ", options.governorStatsPath,
+              file=sys.stderr)
+        print("  pch: ", options.pch, file=sys.stderr)
+        print("  pchMaxHeaders: ", options.pchMaxHeaders, file=sys.stderr)
+        print("  pchMinFraction: ", options.pchMinFraction, file=sys.stderr)
+        print("  tdrpCacheDir: ", options.tdrpCacheDir, file=sys.stderr)
+        print("  unityBuild: ", options.unityBuild, file=sys.stderr)
+        print("  unityExclude: ", options.unityExclude, file=sys.stderr)
+        print("  optProfile: ", options.optProfile, file=sys.stderr)
+        print("  lto: ", options.lto, file=sys.stderr)
+        print("  pgo: ", options.pgo, file=sys.stderr)
+        print("  pgoDataDir: ", options.pgoDataDir, file=sys.stderr)
+        print("  pgoTraining: ", options.pgoTraining, file=sys.stderr)
+        print("  gitMirrorDir: ", options.gitMirrorDir, file=sys.stderr)
+        print("  checkoutOnly: ", options.checkoutOnly, file=sys.stderr)
+        print("  useCheckout: ", options.useCheckout, file=sys.stderr)
+        print("  subsetPackages: ", subsetPackages, file=sys.stderr)
+        print("  subsetListDir: ", options.subsetListDir, file=sys.stderr)
         print("  noApps: ", options.noApps, file=sys.stderr)
+        print("  strictVerify: ", options.strictVerify, file=sys.stderr)
         print("  iscray: ", options.iscray, file=sys.stderr)
         print("  isfujitsu: ", options.isfujitsu, file=sys.stderr)
         
     # create build dir
+    # if we are using an existing checkout, leave it in place
     
-    createBuildDir()
+    if (options.useCheckout == False):
+        createBuildDir()
 
     # initialize logging
 
@@ -299,8 +640,20 @@ def main():
 
     # get repos from git
 
-    logPath = prepareLogFile("git-checkout");
-    gitCheckout()
+    if (options.useCheckout == False):
+        logPath = prepareLogFile("git-checkout");
+        gitCheckout()
+
+    if (options.checkoutOnly):
+        logFp.close()
+        sys.exit(0)
+
+    # find the libs and apps in the subset packages, from their
+    # makefiles, before the makefiles for this package are installed
+
+    subsetContents = {}
+    for subset in subsetPackages:
+        subsetContents[subset] = getSubsetContents(subset)
 
     # install the distribution-specific makefiles
 
@@ -319,6 +672,26 @@ def main():
     logPath = prepareLogFile("create-CMakeLists-files");
     createCMakeLists()
 
+    # add the compiler flags for each dir from the optimization profile
+
+    if (len(options.optProfile) > 0):
+        applyOptProfile()
+
+    # add the precompiled headers for each lib and app
+
+    if (options.pch):
+        addPrecompiledHeaders()
+
+    # leave the excluded dirs and sources out of the unity build
+
+    if (options.unityBuild > 0):
+        addUnityBuildExclusions()
+
+    # run tdrp_gen through the cache
+
+    if (len(options.tdrpCacheDir) > 0):
+        setupTdrpGenCache()
+
     # create the release information file
     
     createReleaseInfoFile()
@@ -334,13 +707,87 @@ def main():
         buildNetcdf()
 
     # build the package
+    # for PGO, build with instrumentation, run the training workload,
+    # and rebuild using the profiles
+
+    global pgoPhase
+    pgoPhase = ""
+    if (options.pgo):
+        pgoPhase = "generate"
+        buildPackage()
+        logPath = prepareLogFile("pgo-training");
+        runPgoTraining()
+        pgoPhase = "use"
+        shutil.rmtree(os.path.join(codebaseDir, "build"))
 
     buildPackage()
+    pgoPhase = ""
+
+    # install the runtime libs
+    # for a portable build, this is done after the CSU builds,
+    # so that their libs are included
 
-    # detect which dynamic libs are needed
-    # copy the dynamic libraries into a directory relative
-    # to the binary install dir:
-    #     bin/${package}_runtime_libs
+    if (options.portable == False):
+        installRuntimeLibs()
+
+    # perform the install
+
+    logPath = prepareLogFile("do-final-install");
+    doFinalInstall();
+
+    # check the install
+
+    logPath = prepareLogFile("no-logging");
+    checkInstall()
+
+    # build CSU packages
+
+    if (options.build_fractl):
+        logPath = prepareLogFile("build-fractl");
+        buildFractl()
+
+    if (options.build_vortrac):
+        logPath = prepareLogFile("build-vortrac");
+        buildVortrac()
+
+    if (options.build_samurai):
+        logPath = prepareLogFile("build-samurai");
+        buildSamurai()
+
+    # install the split debug info for the installed binaries
+
+    if (options.debugInfo and len(fastLinker) > 0):
+        logPath = prepareLogFile("install-debug-info");
+        installSplitDebugInfo()
+
+    # bundle the runtime libs for the portable tree
+
+    if (options.portable):
+        logPath = prepareLogFile("install-runtime-libs");
+        installRuntimeLibs()
+        removeHostLibs()
+        installQtPlugins()
+
+    # write the file lists for the subset packages
+
+    if (len(subsetPackages) > 0):
+        writeSubsetLists(subsetContents)
+
+    # delete the tmp dir
+
+    if (options.clean):
+        shutil.rmtree(options.buildDir)
+
+    logFp.close()
+    sys.exit(0)
+
+########################################################################
+# detect which dynamic libs are needed
+# copy the dynamic libraries into a directory relative
+# to the binary install dir:
+#     bin/${package}_runtime_libs
+
+def installRuntimeLibs():
 
     os.chdir(codebaseDir)
     if (options.installAllRuntimeLibs):
@@ -365,37 +812,121 @@ def main():
             cmd = cmd + " --debug"
         shellCmd(cmd)
 
-    # perform the install
+########################################################################
+# remove the host libs from the runtime libs of a portable tree
+#
+# glibc must come from the host, since it is tied to the dynamic
+# loader. The GL, X11 client and font libs must match the host's
+# display drivers and config. libstdc++ and libgcc_s also come from
+# the host, since they are backward compatible, and the host GL
+# drivers may need a newer version than the build distro has. With
+# DT_RPATH, a bundled copy would be loaded ahead of the host's.
+# These are left as package dependencies.
+
+def removeHostLibs():
+
+    runtimeLibDir = os.path.join(prefixBinDir, runtimeLibRelDir)
+    if (os.path.isdir(runtimeLibDir) == False):
+        return
 
-    logPath = prepareLogFile("do-final-install");
-    doFinalInstall();
+    for libName in sorted(os.listdir(runtimeLibDir)):
+        if (isHostLib(libName)):
+            if (options.debug):
+                print("  removing host lib: " + libName, file=sys.stderr)
+            os.remove(os.path.join(runtimeLibDir, libName))
 
-    # check the install
+########################################################################
+# check if a lib must come from the host
 
-    logPath = prepareLogFile("no-logging");
-    checkInstall()
+def isHostLib(libName):
 
-    # build CSU packages
+    for pattern in hostLibPatterns:
+        if (fnmatch.fnmatch(libName, pattern)):
+            return True
+    return False
 
-    if (options.build_fractl):
-        logPath = prepareLogFile("build-fractl");
-        buildFractl()
+########################################################################
+# bundle the Qt platform plugins in a portable tree
+#
+# The bundled Qt libs would otherwise look for the plugins in the
+# build distro's plugin dir, which is missing on other distros, or
+# holds the plugins for another Qt version. The xcb and offscreen
+# platform plugins, and the xcb GL integrations, are copied to
+# plugins in the runtime libs dir, with the libs they need. A qt.conf
+# next to the apps points Qt at them.
 
-    if (options.build_vortrac):
-        logPath = prepareLogFile("build-vortrac");
-        buildVortrac()
+def installQtPlugins():
 
-    if (options.build_samurai):
-        logPath = prepareLogFile("build-samurai");
-        buildSamurai()
+    runtimeLibDir = os.path.join(prefixBinDir, runtimeLibRelDir)
+    if (len(glob.glob(os.path.join(runtimeLibDir, "libQt5Core.so*"))) == 0):
+        return
 
-    # delete the tmp dir
+    qtPluginDir = getQtPluginDir()
+    if (len(qtPluginDir) == 0):
+        print("ERROR: cannot find the Qt plugins dir", file=sys.stderr)
+        sys.exit(1)
 
-    if (options.clean):
-        shutil.rmtree(options.buildDir)
+    pluginDir = os.path.join(runtimeLibDir, "plugins")
+    for (subDir, patterns) in [("platforms", ["libqxcb.so",
+                                               "libqoffscreen.so"]),
+                               ("xcbglintegrations", ["*.so"])]:
+        for pattern in patterns:
+            for pluginPath in glob.glob(os.path.join(qtPluginDir, subDir,
+                                                     pattern)):
+                destDir = os.path.join(pluginDir, subDir)
+                if (os.path.isdir(destDir) == False):
+                    os.makedirs(destDir)
+                shutil.copy(pluginPath, destDir)
+                print("  bundling Qt plugin: " + pluginPath, file=logFp)
+                installPluginLibs(pluginPath, runtimeLibDir)
+
+    fp = open(os.path.join(prefixBinDir, "qt.conf"), "w")
+    fp.write("[Paths]\n")
+    fp.write("Prefix = .\n")
+    fp.write("Plugins = " + runtimeLibRelDir + "/plugins\n")
+    fp.close()
 
-    logFp.close()
-    sys.exit(0)
+########################################################################
+# copy the libs that a Qt plugin needs into the runtime libs dir,
+# leaving out the host libs, and the libs already there
+
+def installPluginLibs(pluginPath, runtimeLibDir):
+
+    pipe = subprocess.Popen(["ldd", pluginPath], stdout=subprocess.PIPE)
+    output = pipe.communicate()[0].decode('utf-8', 'replace')
+    for line in output.splitlines():
+        toks = line.split()
+        if (len(toks) < 3 or toks[1] != "=>" or toks[2][0] != '/'):
+            continue
+        libName = toks[0]
+        if (isHostLib(libName) or
+            os.path.exists(os.path.join(runtimeLibDir, libName))):
+            continue
+        shutil.copy(toks[2], os.path.join(runtimeLibDir, libName))
+        print("  bundling lib for Qt plugin: " + toks[2], file=logFp)
+
+########################################################################
+# get the Qt plugins dir on the build host
+# returns empty string if not found
+
+def getQtPluginDir():
+
+    for qmake in ["qmake-qt5", "qmake"]:
+        if (findExecutable(qmake) == None):
+            continue
+        pipe = subprocess.Popen([qmake, "-query", "QT_INSTALL_PLUGINS"],
+                                stdout=subprocess.PIPE)
+        pluginDir = pipe.communicate()[0].decode('utf-8', 'replace').strip()
+        if (os.path.isdir(os.path.join(pluginDir, "platforms"))):
+            return pluginDir
+
+    for pluginDir in ["/usr/lib64/qt5/plugins",
+                      "/usr/lib/x86_64-linux-gnu/qt5/plugins",
+                      "/usr/lib/qt5/plugins"]:
+        if (os.path.isdir(os.path.join(pluginDir, "platforms"))):
+            return pluginDir
+
+    return ""
 
 ########################################################################
 # create the build dir
@@ -442,24 +973,52 @@ def gitCheckout():
 
     # lrose core
 
-    shellCmd("/bin/rm -rf lrose-core")
     if (options.tag == "master"):
-        shellCmd("git clone https://github.com/NCAR/lrose-core")
+        gitClone("https://github.com/NCAR/lrose-core")
     else:
-        shellCmd("git clone --branch " + releaseTag + \
-                 " https://github.com/NCAR/lrose-core")
+        gitClone("https://github.com/NCAR/lrose-core", releaseTag)
 
     # netcdf and hdf5
 
     if (options.buildNetcdf):
-        shellCmd("/bin/rm -rf lrose-netcdf")
-        shellCmd("git clone https://github.com/NCAR/lrose-netcdf")
+        gitClone("https://github.com/NCAR/lrose-netcdf")
 
     # color scales and maps in displays repo
 
     if (options.package != "samurai") :
-        shellCmd("/bin/rm -rf lrose-displays")
-        shellCmd("git clone https://github.com/NCAR/lrose-displays")
+        gitClone("https://github.com/NCAR/lrose-displays")
+
+########################################################################
+# clone a git repo into the current dir
+#
+# If gitMirrorDir is set, the repo is first cloned or fetched into
+# a bare mirror in that dir, and the working copy is cloned from
+# the mirror. Only new objects are downloaded on later runs.
+
+def gitClone(repoUrl, branch = None):
+
+    repoName = os.path.basename(repoUrl)
+    shellCmd("/bin/rm -rf " + repoName)
+
+    branchStr = ""
+    if (branch != None):
+        branchStr = " --branch " + branch
+
+    if (len(options.gitMirrorDir) == 0):
+        shellCmd("git clone" + branchStr + " " + repoUrl)
+        return
+
+    if (os.path.isdir(options.gitMirrorDir) == False):
+        os.makedirs(options.gitMirrorDir)
+    mirrorPath = os.path.join(options.gitMirrorDir, repoName + ".git")
+    if (os.path.isdir(mirrorPath)):
+        shellCmd("git --git-dir=" + mirrorPath + " fetch --prune origin")
+    else:
+        shellCmd("git clone --mirror " + repoUrl + " " + mirrorPath)
+
+    shellCmd("git clone --no-hardlinks" + branchStr + " " + \
+             mirrorPath + " " + repoName)
+    shellCmd("cd " + repoName + "; git remote set-url origin " + repoUrl)
 
 ########################################################################
 # create CMakeLists files
@@ -508,6 +1067,321 @@ def createCMakeLists():
              " --prefix " + prefixDir + iscrayStr +
              isfujitsuStr)
 
+########################################################################
+# apply the optimization profile to the CMakeLists files
+#
+# Each dir with a CMakeLists.txt gets the flags for the first profile
+# that matches it. The dirs below a matched dir inherit the flags,
+# so they are not searched.
+
+def applyOptProfile():
+
+    config = ConfigParser()
+    if (len(config.read(options.optProfile)) == 0):
+        print("ERROR - cannot read optimization profile: ",
+              options.optProfile, file=sys.stderr)
+        sys.exit(1)
+
+    profiles = []
+    for name in config.get("profiles", "order").split():
+        if (config.has_section(name) == False):
+            print("ERROR - no section for profile: ", name, file=sys.stderr)
+            sys.exit(1)
+        profile = {}
+        profile["name"] = name
+        profile["flags"] = " ".join(config.get(name, "flags").split())
+        profile["dirs"] = config.get(name, "dirs").split()
+        profile["nDirs"] = 0
+        profiles.append(profile)
+
+    for (dirPath, dirNames, fileNames) in os.walk(codebaseDir):
+        dirNames.sort()
+        if ("CMakeLists.txt" not in fileNames or dirPath == codebaseDir):
+            continue
+        relDir = os.path.relpath(dirPath, codebaseDir)
+        for profile in profiles:
+            matched = False
+            for pattern in profile["dirs"]:
+                if (fnmatch.fnmatch(relDir, pattern)):
+                    matched = True
+                    break
+            if (matched):
+                addCompileOptions(os.path.join(dirPath, "CMakeLists.txt"),
+                                  profile)
+                profile["nDirs"] = profile["nDirs"] + 1
+                del dirNames[:]
+                break
+
+    for profile in profiles:
+        print("Optimization profile: " + profile["name"] +
+              ", flags: " + profile["flags"] +
+              ", n dirs: " + str(profile["nDirs"]), file=sys.stderr)
+
+########################################################################
+# add the flags for a profile at the top of a CMakeLists file
+
+def addCompileOptions(cmakeListsPath, profile):
+
+    fp = open(cmakeListsPath, "r")
+    contents = fp.read()
+    fp.close()
+
+    fp = open(cmakeListsPath, "w")
+    fp.write("# optimization profile: " + profile["name"] + "\n")
+    fp.write("add_compile_options(" + profile["flags"] + ")\n\n")
+    fp.write(contents)
+    fp.close()
+
+    if (options.verbose):
+        print("  " + profile["name"] + ": " + cmakeListsPath, file=logFp)
+
+########################################################################
+# add precompiled headers to the CMakeLists files
+#
+# For each lib and app target, the angle-bracket includes in the C++
+# sources are counted. The most common, up to pchMaxHeaders, that are
+# included by at least pchMinFraction of the sources, are added with
+# target_precompile_headers. Quoted includes are local to the target,
+# and change often, so they are not used. The headers only apply to
+# the C++ sources, since some targets also have C sources.
+
+def addPrecompiledHeaders():
+
+    nTargets = 0
+    for (dirPath, dirNames, fileNames) in os.walk(codebaseDir):
+        dirNames.sort()
+        if ("CMakeLists.txt" not in fileNames):
+            continue
+        cmakeListsPath = os.path.join(dirPath, "CMakeLists.txt")
+        targetNames = getCmakeTargetNames(cmakeListsPath)
+        if (len(targetNames) == 0):
+            continue
+        headers = getCommonIncludes(dirPath)
+        if (len(headers) == 0):
+            continue
+        fp = open(cmakeListsPath, "a")
+        fp.write("\n# precompiled headers, from the most common includes\n")
+        fp.write("if (${CMAKE_VERSION} VERSION_GREATER_EQUAL \"3.16\")\n")
+        for targetName in targetNames:
+            fp.write("  target_precompile_headers(" + targetName +
+                     " PRIVATE\n")
+            for header in headers:
+                fp.write("    \"$<$<COMPILE_LANGUAGE:CXX>:<" + header +
+                         "$<ANGLE-R>>\"\n")
+            fp.write("  )\n")
+        fp.write("endif()\n")
+        fp.close()
+        nTargets = nTargets + len(targetNames)
+        if (options.verbose):
+            print("  pch for " + " ".join(targetNames) + ": " +
+                  " ".join(headers), file=logFp)
+
+    print("Precompiled headers, n targets: " + str(nTargets), file=sys.stderr)
+
+########################################################################
+# leave dirs and sources out of the unity build
+#
+# The exclude file has one glob pattern per line, relative to the
+# codebase dir. A pattern that matches the dir of a lib or app turns
+# the unity build off for its targets. A pattern that matches a source
+# file leaves just that file out of the units, so it is compiled on
+# its own. This is for code that cannot be combined, for example
+# sources with clashing static names or macros.
+
+def addUnityBuildExclusions():
+
+    try:
+        fp = open(options.unityExclude, "r")
+    except IOError as e:
+        print("ERROR: cannot open unity build exclude file: " +
+              options.unityExclude, file=sys.stderr)
+        sys.exit(1)
+    patterns = []
+    for line in fp.readlines():
+        line = line.strip()
+        if (len(line) == 0 or line[0] == '#'):
+            continue
+        patterns.append(line)
+    fp.close()
+
+    nTargets = 0
+    nSources = 0
+    for (dirPath, dirNames, fileNames) in os.walk(codebaseDir):
+        dirNames.sort()
+        if ("CMakeLists.txt" not in fileNames):
+            continue
+        cmakeListsPath = os.path.join(dirPath, "CMakeLists.txt")
+        targetNames = getCmakeTargetNames(cmakeListsPath)
+        if (len(targetNames) == 0):
+            continue
+        relDir = os.path.relpath(dirPath, codebaseDir)
+        if (matchesAny(relDir, patterns)):
+            fp = open(cmakeListsPath, "a")
+            fp.write("\n# excluded from the unity build\n")
+            fp.write("set_target_properties(" + " ".join(targetNames) +
+                     " PROPERTIES UNITY_BUILD OFF)\n")
+            fp.close()
+            nTargets = nTargets + len(targetNames)
+            if (options.verbose):
+                print("  no unity build: " + relDir, file=logFp)
+            continue
+        sources = []
+        for sourcePath in getTargetSources(dirPath):
+            relPath = os.path.relpath(sourcePath, codebaseDir)
+            if (matchesAny(relPath, patterns)):
+                sources.append(os.path.relpath(sourcePath, dirPath))
+        if (len(sources) == 0):
+            continue
+        fp = open(cmakeListsPath, "a")
+        fp.write("\n# compiled outside of the unity build\n")
+        fp.write("set_source_files_properties(" + " ".join(sources) +
+                 " PROPERTIES SKIP_UNITY_BUILD_INCLUSION ON)\n")
+        fp.close()
+        nSources = nSources + len(sources)
+        if (options.verbose):
+            print("  no unity build: " + relDir + ": " + " ".join(sources),
+                  file=logFp)
+
+    print("Unity build, batch size: " + str(options.unityBuild) +
+          ", n targets excluded: " + str(nTargets) +
+          ", n sources excluded: " + str(nSources), file=sys.stderr)
+
+########################################################################
+# run tdrp_gen through tdrp_gen_cache.py
+#
+# A wrapper named tdrp_gen is written to a dir in the build dir, which
+# is put first on the path. The CMakeLists files that give the path of
+# the installed tdrp_gen are changed to use the wrapper instead.
+
+def setupTdrpGenCache():
+
+    wrapperDir = os.path.join(options.buildDir, "tdrp-gen-cache")
+    if (os.path.isdir(wrapperDir) == False):
+        os.makedirs(wrapperDir)
+    wrapperPath = os.path.join(wrapperDir, "tdrp_gen")
+    fp = open(wrapperPath, "w")
+    fp.write("#!/bin/sh\n")
+    fp.write("exec " + sys.executable + " " +
+             os.path.join(thisScriptDir, "tdrp_gen_cache.py") +
+             " --cacheDir " + os.path.abspath(options.tdrpCacheDir) +
+             " --tdrpGen " + os.path.join(prefixBinDir, "tdrp_gen") +
+             " -- \"$@\"\n")
+    fp.close()
+    os.chmod(wrapperPath, 0o755)
+
+    os.environ["PATH"] = wrapperDir + os.pathsep + \
+                         os.environ.get("PATH", "")
+
+    pattern = re.compile(r'\$\{TDRP_EXECUTABLE\}|\$<TARGET_FILE:tdrp_gen>|' +
+                         r'[^\s;&"()]*/bin/tdrp_gen(?![\w.])')
+    nFiles = 0
+    for (dirPath, dirNames, fileNames) in os.walk(codebaseDir):
+        if ("CMakeLists.txt" not in fileNames):
+            continue
+        cmakeListsPath = os.path.join(dirPath, "CMakeLists.txt")
+        fp = open(cmakeListsPath, "r")
+        contents = fp.read()
+        fp.close()
+        (contents, nSubs) = pattern.subn(wrapperPath, contents)
+        if (nSubs == 0):
+            continue
+        fp = open(cmakeListsPath, "w")
+        fp.write(contents)
+        fp.close()
+        nFiles = nFiles + 1
+
+    print("tdrp_gen cache: " + options.tdrpCacheDir +
+          ", n CMakeLists changed: " + str(nFiles), file=sys.stderr)
+
+########################################################################
+# check if a path matches any of a list of glob patterns
+
+def matchesAny(path, patterns):
+
+    for pattern in patterns:
+        if (fnmatch.fnmatch(path, pattern)):
+            return True
+    return False
+
+########################################################################
+# get the C and C++ sources of a target. Subdirs with their own
+# CMakeLists belong to other targets, and are not searched.
+
+def getTargetSources(targetDir):
+
+    sources = []
+    for (dirPath, dirNames, fileNames) in os.walk(targetDir):
+        dirNames.sort()
+        if (dirPath != targetDir and "CMakeLists.txt" in fileNames):
+            del dirNames[:]
+            continue
+        for fileName in sorted(fileNames):
+            if (os.path.splitext(fileName)[1] in [".c", ".cc", ".cpp", ".cxx"]):
+                sources.append(os.path.join(dirPath, fileName))
+
+    return sources
+
+########################################################################
+# get the names of the lib and app targets in a CMakeLists file
+
+def getCmakeTargetNames(cmakeListsPath):
+
+    fp = open(cmakeListsPath, "r")
+    contents = fp.read()
+    fp.close()
+
+    targetNames = []
+    pattern = r'^\s*add_(?:library|executable)\s*\(\s*([^\s)]+)'
+    for match in re.finditer(pattern, contents, re.MULTILINE | re.IGNORECASE):
+        if (match.group(1) not in targetNames):
+            targetNames.append(match.group(1))
+
+    return targetNames
+
+########################################################################
+# get the most common angle-bracket includes in the C++ sources
+# of a target. Subdirs with their own CMakeLists belong to other
+# targets, and are not searched.
+
+def getCommonIncludes(targetDir):
+
+    includePattern = re.compile(r'^\s*#\s*include\s*<([^>]+)>')
+    counts = {}
+    nSources = 0
+
+    for (dirPath, dirNames, fileNames) in os.walk(targetDir):
+        if (dirPath != targetDir and "CMakeLists.txt" in fileNames):
+            del dirNames[:]
+            continue
+        for fileName in fileNames:
+            if (os.path.splitext(fileName)[1] not in [".cc", ".cpp", ".cxx"]):
+                continue
+            try:
+                fp = open(os.path.join(dirPath, fileName), "r")
+                lines = fp.readlines()
+                fp.close()
+            except (IOError, UnicodeDecodeError):
+                continue
+            nSources = nSources + 1
+            includes = set()
+            for line in lines:
+                match = includePattern.match(line)
+                if (match):
+                    includes.add(match.group(1).strip())
+            for include in includes:
+                counts[include] = counts.get(include, 0) + 1
+
+    # a pch is not worth it for a few sources
+
+    if (nSources < 4):
+        return []
+
+    minCount = max(2, int(nSources * options.pchMinFraction + 0.5))
+    headers = [header for header in counts if counts[header] >= minCount]
+    headers.sort(key=lambda x: (-counts[x], x))
+
+    return headers[:options.pchMaxHeaders]
+
 ########################################################################
 # write release information file
 
@@ -641,6 +1515,164 @@ def trimToMakefiles(subDir):
                 # check this child's required subdirectories (recurse)
                 trimToMakefiles(os.path.join(subDir, entry))
 
+########################################################################
+# Get the libs and apps in a subset package, from its makefiles
+#
+# The subset makefiles are named makefile.<package>, as used by
+# installPackageMakefiles.py. Where a dir has no makefile for the
+# subset, the generic makefile applies.
+#
+# Returns a tuple of the lib names, and the app names
+
+def getSubsetContents(subset):
+
+    libNames = getSubsetSubDirs(os.path.join(codebaseDir, "libs"), subset)
+
+    appNames = []
+    findSubsetApps(os.path.join(codebaseDir, "apps"), subset, appNames)
+
+    if (options.debug):
+        print("Subset package: " + subset, file=sys.stderr)
+        print("  libs: " + " ".join(libNames), file=sys.stderr)
+        print("  n apps: " + str(len(appNames)), file=sys.stderr)
+
+    return (libNames, appNames)
+
+########################################################################
+# get the SUB_DIRS for a subset package in a dir
+
+def getSubsetSubDirs(dirPath, subset):
+
+    for makefileName in ["makefile." + subset, "makefile", "Makefile"]:
+        makefilePath = os.path.join(dirPath, makefileName)
+        if (os.path.isfile(makefilePath)):
+            return getValueListForKey(makefilePath, "SUB_DIRS")
+
+    return []
+
+########################################################################
+# find the apps in a subset package, recursing down the SUB_DIRS
+# the leaf dirs hold the apps, named by TARGET_FILE in the makefile
+
+def findSubsetApps(dirPath, subset, appNames):
+
+    subNames = getSubsetSubDirs(dirPath, subset)
+
+    if (len(subNames) == 0):
+        targetNames = getValueListForKey(os.path.join(dirPath, "makefile"),
+                                         "TARGET_FILE")
+        if (len(targetNames) == 0):
+            targetNames = getValueListForKey(os.path.join(dirPath, "Makefile"),
+                                             "TARGET_FILE")
+        if (len(targetNames) == 0):
+            targetNames = [os.path.basename(dirPath)]
+        for targetName in targetNames:
+            if (targetName not in appNames):
+                appNames.append(targetName)
+        return
+
+    for subName in subNames:
+        subPath = os.path.join(dirPath, subName)
+        if (os.path.isdir(subPath)):
+            findSubsetApps(subPath, subset, appNames)
+
+########################################################################
+# write the list of installed files for each subset package
+#
+# The paths are relative to the prefix. The subset gets the libs and
+# headers for its libs, the apps, the runtime libs dir and the docs.
+# It also gets the shared libs in the prefix that its apps need, e.g.
+# the netcdf and hdf5 libs with --buildNetcdf.
+
+def writeSubsetLists(subsetContents):
+
+    if (os.path.isdir(options.subsetListDir) == False):
+        os.makedirs(options.subsetListDir)
+
+    for subset in subsetPackages:
+
+        (libNames, appNames) = subsetContents[subset]
+
+        patterns = ["LICENSE.txt", "release_notes/*", "docs/*",
+                    "bin/" + runtimeLibRelDir + "/*"]
+        for libName in libNames:
+            patterns.append("lib/lib" + libName + ".*")
+            patterns.append("include/" + libName + "/*")
+        for appName in appNames:
+            patterns.append("bin/" + appName)
+        for libFileName in getNeededPrefixLibs(appNames):
+            patterns.append("lib/" + libFileName.split(".so")[0] + ".*")
+
+        relPaths = []
+        for (dirPath, dirNames, fileNames) in os.walk(prefixDir):
+            for fileName in fileNames:
+                relPath = os.path.relpath(os.path.join(dirPath, fileName),
+                                          prefixDir)
+                for pattern in patterns:
+                    if (fnmatch.fnmatch(relPath, pattern)):
+                        relPaths.append(relPath)
+                        break
+
+        listPath = os.path.join(options.subsetListDir, subset + ".files")
+        listFp = open(listPath, "w")
+        for relPath in sorted(relPaths):
+            listFp.write(relPath + "\n")
+        listFp.close()
+
+        print("Wrote subset list: " + listPath + ", n files: " +
+              str(len(relPaths)), file=sys.stderr)
+
+########################################################################
+# get the shared libs in the prefix lib dir that a list of apps need,
+# following the NEEDED entries of the apps, and then of those libs
+# returns the sorted list of lib file names
+
+def getNeededPrefixLibs(appNames):
+
+    neededNames = []
+    pending = []
+    for appName in appNames:
+        appPath = os.path.join(prefixBinDir, appName)
+        if (os.path.isfile(appPath)):
+            pending.append(appPath)
+
+    while (len(pending) > 0):
+        for libName in getNeededLibs(pending.pop()):
+            libPath = os.path.join(prefixLibDir, libName)
+            if (libName not in neededNames and os.path.exists(libPath)):
+                neededNames.append(libName)
+                pending.append(libPath)
+
+    return sorted(neededNames)
+
+########################################################################
+# get the NEEDED entries from the dynamic section of an ELF file
+# returns an empty list if it is not an ELF file
+
+def getNeededLibs(filePath):
+
+    fp = open(filePath, "rb")
+    magic = fp.read(4)
+    fp.close()
+    if (magic != b'\x7fELF'):
+        return []
+
+    pipe = subprocess.Popen(["readelf", "--dynamic", filePath],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    output = pipe.communicate()[0].decode('utf-8', 'replace')
+
+    libNames = []
+    for line in output.splitlines():
+        if (line.find("(NEEDED)") < 0):
+            continue
+        start = line.find("[")
+        end = line.find("]", start)
+        if (start >= 0 and end > start):
+            libNames.append(line[start + 1:end])
+
+    return libNames
+
 ########################################################################
 # build netCDF
 
@@ -667,14 +1699,27 @@ def buildPackage():
     os.environ["LDFLAGS"] = "-L" + prefixLibDir + " " + \
                             "-Wl,--enable-new-dtags," + \
                             "-rpath," + \
-                            "'$$ORIGIN/" + runtimeLibRelDir + \
-                            ":$$ORIGIN/../lib" + \
-                            ":" + prefixLibDir + \
-                            ":" + prefixLibDir + "'"
+                            "'" + getRpath() + "'"
+
+    # for a portable tree, use only the relative paths, so that the
+    # tree can be moved. DT_RPATH is used instead of DT_RUNPATH, since
+    # it also applies to the libs that the bundled libs need.
+
+    if (options.portable):
+        os.environ["LDFLAGS"] = "-L" + prefixLibDir + " " + \
+                                "-Wl,--disable-new-dtags," + \
+                                "-rpath," + \
+                                "'" + getRpath() + "'"
+
+    if (options.asNeeded):
+        os.environ["LDFLAGS"] = os.environ["LDFLAGS"] + \
+                                " -Wl,-O1,--as-needed"
 
     if (sys.platform == "darwin"):
         os.environ["PKG_CONFIG_PATH"] = "/usr/local/opt/qt/lib/pkgconfig"
 
+    setReproducibleEnv()
+
     # print out environment
 
     logPath = prepareLogFile("print-environment");
@@ -687,21 +1732,25 @@ def buildPackage():
     cmakeBuildDir = os.path.join(codebaseDir, "build")
     os.makedirs(cmakeBuildDir)
     os.chdir(cmakeBuildDir)
-    cmd = cmakeExec + " .."
+    cmd = getCmakeCmd()
+    if (options.unityBuild > 0):
+        cmd = cmd + " -DCMAKE_UNITY_BUILD=ON" + \
+              " -DCMAKE_UNITY_BUILD_BATCH_SIZE=" + str(options.unityBuild)
+    cmd = cmd + " .."
     shellCmd(cmd)
     
     # build the libraries
 
     logPath = prepareLogFile("build-libs");
     os.chdir(os.path.join(cmakeBuildDir, "libs"))
-    cmd = "make -j 8"
+    cmd = getMakeCmd("build-libs")
     shellCmd(cmd)
 
     # install the libraries
 
     logPath = prepareLogFile("install-libs");
 
-    cmd = "make -j 8 install/strip"
+    cmd = getMakeCmd("install-libs", getInstallTarget())
     shellCmd(cmd)
 
     if (options.noApps == False):
@@ -710,22 +1759,175 @@ def buildPackage():
 
         logPath = prepareLogFile("build-tdrp-gen");
         os.chdir(os.path.join(cmakeBuildDir, "apps/tdrp/src/tdrp_gen"))
-        cmd = "make install/strip"
+        cmd = "make " + getInstallTarget()
         shellCmd(cmd)
         
         # build the apps
 
         logPath = prepareLogFile("build-apps");
         os.chdir(os.path.join(cmakeBuildDir, "apps"))
-        cmd = "make -j 8"
+        cmd = getMakeCmd("build-apps")
         shellCmd(cmd)
         
         # install the apps
         
         logPath = prepareLogFile("install-apps");
-        cmd = "make -j 8 install/strip"
+        cmd = getMakeCmd("install-apps", getInstallTarget())
         shellCmd(cmd)
 
+########################################################################
+# get the make target for the install
+# with --debugInfo, the binaries are not stripped
+
+def getInstallTarget():
+
+    if (options.debugInfo):
+        return "install"
+    return "install/strip"
+
+########################################################################
+# install the split debug info
+#
+# With -gsplit-dwarf, the debug info is in .dwo files in the build
+# dir, which is removed after the build. For each installed binary,
+# the .dwo files it refers to are packed into a .dwp file next to it,
+# which gdb finds from the name of the binary. The dirs in the binary
+# are mapped to mappedBuildDir, so they are mapped back to find
+# the .dwo files.
+
+def installSplitDebugInfo():
+
+    dwpPath = findExecutable("dwp")
+    if (dwpPath == None):
+        print("WARNING: dwp not found, the split debug info " +
+              "is not installed", file=sys.stderr)
+        return
+
+    buildDir = os.path.abspath(options.buildDir)
+    nFiles = 0
+    for installDir in [prefixBinDir, prefixLibDir]:
+        for (dirPath, dirNames, fileNames) in os.walk(installDir):
+            for fileName in sorted(fileNames):
+                filePath = os.path.join(dirPath, fileName)
+                if (os.path.islink(filePath) or fileName.endswith(".dwp")):
+                    continue
+                dwoPaths = []
+                for dwoPath in getDwoPaths(filePath):
+                    if (dwoPath.startswith(mappedBuildDir)):
+                        dwoPath = buildDir + dwoPath[len(mappedBuildDir):]
+                    if (os.path.isfile(dwoPath) and dwoPath not in dwoPaths):
+                        dwoPaths.append(dwoPath)
+                if (len(dwoPaths) == 0):
+                    continue
+                cmd = dwpPath + " -o " + filePath + ".dwp " + \
+                      " ".join(dwoPaths)
+                shellCmd(cmd)
+                nFiles = nFiles + 1
+
+    print("Split debug info, n .dwp files: " + str(nFiles), file=sys.stderr)
+
+########################################################################
+# get the paths of the .dwo files that a binary refers to,
+# from the comp dir and dwo name in each skeleton compile unit
+# returns an empty list if it is not an ELF file
+
+def getDwoPaths(filePath):
+
+    fp = open(filePath, "rb")
+    magic = fp.read(4)
+    fp.close()
+    if (magic != b'\x7fELF'):
+        return []
+
+    pipe = subprocess.Popen(["readelf", "--debug-dump=info",
+                             "--dwarf-depth=1", filePath],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    output = pipe.communicate()[0].decode('utf-8', 'replace')
+
+    # the attributes may be in either order, so the path is
+    # added at the end of each compile unit
+
+    dwoPaths = []
+    compDir = ""
+    dwoName = ""
+    for line in output.splitlines() + ["Compilation Unit @ end"]:
+        if (line.find("Compilation Unit @") >= 0):
+            if (len(dwoName) > 0):
+                dwoPaths.append(os.path.join(compDir, dwoName))
+            compDir = ""
+            dwoName = ""
+        elif (line.find("DW_AT_comp_dir") >= 0):
+            compDir = line.split(": ")[-1].strip()
+        elif (line.find("DW_AT_GNU_dwo_name") >= 0 or
+              line.find("DW_AT_dwo_name") >= 0):
+            dwoName = line.split(": ")[-1].strip()
+
+    return dwoPaths
+
+########################################################################
+# get the make command for a build step, with the parallel jobs
+#
+# With the governor, make is run under build_governor.py, which adds
+# the -j option, and retries with fewer jobs if a compile is killed
+# for lack of memory. The report for the step goes in the log dir.
+
+def getMakeCmd(stepName, target = ""):
+
+    if (options.governor == False):
+        return ("make -j " + str(options.jobs) + " " + target).strip()
+
+    reportPath = os.path.join(options.logDir,
+                              "build-governor." + stepName + ".txt")
+    cmd = getGovernorPath() + \
+          " --jobs " + str(options.jobs) + \
+          " --minFreeMb " + str(options.governorMinFreeMb) + \
+          " --budgetMb " + str(options.governorBudgetMb) + \
+          " --statsPath " + getGovernorStatsPath() + \
+          " --reportPath " + reportPath + \
+          " make " + target
+    return cmd.strip()
+
+########################################################################
+# get the path of the governor script
+
+def getGovernorPath():
+
+    return os.path.join(thisScriptDir, "build_governor.py")
+
+########################################################################
+# get the path of the governor stats file
+# this holds the peak memory for each compile. Put it outside the
+# build dir, so that the next build can use the peaks from this one.
+
+def getGovernorStatsPath():
+
+    return options.governorStatsPath
+
+########################################################################
+# get the rpath for the binaries
+#
+# Each dir in the rpath is searched for every lib that an app loads,
+# so the list is kept short. The runtime libs dir is only included
+# if the libs are copied there, and the prefix lib dir is left out
+# if it is the same as ../lib relative to the bin dir.
+
+def getRpath():
+
+    rpathDirs = []
+    if (options.installAllRuntimeLibs or options.installLroseRuntimeLibs):
+        rpathDirs.append("$$ORIGIN/" + runtimeLibRelDir)
+    rpathDirs.append("$$ORIGIN/../lib")
+
+    if (options.portable):
+        # for the libs in lib, to find the bundled libs
+        rpathDirs.append("$$ORIGIN/../bin/" + runtimeLibRelDir)
+    elif (os.path.normpath(prefixLibDir) !=
+          os.path.normpath(os.path.join(prefixBinDir, "..", "lib"))):
+        rpathDirs.append(prefixLibDir)
+
+    return ":".join(rpathDirs)
+
 ########################################################################
 # perform final install
 
@@ -767,6 +1969,28 @@ def checkInstall():
                  " --prefix " + prefixDir + \
                  " --package " + package)
         print("====================================================")
+
+        # run each app, to check that it loads its libs and starts up
+        # the report has the startup time for each app
+
+        print(("============= Verifying apps for " + package + " ============="))
+        reportPath = os.path.join(options.logDir, "verify-install.txt")
+        cmd = [sys.executable,
+               os.path.join(thisScriptDir, "verify_install.py"),
+               "--prefix", prefixDir,
+               "--nThreads", str(options.jobs),
+               "--reportPath", reportPath]
+        if (options.debug):
+            cmd.append("--debug")
+        retcode = subprocess.call(cmd)
+        if (retcode != 0):
+            if (options.strictVerify):
+                print("ERROR: some apps failed to run, see: " + reportPath,
+                      file=sys.stderr)
+                sys.exit(1)
+            print("WARNING: some apps failed to run, see: " + reportPath,
+                  file=sys.stderr)
+        print("====================================================")
     
     print("**************************************************")
     print("*** Done building auto release *******************")
@@ -822,8 +2046,7 @@ def buildFractl():
     # check out fractl
 
     os.chdir(options.buildDir)
-    shellCmd("/bin/rm -rf fractl")
-    shellCmd("git clone https://github.com/mmbell/fractl")
+    gitClone("https://github.com/mmbell/fractl")
 
     # run cmake to create makefiles
 
@@ -832,12 +2055,12 @@ def buildFractl():
     os.makedirs(cmakeBuildDir)
     os.chdir(cmakeBuildDir)
     
-    cmd = cmakeExec + " .."
+    cmd = getCmakeCmd() + " .."
     shellCmd(cmd)
     
     # do the build and install
 
-    cmd = "make -k -j 8 install/strip"
+    cmd = "make -k -j " + str(options.jobs) + " " + getInstallTarget()
     shellCmd(cmd)
 
     return
@@ -859,8 +2082,7 @@ def buildVortrac():
     # check out vortrac
 
     os.chdir(options.buildDir)
-    shellCmd("/bin/rm -rf vortrac")
-    shellCmd("git clone https://github.com/mmbell/vortrac")
+    gitClone("https://github.com/mmbell/vortrac")
 
     # run cmake to create makefiles
 
@@ -871,12 +2093,12 @@ def buildVortrac():
     
     # run cmake to create makefiles - in-source build
     
-    cmd = cmakeExec + " .."
+    cmd = getCmakeCmd() + " .."
     shellCmd(cmd)
     
     # do the build and install
     
-    cmd = "make -k -j 8 install/strip"
+    cmd = "make -k -j " + str(options.jobs) + " " + getInstallTarget()
     shellCmd(cmd)
     
     # install resources
@@ -910,8 +2132,7 @@ def buildSamurai():
     # check out samurai
 
     os.chdir(options.buildDir)
-    shellCmd("/bin/rm -rf samurai")
-    shellCmd("git clone https://github.com/mmbell/samurai")
+    gitClone("https://github.com/mmbell/samurai")
     
     # run cmake to create makefiles - in-source build
     
@@ -920,16 +2141,387 @@ def buildSamurai():
     os.makedirs(cmakeBuildDir)
     os.chdir(cmakeBuildDir)
 
-    cmd = cmakeExec + " .."
+    cmd = getCmakeCmd() + " .."
     shellCmd(cmd)
 
     # do the build and install
 
-    cmd = "make -k -j 8 install/strip"
+    cmd = "make -k -j " + str(options.jobs) + " " + getInstallTarget()
     shellCmd(cmd)
 
     return
 
+########################################################################
+# get the cmake command, with the options common to all builds
+
+def getCmakeCmd():
+
+    cmd = cmakeExec
+
+    # the governor launcher records the memory used by each compile,
+    # and runs ccache, if in use. With distcc, ccache passes the
+    # preprocessed source to distcc, using CCACHE_PREFIX.
+
+    launcher = []
+    if (options.governor):
+        launcher = [getGovernorPath(), "--compile",
+                    "--minFreeMb", str(options.governorMinFreeMb),
+                    "--budgetMb", str(options.governorBudgetMb),
+                    "--statsPath", getGovernorStatsPath()]
+    if (options.ccache):
+        launcher.append("ccache")
+    elif (len(options.distcc) > 0):
+        launcher.append("distcc")
+    if (len(launcher) > 0):
+        cmd = cmd + " -DCMAKE_C_COMPILER_LAUNCHER='" + ";".join(launcher) + \
+              "' -DCMAKE_CXX_COMPILER_LAUNCHER='" + ";".join(launcher) + "'"
+
+    # extra compile and link flags
+    # cmake adds these to the flags from CFLAGS, CXXFLAGS and LDFLAGS
+    #   compileFlags: C and C++
+    #   linkFlags: apps and shared libs
+
+    compileFlags = []
+    cxxFlags = []
+    linkFlags = []
+    sharedLinkFlags = []
+
+    compileFlags = compileFlags + getPrefixMapFlags()
+    compileFlags = compileFlags + getCpuTargetFlags()
+
+    if (options.libVisibility):
+        cxxFlags.append("-fvisibility-inlines-hidden")
+        sharedLinkFlags.append("-Wl,-Bsymbolic-functions")
+
+    # with a fast linker, the apps are not relinked if only the code
+    # in a shared lib changes, since the lib symbols are bound at run time.
+    # The split debug info stays in .dwo files next to the objects, so
+    # there is less for the linker to copy.
+
+    if (len(fastLinker) > 0):
+        linkFlags.append("-fuse-ld=" + fastLinker)
+        cmd = cmd + " -DCMAKE_LINK_DEPENDS_NO_SHARED=ON"
+
+    if (options.debugInfo):
+        compileFlags.append("-g")
+        if (len(fastLinker) > 0):
+            compileFlags.append("-gsplit-dwarf")
+            linkFlags.append("-Wl,--gdb-index")
+
+    if (options.lto):
+        if (isClang()):
+            ltoFlag = "-flto=thin"
+        else:
+            ltoFlag = "-flto=" + str(options.jobs)
+        compileFlags.append(ltoFlag)
+        linkFlags.append(ltoFlag)
+        # the static libs need the archiver with the LTO plugin
+        for (cmakeVar, tool) in [("CMAKE_AR", "gcc-ar"),
+                                 ("CMAKE_RANLIB", "gcc-ranlib")]:
+            toolPath = findExecutable(tool)
+            if (toolPath != None and isClang() == False):
+                cmd = cmd + " -D" + cmakeVar + "=" + toolPath
+
+    pgoFlags = getPgoFlags()
+    compileFlags = compileFlags + pgoFlags
+    linkFlags = linkFlags + pgoFlags
+
+    cFlags = compileFlags
+    cxxFlags = compileFlags + cxxFlags
+    sharedLinkFlags = linkFlags + sharedLinkFlags
+
+    for (cmakeVar, flags) in [("CMAKE_C_FLAGS_INIT", cFlags),
+                              ("CMAKE_CXX_FLAGS_INIT", cxxFlags),
+                              ("CMAKE_EXE_LINKER_FLAGS_INIT", linkFlags),
+                              ("CMAKE_SHARED_LINKER_FLAGS_INIT",
+                               sharedLinkFlags)]:
+        if (len(flags) > 0):
+            cmd = cmd + " -D" + cmakeVar + "='" + " ".join(flags) + "'"
+
+    return cmd
+
+########################################################################
+# get the fastest linker that is available, and supported by the compiler
+# returns the name for -fuse-ld, or empty string if there is none
+#
+# gcc supports mold from version 12, and lld from version 9. lld cannot
+# read the gcc LTO objects, so it is not used for a gcc LTO build.
+
+def getFastLinker():
+
+    gccVersion = 0
+    if (isClang() == False):
+        gccVersion = getGccMajorVersion()
+
+    for (linker, exeName, minGccVersion) in [("mold", "mold", 12),
+                                              ("lld", "ld.lld", 9),
+                                              ("gold", "ld.gold", 0)]:
+        if (findExecutable(exeName) == None):
+            continue
+        if (isClang() == False):
+            if (gccVersion < minGccVersion):
+                continue
+            if (linker == "lld" and options.lto):
+                continue
+        return linker
+
+    return ''
+
+########################################################################
+# set up distcc
+#
+# The hosts go in DISTCC_HOSTS, which distcc reads. The make jobs are
+# raised to the total of the host limits, so that all of the workers
+# are kept busy. distcc uses a limit of 4 for a host with no /limit,
+# and 2 for localhost.
+
+def setupDistcc():
+
+    hosts = []
+    nJobs = 0
+    for host in options.distcc.split(','):
+        host = host.strip()
+        if (len(host) == 0):
+            continue
+        hosts.append(host)
+        if (host.find('/') >= 0):
+            try:
+                nJobs = nJobs + int(host.split('/')[1])
+                continue
+            except ValueError:
+                print("ERROR: bad distcc host: " + host, file=sys.stderr)
+                sys.exit(1)
+        if (host.startswith("localhost")):
+            nJobs = nJobs + 2
+        else:
+            nJobs = nJobs + 4
+
+    os.environ["DISTCC_HOSTS"] = " ".join(hosts)
+    if (options.ccache):
+        os.environ["CCACHE_PREFIX"] = "distcc"
+
+    if (nJobs > options.jobs):
+        print("INFO: distcc, raising make jobs from " + str(options.jobs) +
+              " to " + str(nJobs), file=sys.stderr)
+        options.jobs = nJobs
+
+########################################################################
+# set the environment so that the build does not depend on the
+# build dir or the build time
+#
+# SOURCE_DATE_EPOCH is used by the compiler for __DATE__ and __TIME__.
+# It is set to the time of the last lrose-core commit, so the same
+# source always gives the same objects.
+#
+# ccache hashes the paths relative to CCACHE_BASEDIR, and does not
+# hash the working dir, so the cache hits across build dirs.
+
+def setReproducibleEnv():
+
+    if ("SOURCE_DATE_EPOCH" not in os.environ):
+        try:
+            pipe = subprocess.Popen(["git", "log", "-1", "--format=%ct"],
+                                    cwd=coreDir, stdout=subprocess.PIPE)
+            epoch = pipe.communicate()[0].decode('utf-8', 'replace').strip()
+            if (epoch.isdigit()):
+                os.environ["SOURCE_DATE_EPOCH"] = epoch
+        except OSError as e:
+            print("WARNING: cannot get lrose-core commit time: " + str(e),
+                  file=sys.stderr)
+
+    os.environ["CCACHE_BASEDIR"] = os.path.abspath(options.buildDir)
+    os.environ["CCACHE_NOHASHDIR"] = "1"
+
+    # ccache only caches the compiles that use a precompiled header
+    # if it is told to ignore the pch state
+
+    if (options.pch):
+        os.environ["CCACHE_SLOPPINESS"] = \
+            "pch_defines,time_macros,include_file_mtime,include_file_ctime"
+
+########################################################################
+# get the flags to map the build dir to a fixed path in the objects
+# this applies to the debug info, and to __FILE__
+#
+# -ffile-prefix-map needs gcc 8 or later. Older versions only
+# support the mapping for the debug info.
+
+def getPrefixMapFlags():
+
+    buildDir = os.path.abspath(options.buildDir)
+    if (isClang() or getGccMajorVersion() >= 8):
+        return ["-ffile-prefix-map=" + buildDir + "=" + mappedBuildDir]
+    return ["-fdebug-prefix-map=" + buildDir + "=" + mappedBuildDir]
+
+########################################################################
+# get the compile flags for the cpu target
+#
+# gcc 11 and later support the levels directly, with -march.
+# For older compilers, and clang, the extensions for the level,
+# and the levels below it, are enabled one at a time.
+
+def getCpuTargetFlags():
+
+    if (options.cpuTarget == "x86-64"):
+        return []
+
+    if (isClang() == False and getGccMajorVersion() >= 11):
+        return ["-march=" + options.cpuTarget]
+
+    flags = ["-march=x86-64", "-mtune=generic"]
+    for cpuTarget in cpuTargets:
+        for extension in cpuTargetExtensions[cpuTarget]:
+            flags.append("-m" + extension)
+        if (cpuTarget == options.cpuTarget):
+            break
+    return flags
+
+########################################################################
+# get the flags for the current PGO phase
+#
+# generate: instrument the build, writing the profiles to the
+#           profile dir when the apps exit
+# use:      optimize the build, using the profiles
+
+def getPgoFlags():
+
+    if (len(pgoPhase) == 0):
+        return []
+
+    profileDir = getPgoProfileDir()
+
+    if (pgoPhase == "generate"):
+        flags = ["-fprofile-generate=" + profileDir]
+        # the apps are multi-threaded, so update the counters atomically
+        if (isClang() == False and getGccMajorVersion() >= 7):
+            flags.append("-fprofile-update=atomic")
+        return flags
+
+    if (isClang()):
+        return ["-fprofile-use=" + os.path.join(profileDir, "default.profdata"),
+                "-Wno-profile-instr-unprofiled"]
+
+    # the profile counters may be inconsistent from threads, and
+    # some of the code is not run in training
+    flags = ["-fprofile-use=" + profileDir, "-fprofile-correction"]
+    if (getGccMajorVersion() >= 9):
+        flags.append("-Wno-missing-profile")
+    return flags
+
+########################################################################
+# get the dir for the PGO profiles
+
+def getPgoProfileDir():
+
+    return os.path.join(options.buildDir, "pgo-profiles")
+
+########################################################################
+# run the PGO training workload, using the instrumented apps
+#
+# Each line in the training file is a command, which is run in a
+# shell with the bin dir at the start of the path. These are replaced
+# in the commands:
+#   ${PGO_DATA_DIR}   - the sample data dir
+#   ${PGO_OUTPUT_DIR} - a scratch dir for the output
+# A command that fails is reported, but does not stop the build.
+
+def runPgoTraining():
+
+    profileDir = getPgoProfileDir()
+    outputDir = os.path.join(options.buildDir, "pgo-output")
+    for dirPath in [profileDir, outputDir]:
+        if (os.path.isdir(dirPath) == False):
+            os.makedirs(dirPath)
+
+    try:
+        fp = open(options.pgoTraining, "r")
+    except IOError as e:
+        print("ERROR: cannot open PGO training file: " + options.pgoTraining,
+              file=sys.stderr)
+        sys.exit(1)
+    lines = fp.readlines()
+    fp.close()
+
+    env = os.environ.copy()
+    env["PATH"] = prefixBinDir + os.pathsep + env.get("PATH", "")
+    env["PGO_DATA_DIR"] = options.pgoDataDir
+    env["PGO_OUTPUT_DIR"] = outputDir
+
+    nRun = 0
+    nFailed = 0
+    for line in lines:
+        line = line.strip()
+        if (len(line) == 0 or line[0] == '#'):
+            continue
+        print("PGO training: " + line, file=logFp)
+        logFp.flush()
+        retcode = subprocess.call(line, shell=True, env=env, cwd=outputDir,
+                                  stdout=logFp, stderr=subprocess.STDOUT)
+        nRun = nRun + 1
+        if (retcode != 0):
+            nFailed = nFailed + 1
+            print("WARNING: PGO training cmd failed: " + line,
+                  file=sys.stderr)
+
+    print("PGO training: n cmds run: " + str(nRun) +
+          ", n failed: " + str(nFailed), file=sys.stderr)
+
+    # clang writes raw profiles, which must be merged
+    # gcc merges the counts into the profiles as the apps exit
+
+    if (isClang()):
+        rawPaths = glob.glob(os.path.join(profileDir, "*.profraw"))
+        if (len(rawPaths) == 0):
+            print("WARNING: no PGO profiles written", file=sys.stderr)
+            return
+        shellCmd("llvm-profdata merge -output=" +
+                 os.path.join(profileDir, "default.profdata") + " " +
+                 " ".join(rawPaths))
+    else:
+        nProfiles = 0
+        for (dirPath, dirNames, fileNames) in os.walk(profileDir):
+            nProfiles = nProfiles + len(fnmatch.filter(fileNames, "*.gcda"))
+        print("PGO training: n profiles: " + str(nProfiles), file=sys.stderr)
+        if (nProfiles == 0):
+            print("WARNING: no PGO profiles written", file=sys.stderr)
+
+    # the output is not needed
+
+    shutil.rmtree(outputDir)
+
+########################################################################
+# check if the compiler is clang
+
+def isClang():
+
+    return (os.environ.get("CXX", "").find("clang") >= 0)
+
+########################################################################
+# get the major version of gcc, 0 if not known
+
+def getGccMajorVersion():
+
+    compiler = os.environ.get("CC", "gcc")
+    try:
+        pipe = subprocess.Popen([compiler, "-dumpversion"],
+                                stdout=subprocess.PIPE)
+        version = pipe.communicate()[0].decode('utf-8', 'replace').strip()
+        return int(version.split(".")[0])
+    except (OSError, ValueError):
+        return 0
+
+########################################################################
+# find an executable in the path
+# returns None if not found
+
+def findExecutable(name):
+
+    for pathDir in os.environ.get('PATH', '').split(os.pathsep):
+        exePath = os.path.join(pathDir, name)
+        if (os.path.isfile(exePath) and os.access(exePath, os.X_OK)):
+            return exePath
+    return None
+
 ########################################################################
 # get the OS type from the /etc/os-release file in linux
 
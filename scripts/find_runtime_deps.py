@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Find the runtime package dependencies of an installed LROSE tree.
+#
+# This script performs the following steps:
+#
+#   1. find the ELF binaries and libraries in the tree
+#   2. read the DT_NEEDED entries for each, using readelf
+#   3. resolve the needed libraries to paths, using ldconfig
+#      - libraries that are in the tree itself are skipped
+#   4. add the interpreters for the scripts in the tree
+#   5. map the paths to the packages that own them,
+#      using dpkg -S or rpm -qf
+#   6. write the Depends line for a .deb, or the Requires lines
+#      for an rpm spec file
+#
+# This must be run on the host on which the tree was built, so that
+# the packages used by the build are installed.
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import subprocess
+from optparse import OptionParser
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options]"
+    dirDefault = '/usr/local/lrose'
+    parser = OptionParser(usage)
+    parser.add_option('--debug',
+                      dest='debug', default=False,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--verbose',
+                      dest='verbose', default=False,
+                      action="store_true",
+                      help='Set verbose debugging on')
+    parser.add_option('--dir',
+                      dest='dir', default=dirDefault,
+                      help='Installed tree to scan, default: ' + dirDefault)
+    parser.add_option('--format',
+                      dest='format', default='',
+                      help='Output format: deb or rpm. ' + \
+                      'Default: deb if dpkg is available, otherwise rpm')
+    parser.add_option('--fileList',
+                      dest='fileList', default='',
+                      help='File with the list of paths to scan, one per ' + \
+                      'line, e.g. for a subpackage. ' + \
+                      'Default: scan all files in the dir')
+    parser.add_option('--extraDeps',
+                      dest='extraDeps', default='',
+                      help='Comma-delimited list of packages to add ' + \
+                      'to the dependencies')
+    parser.add_option('--outputPath',
+                      dest='outputPath', default='',
+                      help='Write the result to this file. Default: stdout')
+
+    (options, args) = parser.parse_args()
+
+    if (options.verbose):
+        options.debug = True
+
+    if (len(options.format) == 0):
+        if (findExecutable("dpkg") != None):
+            options.format = "deb"
+        else:
+            options.format = "rpm"
+
+    if (options.format != "deb" and options.format != "rpm"):
+        print("ERROR - invalid format: ", options.format, file=sys.stderr)
+        print("  options: deb, rpm", file=sys.stderr)
+        sys.exit(1)
+
+    if (os.path.isdir(options.dir) == False):
+        print("ERROR - dir does not exist: ", options.dir, file=sys.stderr)
+        sys.exit(1)
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  dir: ", options.dir, file=sys.stderr)
+        print("  format: ", options.format, file=sys.stderr)
+        print("  fileList: ", options.fileList, file=sys.stderr)
+        print("  extraDeps: ", options.extraDeps, file=sys.stderr)
+        print("  outputPath: ", options.outputPath, file=sys.stderr)
+
+    # read the file list, if specified
+
+    fileSet = None
+    if (len(options.fileList) > 0):
+        fileSet = readFileList(options.fileList)
+
+    # find the ELF files and scripts in the tree
+
+    (elfFiles, scriptFiles, treeNames) = scanTree(options.dir, fileSet)
+
+    # get the libraries needed by the ELF files
+
+    needed = getNeededLibs(elfFiles)
+
+    # libraries in the tree are part of the package itself
+
+    external = []
+    for (libName, is64) in sorted(needed):
+        if (libName not in treeNames):
+            external.append((libName, is64))
+
+    # resolve the needed libraries to paths
+
+    depPaths = resolveLibs(external)
+
+    # add the script interpreters
+
+    for interpPath in getInterpreters(scriptFiles):
+        if (interpPath not in depPaths):
+            depPaths.append(interpPath)
+
+    # map the paths to the owning packages
+
+    if (options.format == "deb"):
+        pkgs = getDebOwners(depPaths)
+    else:
+        pkgs = getRpmOwners(depPaths)
+
+    for extra in options.extraDeps.split(","):
+        if (len(extra.strip()) > 0 and extra.strip() not in pkgs):
+            pkgs.append(extra.strip())
+
+    pkgs.sort()
+
+    # write the result
+
+    if (options.format == "deb"):
+        lines = []
+        if (len(pkgs) > 0):
+            lines.append("Depends: " + ", ".join(pkgs))
+    else:
+        lines = ["Requires: " + pkg for pkg in pkgs]
+
+    text = ""
+    for line in lines:
+        text = text + line + "\n"
+
+    if (len(options.outputPath) > 0):
+        outFile = open(options.outputPath, "w")
+        outFile.write(text)
+        outFile.close()
+    else:
+        sys.stdout.write(text)
+
+    if (options.debug):
+        print("  found ", len(pkgs), " runtime packages", file=sys.stderr)
+
+    sys.exit(0)
+
+########################################################################
+# scan the tree for ELF files and scripts
+#
+# Returns the list of ELF files, the list of scripts, and the set of
+# file names in the tree, which is used to skip the needed libraries
+# that are part of the package.
+# If fileSet is not None, only those files are checked for ELF and
+# scripts, but all of the names in the tree are returned.
+
+def scanTree(topDir, fileSet):
+
+    elfFiles = []
+    scriptFiles = []
+    treeNames = set()
+
+    for (dirPath, dirNames, fileNames) in os.walk(topDir):
+        for fileName in fileNames:
+            treeNames.add(fileName)
+            filePath = os.path.join(dirPath, fileName)
+            if (os.path.islink(filePath) or
+                os.path.isfile(filePath) == False):
+                continue
+            if (fileSet != None and
+                os.path.normpath(filePath) not in fileSet):
+                continue
+            try:
+                fp = open(filePath, "rb")
+                magic = fp.read(4)
+                fp.close()
+            except IOError:
+                continue
+            if (magic == b'\x7fELF'):
+                elfFiles.append(filePath)
+            elif (magic[0:2] == b'#!' and os.access(filePath, os.X_OK)):
+                scriptFiles.append(filePath)
+
+    if (options.debug):
+        print("  n ELF files: ", len(elfFiles), file=sys.stderr)
+        print("  n scripts: ", len(scriptFiles), file=sys.stderr)
+
+    return (elfFiles, scriptFiles, treeNames)
+
+########################################################################
+# read the list of files to scan
+# lines starting with %dir, as in an rpm file list, are skipped
+
+def readFileList(listPath):
+
+    try:
+        fp = open(listPath, "r")
+    except IOError as e:
+        print("ERROR - cannot open file list: ", listPath, file=sys.stderr)
+        sys.exit(1)
+
+    fileSet = set()
+    for line in fp.readlines():
+        line = line.strip()
+        if (len(line) == 0 or line.startswith("%dir")):
+            continue
+        # deb lists are relative to /
+        if (line.startswith("./")):
+            line = line[1:]
+        fileSet.add(os.path.normpath(line))
+    fp.close()
+
+    return fileSet
+
+########################################################################
+# get the set of libraries needed by the ELF files
+#
+# Returns a set of (libName, is64) tuples. readelf is run on batches
+# of files, to limit the number of processes.
+
+def getNeededLibs(elfFiles):
+
+    needed = set()
+    batchSize = 200
+
+    for start in range(0, len(elfFiles), batchSize):
+
+        batch = elfFiles[start:start + batchSize]
+        is64ByPath = {}
+        for elfPath in batch:
+            is64ByPath[elfPath] = isElf64(elfPath)
+
+        cmd = ["readelf", "-d", "-W"] + batch
+        output = runCmdOutput(cmd)
+
+        # with several files, readelf starts each with a 'File:' line
+
+        is64 = is64ByPath[batch[0]]
+        for line in output.splitlines():
+            if (line.startswith("File: ")):
+                is64 = is64ByPath.get(line[len("File: "):].strip(), is64)
+            elif (line.find("(NEEDED)") >= 0):
+                start = line.find("[")
+                end = line.find("]")
+                if (start > 0 and end > start):
+                    needed.add((line[start + 1:end], is64))
+
+    if (options.debug):
+        print("  n needed libs: ", len(needed), file=sys.stderr)
+
+    return needed
+
+########################################################################
+# check if an ELF file is 64-bit, from the class byte in the header
+
+def isElf64(elfPath):
+
+    fp = open(elfPath, "rb")
+    header = fp.read(5)
+    fp.close()
+    return (header[4:5] == b'\x02')
+
+########################################################################
+# resolve the needed libraries to paths, using the ldconfig cache
+# the library must match the ELF class of the file that needs it
+
+def resolveLibs(libs):
+
+    cache = {}
+    output = runCmdOutput(["/sbin/ldconfig", "-p"])
+    for line in output.splitlines():
+        if (line.find(" => ") < 0):
+            continue
+        (left, libPath) = line.split(" => ", 1)
+        libName = left.strip().split(" ")[0]
+        flags = left[left.find("(") + 1:left.rfind(")")]
+        is64 = (flags.find("64") >= 0)
+        if ((libName, is64) not in cache):
+            cache[(libName, is64)] = libPath.strip()
+
+    paths = []
+    for (libName, is64) in libs:
+        if ((libName, is64) in cache):
+            libPath = cache[(libName, is64)]
+            if (libPath not in paths):
+                paths.append(libPath)
+        else:
+            print("WARNING - cannot resolve needed lib: ", libName,
+                  file=sys.stderr)
+
+    return paths
+
+########################################################################
+# get the interpreters for the scripts
+
+def getInterpreters(scriptFiles):
+
+    interps = []
+    for scriptPath in scriptFiles:
+
+        fp = open(scriptPath, "rb")
+        firstLine = fp.readline().decode('utf-8', 'replace')
+        fp.close()
+
+        words = firstLine[2:].split()
+        if (len(words) == 0):
+            continue
+
+        # for '#!/usr/bin/env prog', find prog in the path
+
+        interpPath = words[0]
+        if (os.path.basename(interpPath) == "env" and len(words) > 1):
+            interpPath = findExecutable(words[1])
+            if (interpPath == None):
+                continue
+
+        if (interpPath not in interps):
+            interps.append(interpPath)
+
+    return interps
+
+########################################################################
+# get the debian packages that own the paths
+# paths are also checked with symlinks resolved, since the dpkg
+# database may list either form
+
+def getDebOwners(paths):
+
+    queryPaths = []
+    for path in paths:
+        for queryPath in [path, os.path.realpath(path)]:
+            if (queryPath not in queryPaths):
+                queryPaths.append(queryPath)
+    if (len(queryPaths) == 0):
+        return []
+
+    nativeArch = runCmdOutput(["dpkg", "--print-architecture"]).strip()
+    output = runCmdOutput(["dpkg", "-S"] + queryPaths)
+
+    pkgs = []
+    for line in output.splitlines():
+        if (line.find(": ") < 0 or line.startswith("diversion by")):
+            continue
+        for pkg in line.split(": ", 1)[0].split(","):
+            pkg = pkg.strip()
+            if (pkg.endswith(":" + nativeArch)):
+                pkg = pkg[:-len(":" + nativeArch)]
+            if (pkg not in pkgs):
+                pkgs.append(pkg)
+
+    return pkgs
+
+########################################################################
+# get the rpm packages that own the paths
+# 32-bit packages are qualified with (x86-32)
+
+def getRpmOwners(paths):
+
+    if (len(paths) == 0):
+        return []
+
+    output = runCmdOutput(["rpm", "-qf", "--qf", "%{NAME} %{ARCH}\n"] + paths)
+
+    pkgs = []
+    for line in output.splitlines():
+        words = line.split()
+        if (len(words) != 2):
+            continue
+        pkg = words[0]
+        if (words[1] in ["i386", "i486", "i586", "i686"]):
+            pkg = pkg + "(x86-32)"
+        if (pkg not in pkgs):
+            pkgs.append(pkg)
+
+    return pkgs
+
+########################################################################
+# find an executable in the path
+# returns None if not found
+
+def findExecutable(name):
+
+    for pathDir in os.environ.get('PATH', '').split(os.pathsep):
+        exePath = os.path.join(pathDir, name)
+        if (os.path.isfile(exePath) and os.access(exePath, os.X_OK)):
+            return exePath
+    return None
+
+########################################################################
+# Run a command, and return its stdout
+# the exit code is ignored, since the query commands return an
+# error if some of the items are not found
+
+def runCmdOutput(cmd):
+
+    if (options.verbose):
+        print("running cmd:", " ".join(cmd[0:4]), "...", file=sys.stderr)
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+    try:
+        pipe = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE)
+        output = pipe.communicate()[0]
+    except OSError as e:
+        print("Execution failed:", e, file=sys.stderr)
+        sys.exit(1)
+
+    return output.decode('utf-8', 'replace')
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()
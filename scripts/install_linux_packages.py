@@ -4,6 +4,18 @@
 #
 # Install linux package dependencies for LROSE
 #
+# The packages for each lrose package and distro are read from the
+# lrose_dependencies.cfg manifest.
+#
+# The installed packages are queried first, and only the missing
+# packages are installed, in a single transaction. The package
+# metadata is only refreshed if it is older than --cacheMaxAge.
+#
+# With --localRepo, the packages are installed from a local package
+# cache instead of the distro mirrors. The cache is created by running
+# with --localRepo and --populateRepo, on a clean OS image, with
+# network access.
+#
 #===========================================================================
 
 from __future__ import print_function
@@ -17,7 +29,12 @@ from datetime import datetime
 from datetime import date
 from datetime import timedelta
 import glob
+import hashlib
 from sys import platform
+try:
+    from configparser import ConfigParser
+except ImportError:
+    from ConfigParser import ConfigParser
 
 def main():
 
@@ -28,12 +45,16 @@ def main():
 
     global options
     global osType, osVersion
+    global localRepoDir, localReposDir
+    global manifest, packageGroups
 
     # parse the command line
 
     usage = "usage: %prog [options]"
     homeDir = os.environ['HOME']
     prefixDefault = '/usr/local/lrose'
+    thisScriptDir = os.path.dirname(os.path.abspath(__file__))
+    manifestDefault = os.path.join(thisScriptDir, 'lrose_dependencies.cfg')
 
     parser = OptionParser(usage)
     parser.add_option('--debug',
@@ -44,10 +65,41 @@ def main():
                       dest='verbose', default=False,
                       action="store_true",
                       help='Set verbose debugging on')
+    parser.add_option('--package',
+                      dest='package', default='lrose-core',
+                      help='Install dependencies for this lrose package. ' + \
+                      'Default: lrose-core. See the [packages] section ' + \
+                      'of the manifest for the options.')
+    parser.add_option('--runtimeOnly',
+                      dest='runtimeOnly', default=False,
+                      action="store_true",
+                      help='Install only the packages needed to run the apps, ' + \
+                      'not those needed to build them')
+    parser.add_option('--manifest',
+                      dest='manifest', default=manifestDefault,
+                      help='Path to dependency manifest. Default: ' + \
+                      manifestDefault)
     parser.add_option('--cidd32',
                       dest='cidd32', default=False,
                       action="store_true",
                       help='Install 32-bit dependencies for CIDD apps')
+    parser.add_option('--cacheMaxAge',
+                      dest='cacheMaxAge', default=24.0, type='float',
+                      help='Max age of the package metadata cache, in hours. ' + \
+                      'The metadata is only refreshed if it is older than this. ' + \
+                      'Default: 24')
+    parser.add_option('--localRepo',
+                      dest='localRepo', default='',
+                      help='Top dir of local package cache. ' + \
+                      'Packages are installed from ' + \
+                      'localRepo/osType_osVersion, instead of the distro mirrors.')
+    parser.add_option('--populateRepo',
+                      dest='populateRepo', default=False,
+                      action="store_true",
+                      help='Install from the network, saving the downloaded ' + \
+                      'packages in the --localRepo dir, and create the repo ' + \
+                      'metadata. Run this on a clean OS image, so that all ' + \
+                      'of the packages are downloaded.')
     parser.add_option('--osFile',
                       dest='osFile', default="/etc/os-release",
                       help='OS file path')
@@ -55,6 +107,23 @@ def main():
     (options, args) = parser.parse_args()
     if (options.verbose):
         options.debug = True
+
+    if (options.populateRepo and len(options.localRepo) == 0):
+        print("ERROR - --populateRepo requires --localRepo", file=sys.stderr)
+        sys.exit(1)
+
+    # read the dependency manifest, and get the groups for the package
+
+    manifest = ConfigParser()
+    if (len(manifest.read(options.manifest)) == 0):
+        print("ERROR - cannot read manifest: ", options.manifest, file=sys.stderr)
+        sys.exit(1)
+    if (manifest.has_option("packages", options.package) == False):
+        print("ERROR - invalid package name: ", options.package, file=sys.stderr)
+        print("  options: ", " ".join(manifest.options("packages")),
+              file=sys.stderr)
+        sys.exit(1)
+    packageGroups = manifest.get("packages", options.package).split()
     
     # runtime
 
@@ -69,18 +138,40 @@ def main():
     
     getOsType()
 
+    # local repo is in a subdir for this OS version
+
+    localRepoDir = ""
+    if (len(options.localRepo) > 0):
+        localRepoDir = os.path.join(os.path.abspath(options.localRepo),
+                                    osType + "_" + ("%g" % osVersion))
+
+    # the package manager config for the local repo goes in this dir
+
+    localReposDir = "/etc/lrose-local-repo"
+
     # let users know what we are doing
 
     print("****************************************************", file=sys.stderr)
     print("Running", thisScriptName, file=sys.stderr)
     print(" ", dateTimeStr, file=sys.stderr)
     print("  OS file: ", options.osFile, file=sys.stderr)
+    print("  manifest: ", options.manifest, file=sys.stderr)
+    print("  package: ", options.package, file=sys.stderr)
+    print("  runtimeOnly: ", options.runtimeOnly, file=sys.stderr)
     print("  cidd32: ", options.cidd32, file=sys.stderr)
+    print("  cacheMaxAge: ", options.cacheMaxAge, file=sys.stderr)
+    print("  localRepoDir: ", localRepoDir, file=sys.stderr)
+    print("  populateRepo: ", options.populateRepo, file=sys.stderr)
     print("  Installing dependencies for LROSE", file=sys.stderr)
     print("  OS type: ", osType, file=sys.stderr)
     print("  OS version: ", osVersion, file=sys.stderr)
     print("****************************************************", file=sys.stderr)
 
+    # set up the package manager to use the local repo
+
+    if (len(localRepoDir) > 0 and options.populateRepo == False):
+        setupLocalRepo()
+
     # install the relevant packages
 
     if (osType == "centos"):
@@ -102,6 +193,11 @@ def main():
          installPackagesOracle()
     else:
         print("ERROR - unsupported OS type: ", osType, " version: ", osVersion, file=sys.stderr)
+
+    # create the metadata for the local repo
+
+    if (options.populateRepo):
+        indexLocalRepo()
             
     # done
     
@@ -116,49 +212,30 @@ def main():
 
 def installPackagesCentos6():
 
-    # install epel
-
-    shellCmd("yum install -y epel-release")
+    # install epel first, since it provides some of the packages
 
-    # install main packages
+    installRpmPackages("yum", ["epel-release"])
 
-    shellCmd("yum install -y tcsh wget git tkcvs " +
-             "emacs rsync python " +
-             "m4 make cmake libtool autoconf automake " +
-             "gcc gcc-c++ gcc-gfortran glibc-devel " +
-             "libX11-devel libXext-devel " +
-             "libpng-devel libtiff-devel zlib-devel " +
-             "expat-devel libcurl-devel " +
-             "flex-devel fftw3-devel " +
-             "bzip2-devel qt5-qtbase-devel qt5-qtdeclarative-devel " +
-             "hdf5-devel netcdf-devel " +
-             "xorg-x11-xauth xorg-x11-apps " +
-             "rpm-build redhat-rpm-config " +
-             "rpm-devel rpmdevtools ")
+    # install the packages from the manifest
 
-    # install required 32-bit packages for CIDD
-
-    if (options.cidd32):
-        shellCmd("yum install -y " +
-                 "xrdb Xvfb gnuplot " +
-                 "glibc-devel.i686 libX11-devel.i686 libXext-devel.i686 " +
-                 "libtiff-devel.i686 libpng-devel.i686 " +
-                 "libstdc++-devel.i686 libgcc.i686 " +
-                 "expat-devel.i686 flex-devel.i686 " +
-                 "fftw-devel.i686 zlib-devel.i686 bzip2-devel.i686 " +
-                 "xorg-x11-fonts-100dpi xorg-x11-fonts-ISO8859-1-100dpi " +
-                 "xorg-x11-fonts-75dpi xorg-x11-fonts-ISO8859-1-75dpi " +
-                 "xorg-x11-fonts-misc")
+    installRpmPackages("yum", getPackageList("centos6"))
 
     # create link for qtmake
 
-    shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+    if (qtBuildNeeded()):
+        shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+
+    if (options.runtimeOnly):
+        return
     
     # install updated gcc and g++ toolchain
 
-    shellCmd("wget http://people.centos.org/tru/devtools-2/devtools-2.repo -O /etc/yum.repos.d/devtools-2.repo")
-    shellCmd("yum install -y devtoolset-2-gcc devtoolset-2-binutils")
-    shellCmd("yum install -y devtoolset-2-gcc-c++ devtoolset-2-gcc-gfortran")
+    if (os.path.isfile("/etc/yum.repos.d/devtools-2.repo") == False and
+        len(localRepoDir) == 0):
+        shellCmd("wget http://people.centos.org/tru/devtools-2/devtools-2.repo -O /etc/yum.repos.d/devtools-2.repo")
+    installRpmPackages("yum",
+                       ("devtoolset-2-gcc devtoolset-2-binutils " +
+                        "devtoolset-2-gcc-c++ devtoolset-2-gcc-gfortran").split())
 
     # copy the updated compilers into /usr
     # so that they become the system default
@@ -170,148 +247,54 @@ def installPackagesCentos6():
 
 def installPackagesCentos7():
 
-    # install epel
+    # install epel first, since it provides some of the packages
 
-    shellCmd("yum install -y epel-release")
-
-    # install main packages
-    # break this up into pieces so it does not crash inside docker
-
-    shellCmd("yum install -y " +
-             "tcsh wget git " +
-             "tkcvs emacs rsync python mlocate " +
-             "m4 make cmake cmake3 libtool autoconf automake " +
-             "gcc gcc-c++ gcc-gfortran glibc-devel " +
-             "libX11-devel libXext-devel " +
-             "libpng-devel libtiff-devel zlib-devel libzip-devel " +
-             "eigen3-devel armadillo-devel ")
-    shellCmd("yum install -y " +
-             "expat-devel libcurl-devel openmpi-devel " +
-             "flex-devel fftw3-devel " +
-             "bzip2-devel qt5-qtbase-devel qt5-qtdeclarative-devel " +
-             "hdf5-devel netcdf-devel " +
-             "xorg-x11-xauth xorg-x11-apps " +
-             "rpm-build redhat-rpm-config " +
-             "rpm-devel rpmdevtools")
-
-    # install required 32-bit packages for CIDD
-    
-    if (options.cidd32):
-        shellCmd("yum install -y " +
-                 "xrdb Xvfb gnuplot " +
-                 "glibc-devel.i686 libX11-devel.i686 libXext-devel.i686 " +
-                 "libtiff-devel.i686 libpng-devel.i686 libcurl-devel.i686" +
-                 "libstdc++-devel.i686 libgcc.i686 " +
-                 "expat-devel.i686 flex-devel.i686 " +
-                 "fftw-devel.i686 zlib-devel.i686 bzip2-devel.i686 " +
-                 "xorg-x11-fonts-100dpi xorg-x11-fonts-ISO8859-1-100dpi " +
-                 "xorg-x11-fonts-75dpi xorg-x11-fonts-ISO8859-1-75dpi " +
-                 "xorg-x11-fonts-misc")
+    installRpmPackages("yum", ["epel-release"])
+
+    # install the packages from the manifest
+
+    installRpmPackages("yum", getPackageList("centos7"))
 
     # create link for qtmake
 
-    shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+    if (qtBuildNeeded()):
+        shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
     
 ########################################################################
 # install packages for CENTOS 8
 
 def installPackagesCentos8():
 
-    # install epel
+    # install epel, and enable powertools
 
-    shellCmd("dnf install -y epel-release python2 python3")
-    shellCmd("dnf install -y 'dnf-command(config-manager)'")
+    installRpmPackages("dnf",
+                       ["epel-release", "python2", "python3",
+                        "dnf-command(config-manager)"])
     shellCmd("dnf config-manager --set-enabled powertools")
     shellCmd("alternatives --set python /usr/bin/python3")
 
-    # install main packages
-    # break this up into pieces so it does not crash inside docker
-
-    shellCmd("dnf install -y --allowerasing " +
-             "tcsh wget git " +
-             "emacs rsync python2 python3 mlocate " +
-             "python2-devel platform-python-devel " +
-             "m4 make cmake libtool autoconf automake " +
-             "gcc gcc-c++ gcc-gfortran glibc-devel")
-
-    shellCmd("dnf install -y --allowerasing " +
-             "libX11-devel libXext-devel libcurl-devel " +
-             "libpng-devel libtiff-devel zlib-devel libzip-devel " +
-             "eigen3-devel armadillo-devel " +
-             "expat-devel libcurl-devel openmpi-devel " +
-             "flex-devel fftw3-devel ")
-
-    shellCmd("dnf install -y --allowerasing " +
-             "bzip2-devel qt5-qtbase-devel qt5-qtdeclarative-devel " +
-             "hdf5-devel netcdf-devel " +
-             "xorg-x11-xauth xorg-x11-apps " +
-             "rpm-build redhat-rpm-config " +
-             "rpm-devel rpmdevtools")
-
-    # install required 32-bit packages for CIDD
-    
-    if (options.cidd32):
-        shellCmd("dnf install -y --allowerasing " +
-                 "xrdb " +
-                 "glibc-devel.i686 libX11-devel.i686 libXext-devel.i686 " +
-                 "libcurl-devel.i686 " +
-                 "libtiff-devel.i686 libpng-devel.i686 " +
-                 "libstdc++-devel.i686 libtiff-devel.i686 ")
-        shellCmd("dnf install -y --allowerasing " +
-                 "zlib-devel.i686 expat-devel.i686 flex-devel.i686 " +
-                 "fftw-devel.i686 bzip2-devel.i686 " +
-                 "gnuplot ImageMagick-devel ImageMagick-c++-devel " +
-                 "xorg-x11-fonts-100dpi xorg-x11-fonts-ISO8859-1-100dpi " +
-                 "xorg-x11-fonts-75dpi xorg-x11-fonts-ISO8859-1-75dpi " +
-                 "xorg-x11-fonts-misc")
+    # install the packages from the manifest
+
+    installRpmPackages("dnf", getPackageList("centos8"), "--allowerasing")
 
     # create link for qtmake
 
-    shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+    if (qtBuildNeeded()):
+        shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
     
 ########################################################################
 # install packages for FEDORA
 
 def installPackagesFedora():
 
-    # install main packages
-    # break this up into pieces so it does not crash inside docker
-
-    shellCmd("yum install -y " +
-             "tcsh wget git " +
-             "tkcvs emacs rsync python mlocate " +
-             "m4 make cmake libtool autoconf automake " +
-             "gcc gcc-c++ gcc-gfortran glibc-devel " +
-             "libX11-devel libXext-devel " +
-             "libpng-devel libtiff-devel zlib-devel libzip-devel " +
-             "eigen3-devel armadillo-devel ")
-    shellCmd("yum install -y " +
-             "expat-devel libcurl-devel openmpi-devel " +
-             "flex-devel fftw3-devel " +
-             "bzip2-devel qt5-qtbase-devel qt5-qtdeclarative-devel " +
-             "hdf5-devel netcdf-devel " +
-             "xorg-x11-xauth xorg-x11-apps " +
-             "rpm-build redhat-rpm-config " +
-             "rpm-devel rpmdevtools")
-
-    # install required 32-bit packages for CIDD
-    
-    if (options.cidd32):
-        shellCmd("yum install -y " +
-                 "xrdb Xvfb gnuplot " +
-                 "glibc-devel.i686 libX11-devel.i686 libXext-devel.i686 " +
-                 "libtiff-devel.i686 libpng-devel.i686 libcurl-devel.i686 " +
-                 "libstdc++-devel.i686 libgcc.i686 " +
-                 "expat-devel.i686 flex-devel.i686 " +
-                 "fftw-devel.i686 zlib-devel.i686 bzip2-devel.i686 " +
-                 "ImageMagick-devel ImageMagick-c++-devel " +
-                 "xorg-x11-fonts-100dpi xorg-x11-fonts-ISO8859-1-100dpi " +
-                 "xorg-x11-fonts-75dpi xorg-x11-fonts-ISO8859-1-75dpi " +
-                 "xorg-x11-fonts-misc")
+    # install the packages from the manifest
+
+    installRpmPackages("dnf", getPackageList("fedora"))
 
     # create link for qtmake
 
-    shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+    if (qtBuildNeeded()):
+        shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
 
 ########################################################################
 # install packages for ORACLE 8
@@ -320,35 +303,19 @@ def installPackagesOracle():
 
     # install epel
 
-    shellCmd("dnf install -y oracle-epel-release-el8 python2 python3")
-    shellCmd("dnf install -y 'dnf-command(config-manager)'")
+    installRpmPackages("dnf",
+                       ["oracle-epel-release-el8", "python2", "python3",
+                        "dnf-command(config-manager)"])
     shellCmd("alternatives --set python /usr/bin/python3")
 
-    # install main packages
-    # break this up into pieces so it does not crash inside docker
-
-    shellCmd("dnf install -y --allowerasing " +
-             "tcsh wget git " +
-             "emacs rsync python2 python3 mlocate " +
-             "python2-devel platform-python-devel " +
-             "m4 make cmake libtool autoconf automake " +
-             "gcc gcc-c++ gcc-gfortran glibc-devel")
-
-    shellCmd("dnf install -y --allowerasing " +
-             "libX11-devel libXext-devel libcurl-devel " +
-             "libpng-devel libtiff-devel zlib-devel libzip-devel " +
-             "expat-devel libcurl-devel openmpi-devel " +
-             "flex fftw3-devel ")
+    # install the packages from the manifest
 
-    shellCmd("dnf install -y --allowerasing " +
-             "bzip2-devel qt5-qtbase-devel qt5-qtdeclarative-devel " +
-             "xorg-x11-xauth " +
-             "rpm-build redhat-rpm-config " +
-             "rpm-devel rpmdevtools")
+    installRpmPackages("dnf", getPackageList("oracle"), "--allowerasing")
 
     # create link for qtmake
 
-    shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+    if (qtBuildNeeded()):
+        shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
     
 ########################################################################
 # install packages for Debian
@@ -359,83 +326,396 @@ def installPackagesDebian():
 
     os.environ["DEBIAN_FRONTEND"] = "noninteractive"
 
-    # install main packages
-    
-    shellCmd("apt-get -y update")
-    shellCmd("apt-get install -y " +
-             "tcsh git gcc g++ gfortran rsync chrpath " +
-             "automake make cmake mlocate libtool pkg-config python " +
-             "libcurl3-dev curl " +
-             "libfl-dev libbz2-dev libx11-dev libpng-dev " +
-             "libfftw3-dev libexpat1-dev " +
-             "qtbase5-dev qtdeclarative5-dev " +
-             "libeigen3-dev libzip-dev " +
-             "libarmadillo-dev libopenmpi-dev " +
-             "libnetcdf-dev libhdf5-dev hdf5-tools " +
-             "libcurl4-openssl-dev")
+    # packages for running CIDD
+    # the i386 architecture must be added before these can be found
 
-    # create link for qmake
+    forceUpdate = False
+    if (options.cidd32):
+        foreignArchs = shellCmdOutput("/usr/bin/dpkg --print-foreign-architectures")
+        if ("i386" not in foreignArchs.split()):
+            shellCmd("/usr/bin/dpkg --add-architecture i386")
+            forceUpdate = True
 
-    shellCmd("cd /usr/bin; " +
-             "/bin/rm -f qmake qmake-qt5; " +
-             "ln -s /usr/lib/x86_64-linux-gnu/qt5/bin/qmake qmake; " +
-             "ln -s /usr/lib/x86_64-linux-gnu/qt5/bin/qmake qmake-qt5")
+    # install the packages from the manifest
 
-    # install packages for running CIDD
+    installDebPackages(getPackageList("debian"), forceUpdate)
 
-    if (options.cidd32):
-        shellCmd("/usr/bin/dpkg --add-architecture i386")
-        shellCmd("apt-get -y update")
-        shellCmd("apt-get install -y " +
-                 "libx11-dev:i386 " +
-                 "libxext-dev:i386 " +
-                 "libfftw3-dev:i386 " +
-                 "libexpat-dev:i386 " +
-                 "libpng-dev:i386 " +
-                 "libfl-dev:i386 " +
-                 "libbz2-dev:i386 " +
-                 "libzip-dev:i386")
+    # create link for qmake
+
+    if (qtBuildNeeded()):
+        shellCmd("cd /usr/bin; " +
+                 "/bin/rm -f qmake qmake-qt5; " +
+                 "ln -s /usr/lib/x86_64-linux-gnu/qt5/bin/qmake qmake; " +
+                 "ln -s /usr/lib/x86_64-linux-gnu/qt5/bin/qmake qmake-qt5")
 
 ########################################################################
 # install packages for suse
 
 def installPackagesSuse():
 
-    # install main packages
-
-    shellCmd("zypper install -y tcsh wget git " +
-             "tkdiff emacs rsync python docker " +
-             "m4 make cmake libtool autoconf automake " +
-             "gcc gcc-c++ gcc-fortran glibc-devel " +
-             "libX11-devel libXext-devel " +
-             "libpng-devel libtiff-devel zlib-devel " +
-             "libexpat-devel libcurl-devel " +
-             "flex fftw3-devel ")
-    shellCmd("zypper install -y tcsh wget git " +
-             "libbz2-devel libzip-devel " +
-             "libqt5-qtbase-devel libqt5-qtdeclarative-devel " +
-             "eigen3-devel " +
-             "hdf5-devel netcdf-devel " +
-             "armadillo-devel openmpi-devel " +
-             "xorg-x11-xauth " +
-             "rpm-build rpm-devel rpmdevtools")
-
-    # install packages for CIDD
+    # install the packages from the manifest
 
-    if (options.cidd32):
-        shellCmd("zypper install -y " +
-                 "xrdb " +
-                 "glibc-devel-32bit libX11-devel-32bit libXext-devel-32bit " +
-                 "libtiff-devel-32bit libpng-devel-32bit libcurl-devel-32bit " +
-                 "libstdc++-devel-32bit libtiff-devel-32bit " +
-                 "zlib-devel-32bit libexpat-devel-32bit flex-32bit " +
-                 "libfftw3-3-32bit libbz2-devel-32bit " +
-                 "gnuplot ImageMagick-devel-32bit " +
-                 "xorg-x11 xorg-x11-devel xorg-x11-fonts xorg-x11-fonts-core")
+    installRpmPackages("zypper", getPackageList("suse"))
 
     # create link for qtmake
 
-    shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+    if (qtBuildNeeded()):
+        shellCmd("cd /usr/bin; ln -f -s qmake-qt5 qmake")
+    
+########################################################################
+# get the list of OS packages for a distro from the manifest
+#
+# The build or runtime section is used, depending on --runtimeOnly,
+# plus the cidd32 section if --cidd32 is set. From each section, the
+# 'common' group and the groups for the lrose package are included.
+#
+# For the runtime role, the libs whose package names change with the
+# OS version are in a section for the version, e.g. ubuntu_20.04.runtime.
+# If there is none for this version, the distro's runtime.fallback
+# section is used, if it has one.
+
+def getPackageList(distro):
+
+    role = "build"
+    if (options.runtimeOnly):
+        role = "runtime"
+
+    sectionNames = [distro + "." + role]
+    if (options.runtimeOnly):
+        versionSection = osType + "_" + ("%g" % osVersion) + ".runtime"
+        fallbackSection = distro + ".runtime.fallback"
+        if (manifest.has_section(versionSection)):
+            sectionNames.append(versionSection)
+        elif (manifest.has_section(fallbackSection)):
+            print("WARNING - no section in manifest: ", versionSection,
+                  file=sys.stderr)
+            print("  using: ", fallbackSection, file=sys.stderr)
+            sectionNames.append(fallbackSection)
+    if (options.cidd32):
+        cidd32Section = distro + ".cidd32"
+        if (manifest.has_section(cidd32Section)):
+            sectionNames.append(cidd32Section)
+        else:
+            print("WARNING - no section in manifest: ", cidd32Section,
+                  file=sys.stderr)
+            print("  --cidd32 is not supported for: ", distro,
+                  file=sys.stderr)
+
+    groups = ["common"] + packageGroups
+
+    pkgs = []
+    for sectionName in sectionNames:
+        if (manifest.has_section(sectionName) == False):
+            print("ERROR - no section in manifest: ", sectionName, file=sys.stderr)
+            print("  manifest: ", options.manifest, file=sys.stderr)
+            sys.exit(1)
+        for group in groups:
+            if (manifest.has_option(sectionName, group) == False):
+                continue
+            for pkg in manifest.get(sectionName, group).split():
+                if (pkg not in pkgs):
+                    pkgs.append(pkg)
+
+    if (options.debug):
+        print("  packages for ", distro, ", ", role, ": ", " ".join(pkgs),
+              file=sys.stderr)
+
+    return pkgs
+
+########################################################################
+# check if qt is needed for the build - if so, qmake must be linked
+
+def qtBuildNeeded():
+
+    return ("qt" in packageGroups and options.runtimeOnly == False)
+
+########################################################################
+# install rpm packages, using yum, dnf or zypper
+#
+# Only the packages that are not already installed are passed to the
+# installer, in a single transaction.
+
+def installRpmPackages(installer, pkgList, extraArgs = ""):
+
+    missing = getMissingRpmPackages(pkgList)
+    if (len(missing) == 0):
+        print("  all packages already installed", file=sys.stderr)
+        return
+
+    print("  installing missing packages:", " ".join(missing), file=sys.stderr)
+
+    # quote the package names, since some contain parentheses
+
+    pkgStr = " ".join(["'" + pkg + "'" for pkg in missing])
+    maxAgeSecs = str(int(options.cacheMaxAge * 3600))
+
+    # when installing from the local repo, use only that repo
+    # when populating it, keep the downloaded packages in it
+
+    repoArgs = ""
+    if (options.populateRepo):
+        if (installer == "zypper"):
+            repoArgs = " --pkg-cache-dir " + localRepoDir
+        else:
+            repoArgs = " --setopt=keepcache=1" + \
+                       " --setopt=cachedir=" + os.path.join(localRepoDir, "cache")
+    elif (len(localRepoDir) > 0):
+        if (installer == "zypper"):
+            repoArgs = " --reposd-dir " + localReposDir + " --no-gpg-checks"
+        else:
+            repoArgs = " --setopt=reposdir=" + localReposDir
+            maxAgeSecs = "0"
+
+    if (installer == "zypper"):
+        refreshStr = ""
+        if (len(localRepoDir) == 0 and cacheIsFresh("/var/cache/zypp/raw")):
+            refreshStr = " --no-refresh"
+        if (options.populateRepo):
+            shellCmd("zypper" + repoArgs + " install -y --download-only " + pkgStr)
+        shellCmd("zypper" + repoArgs + refreshStr + " install -y " + pkgStr)
+    elif (installer == "dnf"):
+        shellCmd("dnf install -y" + repoArgs + " " +
+                 "--setopt=max_parallel_downloads=10 " +
+                 "--setopt=metadata_expire=" + maxAgeSecs + " " +
+                 extraArgs + " " + pkgStr)
+    else:
+        shellCmd("yum install -y" + repoArgs + " " +
+                 "--setopt=metadata_expire=" + maxAgeSecs + " " +
+                 extraArgs + " " + pkgStr)
+
+########################################################################
+# get the list of rpm packages that are not installed
+#
+# A single rpm query lists the capabilities provided by all of the
+# installed packages. These include the package names, and the
+# arch-specific names such as glibc-devel(x86-32).
+
+def getMissingRpmPackages(pkgList):
+
+    output = shellCmdOutput("rpm -qa --qf '[%{PROVIDENAME}\\n]'")
+    installed = set(output.splitlines())
+
+    missing = []
+    for pkg in pkgList:
+        provName = pkg
+        if (pkg.endswith(".i686")):
+            provName = pkg[:-len(".i686")] + "(x86-32)"
+        elif (pkg.endswith(".x86_64")):
+            provName = pkg[:-len(".x86_64")] + "(x86-64)"
+        if (provName not in installed and pkg not in missing):
+            missing.append(pkg)
+
+    return missing
+
+########################################################################
+# install debian packages, using apt-get
+#
+# Only the packages that are not already installed are passed to
+# apt-get, in a single transaction. The package lists are only
+# updated if they are older than cacheMaxAge.
+
+def installDebPackages(pkgList, forceUpdate):
+
+    missing = getMissingDebPackages(pkgList)
+    if (len(missing) == 0):
+        print("  all packages already installed", file=sys.stderr)
+        return
+
+    print("  installing missing packages:", " ".join(missing), file=sys.stderr)
+
+    # when installing from the local repo, use only that repo,
+    # with its own lists dir, so that the distro lists are left alone
+    # when populating it, keep the downloaded packages in it
+
+    if (options.populateRepo):
+        repoArgs = " -o Dir::Cache::archives=" + localRepoDir
+        if (os.path.isdir(os.path.join(localRepoDir, "partial")) == False):
+            os.makedirs(os.path.join(localRepoDir, "partial"))
+    elif (len(localRepoDir) > 0):
+        repoArgs = " -o Dir::Etc::SourceList=" + \
+                   os.path.join(localReposDir, "sources.list") + \
+                   " -o Dir::Etc::SourceParts=" + \
+                   os.path.join(localReposDir, "sources.list.d") + \
+                   " -o Dir::State::Lists=" + \
+                   os.path.join(localReposDir, "lists")
+        forceUpdate = True
+    else:
+        repoArgs = ""
+
+    if (forceUpdate or cacheIsFresh("/var/lib/apt/lists") == False):
+        shellCmd("apt-get" + repoArgs + " -y update")
+
+    shellCmd("apt-get" + repoArgs + " install -y " + " ".join(missing))
+
+########################################################################
+# get the list of debian packages that are not installed
+#
+# A single dpkg-query call lists all installed packages, along with
+# the virtual packages they provide.
+
+def getMissingDebPackages(pkgList):
+
+    nativeArch = shellCmdOutput("/usr/bin/dpkg --print-architecture").strip()
+    output = shellCmdOutput("dpkg-query -W -f=" +
+                            "'${binary:Package} ${Architecture} " +
+                            "${db:Status-Abbrev}|${Provides}\\n'")
+
+    installed = set()
+    for line in output.splitlines():
+        (pkgPart, sep, providesPart) = line.partition("|")
+        parts = pkgPart.split()
+        if (len(parts) < 3 or parts[2] != "ii"):
+            continue
+        name = parts[0].split(":")[0]
+        arch = parts[1]
+        names = [name]
+        for provide in providesPart.split(","):
+            if (len(provide.strip()) > 0):
+                names.append(provide.split()[0])
+        for pkgName in names:
+            installed.add(pkgName + ":" + arch)
+            if (arch == nativeArch or arch == "all"):
+                installed.add(pkgName)
+
+    missing = []
+    for pkg in pkgList:
+        if (pkg not in installed and pkg not in missing):
+            missing.append(pkg)
+
+    return missing
+
+########################################################################
+# set up the package manager to install from the local repo
+#
+# The repo config is written to a separate dir, which is passed to
+# the package manager when installing. This leaves the system repo
+# config unchanged.
+
+def setupLocalRepo():
+
+    if (os.path.isdir(localRepoDir) == False):
+        print("ERROR - local repo dir does not exist: ", localRepoDir,
+              file=sys.stderr)
+        print("  run with --populateRepo first", file=sys.stderr)
+        sys.exit(1)
+
+    if (osType == "debian" or osType == "ubuntu"):
+        for subDir in ["sources.list.d", "lists/partial"]:
+            if (os.path.isdir(os.path.join(localReposDir, subDir)) == False):
+                os.makedirs(os.path.join(localReposDir, subDir))
+        repoFile = open(os.path.join(localReposDir, "sources.list"), "w")
+        repoFile.write("deb [trusted=yes] file:" + localRepoDir + " ./\n")
+        repoFile.close()
+        return
+
+    if (os.path.isdir(localReposDir) == False):
+        os.makedirs(localReposDir)
+    repoFile = open(os.path.join(localReposDir, "lrose-local.repo"), "w")
+    repoFile.write("[lrose-local]\n")
+    repoFile.write("name=LROSE local package cache\n")
+    repoFile.write("baseurl=file://" + localRepoDir + "\n")
+    repoFile.write("enabled=1\n")
+    repoFile.write("gpgcheck=0\n")
+    if (osType == "suse"):
+        repoFile.write("autorefresh=1\n")
+        repoFile.write("type=rpm-md\n")
+    repoFile.close()
+
+########################################################################
+# create the metadata for the local repo, after it has been populated
+
+def indexLocalRepo():
+
+    print("  creating local repo metadata in: ", localRepoDir, file=sys.stderr)
+
+    if (osType == "debian" or osType == "ubuntu"):
+        writeDebPackagesIndex()
+        return
+
+    # createrepo_c is not available on centos 6 and 7
+
+    createRepo = "createrepo_c"
+    installer = "dnf"
+    if (osType == "centos" and osVersion < 8):
+        createRepo = "createrepo"
+        installer = "yum"
+    elif (osType == "suse"):
+        installer = "zypper"
+
+    installRpmPackages(installer, [createRepo])
+    shellCmd(createRepo + " " + localRepoDir)
+
+########################################################################
+# write the Packages index for a local debian repo
+#
+# This is done here, rather than with dpkg-scanpackages, so that
+# dpkg-dev is not needed.
+
+def writeDebPackagesIndex():
+
+    indexPath = os.path.join(localRepoDir, "Packages")
+    indexFile = open(indexPath, "w")
+
+    debPaths = sorted(glob.glob(os.path.join(localRepoDir, "*.deb")))
+    for debPath in debPaths:
+
+        control = shellCmdOutput("dpkg-deb -f " + debPath).rstrip("\n")
+
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        debFile = open(debPath, "rb")
+        while True:
+            block = debFile.read(1 << 20)
+            if (len(block) == 0):
+                break
+            md5.update(block)
+            sha256.update(block)
+        debFile.close()
+
+        indexFile.write(control + "\n")
+        indexFile.write("Filename: ./" + os.path.basename(debPath) + "\n")
+        indexFile.write("Size: " + str(os.path.getsize(debPath)) + "\n")
+        indexFile.write("MD5sum: " + md5.hexdigest() + "\n")
+        indexFile.write("SHA256: " + sha256.hexdigest() + "\n")
+        indexFile.write("\n")
+
+    indexFile.close()
+
+    if (options.debug):
+        print("  wrote index for ", len(debPaths), " packages: ", indexPath,
+              file=sys.stderr)
+
+########################################################################
+# check whether a package metadata cache dir has been updated
+# within cacheMaxAge hours
+
+def cacheIsFresh(cacheDir):
+
+    if (os.path.isdir(cacheDir) == False):
+        return False
+
+    # find the most recent modification below the top dir
+
+    latest = 0
+    for (dirPath, dirNames, fileNames) in os.walk(cacheDir):
+        if ("partial" in dirNames):
+            dirNames.remove("partial")
+        for fileName in fileNames:
+            if (fileName == "lock"):
+                continue
+            try:
+                mtime = os.path.getmtime(os.path.join(dirPath, fileName))
+            except OSError:
+                continue
+            if (mtime > latest):
+                latest = mtime
+
+    ageHours = (time.time() - latest) / 3600.0
+    if (options.debug):
+        print("  cache dir: ", cacheDir, ", age hours: %.1f" % ageHours,
+              file=sys.stderr)
+
+    return (ageHours < options.cacheMaxAge)
     
 ########################################################################
 # get the OS type from the /etc/os-release file in linux
@@ -531,6 +811,28 @@ def shellCmd(cmd):
     if (options.debug):
         print(".... done", file=sys.stderr)
     
+########################################################################
+# Run a command in a shell, and return its stdout
+# the exit code is ignored, since the query commands may return an
+# error if some of the items are not found
+
+def shellCmdOutput(cmd):
+
+    if (options.debug):
+        print("running cmd:", cmd, " .....", file=sys.stderr)
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+    try:
+        pipe = subprocess.Popen(cmd, shell=True, env=env,
+                                stdout=subprocess.PIPE)
+        output = pipe.communicate()[0]
+    except OSError as e:
+        print("Execution failed:", e, file=sys.stderr)
+        sys.exit(1)
+
+    return output.decode('utf-8', 'replace')
+    
 ########################################################################
 # Run - entry point
 
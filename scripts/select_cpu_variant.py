@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Select the LROSE package variant that best suits the host CPU.
+#
+# The packages can be built for several x86-64 micro-architecture
+# levels, using --cpuTarget. The level is in the package file name,
+# for example:
+#
+#   lrose-core-20240301.ubuntu_22.04.x86_64_v3.amd64.deb
+#   lrose-core-20240301-centos_8.x86_64_v3.x86_64.rpm
+#
+# The generic x86-64 package has no level in its name.
+#
+# The packages for all of the distros are put in the same release dir,
+# so the OS is also taken from the name, as <os_type>_<os_version>.
+#
+# This script performs the following steps:
+#
+#   1. read the CPU flags from /proc/cpuinfo, and find the highest
+#      level that the host supports
+#   2. read the host OS from /etc/os-release, and find the package
+#      format from the host's package tool
+#   3. find the package files for the package, OS and format in the dir
+#   4. print the path of the newest file for the highest level that
+#      the host supports
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+from optparse import OptionParser
+
+# x86-64 micro-architecture levels, lowest first, with the cpuinfo
+# flags that each level adds to the previous level
+
+cpuLevels = ["x86-64", "x86-64-v2", "x86-64-v3"]
+cpuLevelFlags = {
+    "x86-64": [],
+    "x86-64-v2": ["cx16", "lahf_lm", "popcnt", "pni", "sse4_1", "sse4_2",
+                  "ssse3"],
+    "x86-64-v3": ["avx", "avx2", "bmi1", "bmi2", "f16c", "fma", "abm",
+                  "movbe", "xsave"]
+}
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options]"
+    parser = OptionParser(usage)
+    parser.add_option('--debug',
+                      dest='debug', default=False,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--dir',
+                      dest='dir', default='.',
+                      help='Dir with the package files, default: .')
+    parser.add_option('--package',
+                      dest='package', default='lrose-core',
+                      help='Package name, default: lrose-core')
+    parser.add_option('--osFile',
+                      dest='osFile', default='/etc/os-release',
+                      help='OS release file, default: /etc/os-release')
+    parser.add_option('--printLevel',
+                      dest='printLevel', default=False,
+                      action="store_true",
+                      help='Print the level supported by the host, ' + \
+                      'and exit')
+
+    (options, args) = parser.parse_args()
+
+    # find the host level
+
+    hostLevel = getHostLevel()
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  dir: ", options.dir, file=sys.stderr)
+        print("  package: ", options.package, file=sys.stderr)
+        print("  hostLevel: ", hostLevel, file=sys.stderr)
+
+    if (options.printLevel):
+        print(hostLevel)
+        sys.exit(0)
+
+    # find the host OS and package format
+
+    osTags = getHostOsTags()
+    pkgExt = getPackageExt()
+
+    if (options.debug):
+        print("  osTags: ", " ".join(osTags), file=sys.stderr)
+        print("  pkgExt: ", pkgExt, file=sys.stderr)
+
+    if (len(osTags) == 0):
+        print("ERROR - cannot find the host OS in: " + options.osFile,
+              file=sys.stderr)
+        sys.exit(1)
+    if (len(pkgExt) == 0):
+        print("ERROR - cannot find dpkg or rpm on the host",
+              file=sys.stderr)
+        sys.exit(1)
+
+    # find the best package file
+
+    pkgPath = selectVariant(hostLevel, osTags, pkgExt)
+    if (len(pkgPath) == 0):
+        print("ERROR - no package file for host OS: " + osTags[0] +
+              ", level: " + hostLevel, file=sys.stderr)
+        print("  dir: " + options.dir, file=sys.stderr)
+        print("  package: " + options.package + pkgExt, file=sys.stderr)
+        sys.exit(1)
+
+    print(pkgPath)
+    sys.exit(0)
+
+########################################################################
+# get the highest level supported by the host CPU
+# a host that is not x86_64, or with no cpuinfo, gets the baseline
+
+def getHostLevel():
+
+    if (os.uname()[4] != "x86_64"):
+        return cpuLevels[0]
+
+    hostFlags = set()
+    try:
+        fp = open("/proc/cpuinfo", "r")
+        for line in fp.readlines():
+            if (line.startswith("flags")):
+                hostFlags = set(line.split(":", 1)[1].split())
+                break
+        fp.close()
+    except IOError as e:
+        print("WARNING - cannot read /proc/cpuinfo, using baseline",
+              file=sys.stderr)
+
+    hostLevel = cpuLevels[0]
+    for level in cpuLevels:
+        for flag in cpuLevelFlags[level]:
+            if (flag not in hostFlags):
+                if (options.debug):
+                    print("  host does not support " + level +
+                          ", missing flag: " + flag, file=sys.stderr)
+                return hostLevel
+        hostLevel = level
+
+    return hostLevel
+
+########################################################################
+# get the level of a package file, from its name
+# the level is written with underscores, e.g. x86_64_v3
+
+def getFileLevel(fileName):
+
+    for level in reversed(cpuLevels[1:]):
+        if (fileName.find("." + level.replace("-", "_") + ".") >= 0):
+            return level
+    return cpuLevels[0]
+
+########################################################################
+# get the OS tags for the host, as used in the package file names,
+# e.g. ubuntu_22.04, centos_8 or oraclelinux_8
+# the first tag is the most specific
+# returns an empty list if the OS is not known
+
+def getHostOsTags():
+
+    osInfo = {}
+    try:
+        fp = open(options.osFile, "r")
+        for line in fp.readlines():
+            if (line.find("=") < 0):
+                continue
+            (key, value) = line.strip().split("=", 1)
+            osInfo[key] = value.strip('"').strip("'")
+        fp.close()
+    except IOError as e:
+        return []
+
+    osId = osInfo.get("ID", "")
+    osVersion = osInfo.get("VERSION_ID", "")
+    if (len(osId) == 0):
+        return []
+
+    # the suse packages are named for the release, not the version
+
+    if (osId == "opensuse-leap"):
+        return ["opensuse_leap"]
+    if (osId == "opensuse-tumbleweed"):
+        return ["opensuse_latest"]
+    if (osId == "ol"):
+        osId = "oraclelinux"
+
+    # the redhat family is built for the major version only
+
+    osTags = [osId + "_" + osVersion]
+    majorVersion = osVersion.split(".")[0]
+    if (majorVersion != osVersion):
+        osTags.append(osId + "_" + majorVersion)
+    return osTags
+
+########################################################################
+# get the package file extension for the host, from its package tool
+# returns empty string if there is none
+
+def getPackageExt():
+
+    for (tool, ext) in [("dpkg", ".deb"), ("rpm", ".rpm")]:
+        for pathDir in os.environ.get('PATH', '').split(os.pathsep):
+            if (os.access(os.path.join(pathDir, tool), os.X_OK)):
+                return ext
+    return ""
+
+########################################################################
+# check if a package file name is for one of the OS tags
+# the tag follows the version, and is followed by the level or arch
+
+def matchesOs(fileName, osTags):
+
+    for osTag in osTags:
+        if (fileName.find("." + osTag + ".") >= 0 or
+            fileName.find("-" + osTag + ".") >= 0):
+            return True
+    return False
+
+########################################################################
+# select the package file for the highest level the host supports,
+# for the host OS and package format. Of the files for that level,
+# the newest version is taken.
+# returns the path, or empty string if there is none
+
+def selectVariant(hostLevel, osTags, pkgExt):
+
+    hostIndex = cpuLevels.index(hostLevel)
+
+    bestPath = ""
+    bestRank = None
+    for fileName in sorted(os.listdir(options.dir)):
+        if (fileName.endswith(pkgExt) == False):
+            continue
+        # the name is followed by the version, so that
+        # lrose-core does not match lrose-core-devel
+        rest = fileName[len(options.package):]
+        if (fileName.startswith(options.package) == False or
+            len(rest) < 2 or rest[0] != '-' or rest[1].isdigit() == False):
+            continue
+        if (matchesOs(fileName, osTags) == False):
+            if (options.debug):
+                print("  skipping, other OS: " + fileName, file=sys.stderr)
+            continue
+        version = ""
+        for ch in rest[1:]:
+            if (ch.isdigit() == False):
+                break
+            version = version + ch
+        index = cpuLevels.index(getFileLevel(fileName))
+        if (options.debug):
+            print("  found: " + fileName + ", level: " + cpuLevels[index] +
+                  ", version: " + version, file=sys.stderr)
+        rank = (index, int(version))
+        if (index <= hostIndex and (bestRank is None or rank >= bestRank)):
+            bestPath = os.path.join(options.dir, fileName)
+            bestRank = rank
+
+    return bestPath
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Split an installed LROSE tree into subpackages.
+#
+# The subpackages are listed in lrose_subpackages.cfg. Each file in
+# the tree is assigned to the first subpackage that matches it, either
+# by a glob pattern on the path, or by the shared libraries that it
+# needs (e.g. the Qt apps go into the display subpackage).
+#
+# The following files are written to the output dir:
+#
+#   subpackages:    the non-empty subpackages, one per line
+#   <sub>.files:    file list for the subpackage
+#                   deb: paths relative to /, including the dirs
+#                   rpm: absolute paths, with %dir for the dirs
+#   <sub>.depends:  Depends line (deb) or Requires lines (rpm),
+#                   for the OS packages found by find_runtime_deps.py
+#                   and the other subpackages that it requires
+#   <sub>.summary:  one line description
+#   meta.depends:   dependencies of the metapackage on the subpackages
+#
+# The packaging scripts use these to create the .deb files, or the
+# subpackage sections of the rpm spec file.
+#
+# With --fileList, only the listed files in the tree are packaged.
+# This is used for the subset packages, such as lrose-radx, which are
+# made from the lrose-core build. With --noSplit, all of the files go
+# into a single subpackage named 'all', and there is no metapackage.
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import subprocess
+import fnmatch
+from optparse import OptionParser
+
+try:
+    from configparser import ConfigParser
+except ImportError:
+    from ConfigParser import ConfigParser
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global thisScriptDir
+    thisScriptDir = os.path.dirname(os.path.abspath(__file__))
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options]"
+    dirDefault = '/usr/local/lrose'
+    configDefault = os.path.join(thisScriptDir, 'lrose_subpackages.cfg')
+    outputDirDefault = '/tmp/lrose_subpackages'
+    parser = OptionParser(usage)
+    parser.add_option('--debug',
+                      dest='debug', default=False,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--verbose',
+                      dest='verbose', default=False,
+                      action="store_true",
+                      help='Set verbose debugging on')
+    parser.add_option('--dir',
+                      dest='dir', default=dirDefault,
+                      help='Installed tree to split, default: ' + dirDefault)
+    parser.add_option('--package',
+                      dest='package', default='lrose-core',
+                      help='Name of the package being split, ' + \
+                      'default: lrose-core')
+    parser.add_option('--version',
+                      dest='version', default='',
+                      help='Package version, for the deb dependencies ' + \
+                      'between the subpackages')
+    parser.add_option('--format',
+                      dest='format', default='deb',
+                      help='Output format: deb or rpm, default: deb')
+    parser.add_option('--config',
+                      dest='config', default=configDefault,
+                      help='Subpackage config file, default: ' + \
+                      configDefault)
+    parser.add_option('--fileList',
+                      dest='fileList', default='',
+                      help='File with the list of paths to package, ' + \
+                      'relative to the dir, one per line. ' + \
+                      'Default: all files in the dir')
+    parser.add_option('--noSplit',
+                      dest='noSplit', default=False,
+                      action="store_true",
+                      help='Put all of the files in a single ' + \
+                      'subpackage named all, with no metapackage')
+    parser.add_option('--outputDir',
+                      dest='outputDir', default=outputDirDefault,
+                      help='Dir for the output files, default: ' + \
+                      outputDirDefault)
+
+    (options, args) = parser.parse_args()
+
+    if (options.verbose):
+        options.debug = True
+
+    if (options.format != "deb" and options.format != "rpm"):
+        print("ERROR - invalid format: ", options.format, file=sys.stderr)
+        print("  options: deb, rpm", file=sys.stderr)
+        sys.exit(1)
+
+    options.dir = os.path.normpath(options.dir)
+    if (os.path.isdir(options.dir) == False):
+        print("ERROR - dir does not exist: ", options.dir, file=sys.stderr)
+        sys.exit(1)
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  dir: ", options.dir, file=sys.stderr)
+        print("  package: ", options.package, file=sys.stderr)
+        print("  version: ", options.version, file=sys.stderr)
+        print("  format: ", options.format, file=sys.stderr)
+        print("  config: ", options.config, file=sys.stderr)
+        print("  fileList: ", options.fileList, file=sys.stderr)
+        print("  noSplit: ", options.noSplit, file=sys.stderr)
+        print("  outputDir: ", options.outputDir, file=sys.stderr)
+
+    # read the config
+
+    if (options.noSplit):
+        subpackages = [{ "name": "all",
+                         "summary": "all files in " + options.package,
+                         "patterns": ["*"],
+                         "linkedWith": [],
+                         "requires": [],
+                         "files": [] }]
+    else:
+        subpackages = readConfig(options.config)
+
+    # assign the files in the tree to the subpackages
+
+    assignFiles(subpackages)
+
+    # write the output files
+
+    if (os.path.isdir(options.outputDir) == False):
+        os.makedirs(options.outputDir)
+
+    writeOutput(subpackages)
+
+    sys.exit(0)
+
+########################################################################
+# read the subpackage config
+# returns the list of subpackages, in order of precedence
+
+def readConfig(configPath):
+
+    config = ConfigParser()
+    if (len(config.read(configPath)) == 0):
+        print("ERROR - cannot read config: ", configPath, file=sys.stderr)
+        sys.exit(1)
+
+    subpackages = []
+    for name in config.get("subpackages", "order").split():
+        if (config.has_section(name) == False):
+            print("ERROR - no section for subpackage: ", name, file=sys.stderr)
+            sys.exit(1)
+        sub = {}
+        sub["name"] = name
+        sub["summary"] = getConfigValue(config, name, "summary")
+        sub["patterns"] = getConfigValue(config, name, "files").split()
+        sub["linkedWith"] = getConfigValue(config, name, "linkedWith").split()
+        sub["requires"] = getConfigValue(config, name, "requires").split()
+        sub["files"] = []
+        subpackages.append(sub)
+
+    return subpackages
+
+########################################################################
+# get a value from the config, empty if not set
+
+def getConfigValue(config, section, key):
+
+    if (config.has_option(section, key)):
+        return " ".join(config.get(section, key).split())
+    return ""
+
+########################################################################
+# assign each file in the tree to the first subpackage that matches it
+# symlinks to dirs are treated as files
+
+def assignFiles(subpackages):
+
+    fileSet = None
+    if (len(options.fileList) > 0):
+        fileSet = readFileList(options.fileList)
+
+    relPaths = []
+    for (dirPath, dirNames, fileNames) in os.walk(options.dir):
+        for dirName in dirNames:
+            if (os.path.islink(os.path.join(dirPath, dirName))):
+                fileNames.append(dirName)
+        for fileName in fileNames:
+            filePath = os.path.join(dirPath, fileName)
+            relPath = os.path.relpath(filePath, options.dir)
+            if (fileSet != None and relPath not in fileSet):
+                continue
+            relPaths.append(relPath)
+
+    neededByPath = getNeededLibs(relPaths)
+
+    for relPath in sorted(relPaths):
+        sub = findSubpackage(subpackages, relPath,
+                             neededByPath.get(relPath, []))
+        if (sub == None):
+            print("ERROR - file not in any subpackage: ", relPath,
+                  file=sys.stderr)
+            print("  add a pattern for it to: ", options.config,
+                  file=sys.stderr)
+            sys.exit(1)
+        sub["files"].append(relPath)
+
+    if (options.debug):
+        for sub in subpackages:
+            print("  subpackage %s: %d files" %
+                  (sub["name"], len(sub["files"])), file=sys.stderr)
+
+########################################################################
+# read the list of files to package
+# returns the set of paths, relative to the dir
+
+def readFileList(listPath):
+
+    try:
+        fp = open(listPath, "r")
+    except IOError as e:
+        print("ERROR - cannot open file list: ", listPath, file=sys.stderr)
+        sys.exit(1)
+
+    fileSet = set()
+    for line in fp.readlines():
+        line = line.strip()
+        if (len(line) == 0):
+            continue
+        if (os.path.isabs(line)):
+            line = os.path.relpath(line, options.dir)
+        fileSet.add(os.path.normpath(line))
+    fp.close()
+
+    if (options.debug):
+        print("  n files in list: ", len(fileSet), file=sys.stderr)
+
+    return fileSet
+
+########################################################################
+# find the subpackage for a file
+
+def findSubpackage(subpackages, relPath, neededLibs):
+
+    for sub in subpackages:
+        for pattern in sub["patterns"]:
+            if (fnmatch.fnmatch(relPath, pattern)):
+                return sub
+        for pattern in sub["linkedWith"]:
+            for libName in neededLibs:
+                if (fnmatch.fnmatch(libName, pattern)):
+                    return sub
+
+    return None
+
+########################################################################
+# get the libraries needed by the executables in the tree
+# returns a dict of the needed libs, keyed on the relative path
+
+def getNeededLibs(relPaths):
+
+    exePaths = []
+    for relPath in relPaths:
+        filePath = os.path.join(options.dir, relPath)
+        if (os.path.islink(filePath) or
+            os.path.isfile(filePath) == False or
+            os.access(filePath, os.X_OK) == False):
+            continue
+        fp = open(filePath, "rb")
+        magic = fp.read(4)
+        fp.close()
+        if (magic == b'\x7fELF'):
+            exePaths.append(filePath)
+
+    neededByPath = {}
+    batchSize = 200
+    for start in range(0, len(exePaths), batchSize):
+
+        batch = exePaths[start:start + batchSize]
+        cmd = ["readelf", "-d", "-W"] + batch
+        output = runCmdOutput(cmd)
+
+        # with several files, readelf starts each with a 'File:' line
+
+        relPath = os.path.relpath(batch[0], options.dir)
+        for line in output.splitlines():
+            if (line.startswith("File: ")):
+                relPath = os.path.relpath(line[len("File: "):].strip(),
+                                          options.dir)
+            elif (line.find("(NEEDED)") >= 0):
+                libStart = line.find("[")
+                libEnd = line.find("]")
+                if (libStart > 0 and libEnd > libStart):
+                    neededByPath.setdefault(relPath, []).append(
+                        line[libStart + 1:libEnd])
+
+    return neededByPath
+
+########################################################################
+# write the output files for the subpackages
+
+def writeOutput(subpackages):
+
+    nonEmpty = []
+    for sub in subpackages:
+        if (len(sub["files"]) > 0):
+            nonEmpty.append(sub["name"])
+
+    writeLines("subpackages", nonEmpty)
+
+    for sub in subpackages:
+
+        if (sub["name"] not in nonEmpty):
+            continue
+
+        # file list, with the parent dirs
+
+        dirs = set()
+        for relPath in sub["files"]:
+            parent = os.path.dirname(relPath)
+            while (len(parent) > 0):
+                dirs.add(parent)
+                parent = os.path.dirname(parent)
+
+        listLines = []
+        if (options.format == "deb"):
+            listLines.append("." + options.dir)
+            for relPath in sorted(dirs) + sub["files"]:
+                listLines.append("." + os.path.join(options.dir, relPath))
+        else:
+            listLines.append("%dir " + options.dir)
+            for relPath in sorted(dirs):
+                listLines.append("%dir " + os.path.join(options.dir, relPath))
+            for relPath in sub["files"]:
+                listLines.append(os.path.join(options.dir, relPath))
+
+        listName = sub["name"] + ".files"
+        writeLines(listName, listLines)
+
+        # dependencies on OS packages, and on the other subpackages
+
+        depends = getRuntimeDeps(os.path.join(options.outputDir, listName))
+        for required in sub["requires"]:
+            if (required in nonEmpty):
+                depends.append(getSubpackageDep(required))
+
+        writeLines(sub["name"] + ".depends", formatDepends(depends))
+        writeLines(sub["name"] + ".summary", [sub["summary"]])
+
+    # the metapackage depends on all of the subpackages
+
+    if (options.noSplit):
+        return
+
+    metaDepends = []
+    for name in nonEmpty:
+        metaDepends.append(getSubpackageDep(name))
+    writeLines("meta.depends", formatDepends(metaDepends))
+
+########################################################################
+# get the OS package dependencies for a file list,
+# using find_runtime_deps.py
+
+def getRuntimeDeps(listPath):
+
+    cmd = [sys.executable,
+           os.path.join(thisScriptDir, "find_runtime_deps.py"),
+           "--dir", options.dir,
+           "--format", options.format,
+           "--fileList", listPath]
+    output = runCmdOutput(cmd)
+
+    depends = []
+    for line in output.splitlines():
+        if (line.startswith("Depends: ")):
+            depends = depends + line[len("Depends: "):].split(", ")
+        elif (line.startswith("Requires: ")):
+            depends.append(line[len("Requires: "):])
+
+    return depends
+
+########################################################################
+# get the dependency on another subpackage
+# the versions must match exactly
+
+def getSubpackageDep(name):
+
+    if (options.format == "deb"):
+        return options.package + "-" + name + " (= " + options.version + ")"
+    else:
+        return options.package + "-" + name + " = %{version}-%{release}"
+
+########################################################################
+# format the dependencies as a Depends line or Requires lines
+
+def formatDepends(depends):
+
+    if (len(depends) == 0):
+        return []
+    if (options.format == "deb"):
+        return ["Depends: " + ", ".join(depends)]
+    return ["Requires: " + dep for dep in depends]
+
+########################################################################
+# write lines to a file in the output dir
+
+def writeLines(fileName, lines):
+
+    outPath = os.path.join(options.outputDir, fileName)
+    fp = open(outPath, "w")
+    for line in lines:
+        fp.write(line + "\n")
+    fp.close()
+
+    if (options.verbose):
+        print("  wrote: ", outPath, file=sys.stderr)
+
+########################################################################
+# Run a command, and return its stdout
+
+def runCmdOutput(cmd):
+
+    if (options.verbose):
+        print("running cmd:", " ".join(cmd[0:4]), "...", file=sys.stderr)
+
+    try:
+        pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        output = pipe.communicate()[0]
+    except OSError as e:
+        print("Execution failed:", e, file=sys.stderr)
+        sys.exit(1)
+
+    if (pipe.returncode != 0):
+        print("ERROR - command failed: ", " ".join(cmd[0:4]), file=sys.stderr)
+        sys.exit(1)
+
+    return output.decode('utf-8', 'replace')
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Run tdrp_gen, caching the generated parameter sources.
+#
+# Each app with a paramdef file has its Params.cc and Params.hh created
+# by tdrp_gen during the build. Rewriting those files changes their
+# timestamps, so make recompiles the app, even if the code is the same.
+#
+# This script is used in place of tdrp_gen:
+#
+#   tdrp_gen_cache.py [options] -- tdrp_gen args ...
+#
+# It performs the following steps:
+#
+#   1. compute a key from the paramdef file, the tdrp_gen args and
+#      the tdrp_gen executable
+#   2. if the key is in the cache, use the cached sources. Otherwise
+#      run tdrp_gen in a scratch dir, and add its sources to the cache.
+#   3. copy the sources into the current dir. A file that already has
+#      the same contents is left alone, so its timestamp does not change.
+#
+# If the paramdef file cannot be found from the args, tdrp_gen is
+# run directly, without the cache.
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from optparse import OptionParser
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options] -- [tdrp_gen args]"
+    parser = OptionParser(usage)
+    parser.disable_interspersed_args()
+    parser.add_option('--debug',
+                      dest='debug', default=False,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--cacheDir',
+                      dest='cacheDir', default='',
+                      help='Dir for the cached sources. Kept across builds.')
+    parser.add_option('--tdrpGen',
+                      dest='tdrpGen', default='tdrp_gen',
+                      help='Path of tdrp_gen, default: tdrp_gen')
+
+    (options, args) = parser.parse_args()
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  cacheDir: ", options.cacheDir, file=sys.stderr)
+        print("  tdrpGen: ", options.tdrpGen, file=sys.stderr)
+        print("  args: ", " ".join(args), file=sys.stderr)
+
+    # without the paramdef file name, the output cannot be cached
+
+    paramdefName = getParamdefName(args)
+    if (len(options.cacheDir) == 0 or len(paramdefName) == 0):
+        sys.exit(subprocess.call([options.tdrpGen] + args))
+
+    # use the cached sources, or generate them
+
+    key = getCacheKey(paramdefName, args)
+    entryDir = os.path.join(options.cacheDir, key[:2], key)
+    if (os.path.isdir(entryDir)):
+        if (options.debug):
+            print("  cache hit: " + entryDir, file=sys.stderr)
+    else:
+        if (options.debug):
+            print("  cache miss: " + entryDir, file=sys.stderr)
+        retcode = generateSources(paramdefName, args, entryDir)
+        if (retcode != 0):
+            sys.exit(retcode)
+
+    # copy the changed sources into the current dir
+
+    for fileName in sorted(os.listdir(entryDir)):
+        updateFile(os.path.join(entryDir, fileName), fileName)
+
+    sys.exit(0)
+
+########################################################################
+# get the paramdef file name from the tdrp_gen args
+# returns empty string if there is none, or if it is not in the
+# current dir, since it is copied to the scratch dir by name
+
+def getParamdefName(args):
+
+    for ii in range(len(args) - 1):
+        if (args[ii] == "-f"):
+            name = args[ii + 1]
+            if (os.path.basename(name) == name and os.path.isfile(name)):
+                return name
+            return ""
+    return ""
+
+########################################################################
+# compute the cache key
+# The tdrp_gen executable is part of the key, so that the sources are
+# generated again when tdrp_gen changes. With a reproducible build,
+# tdrp_gen only changes when its code does.
+
+def getCacheKey(paramdefName, args):
+
+    hasher = hashlib.sha256()
+    hasher.update(readBytes(findTdrpGen()))
+    hasher.update(b"\0")
+    hasher.update("\0".join(args).encode('utf-8'))
+    hasher.update(b"\0")
+    hasher.update(readBytes(paramdefName))
+    return hasher.hexdigest()
+
+########################################################################
+# run tdrp_gen in a scratch dir, and move its output into the cache
+# The entry is moved into place in one step, so that parallel builds
+# never see a partial entry.
+# returns the exit code of tdrp_gen
+
+def generateSources(paramdefName, args, entryDir):
+
+    scratchDir = tempfile.mkdtemp(prefix="tdrp_gen.")
+    try:
+        shutil.copyfile(paramdefName, os.path.join(scratchDir, paramdefName))
+        retcode = subprocess.call([findTdrpGen()] + args, cwd=scratchDir)
+        if (retcode != 0):
+            return retcode
+        os.remove(os.path.join(scratchDir, paramdefName))
+        parentDir = os.path.dirname(entryDir)
+        if (os.path.isdir(parentDir) == False):
+            try:
+                os.makedirs(parentDir)
+            except OSError:
+                pass
+        try:
+            os.rename(scratchDir, entryDir)
+        except OSError:
+            # another build added the entry first
+            if (os.path.isdir(entryDir) == False):
+                raise
+        return 0
+    finally:
+        if (os.path.isdir(scratchDir)):
+            shutil.rmtree(scratchDir)
+
+########################################################################
+# copy a file, unless the destination already has the same contents
+
+def updateFile(srcPath, destPath):
+
+    if (os.path.isfile(destPath) and
+        readBytes(destPath) == readBytes(srcPath)):
+        if (options.debug):
+            print("  unchanged: " + destPath, file=sys.stderr)
+        return
+
+    tmpPath = destPath + ".tmp." + str(os.getpid())
+    shutil.copyfile(srcPath, tmpPath)
+    os.rename(tmpPath, destPath)
+    if (options.debug):
+        print("  updated: " + destPath, file=sys.stderr)
+
+########################################################################
+# find the path of the tdrp_gen executable
+
+def findTdrpGen():
+
+    if (os.path.dirname(options.tdrpGen) != ""):
+        return os.path.abspath(options.tdrpGen)
+    for pathDir in os.environ.get('PATH', '').split(os.pathsep):
+        exePath = os.path.join(pathDir, options.tdrpGen)
+        if (os.path.isfile(exePath) and os.access(exePath, os.X_OK)):
+            return exePath
+    print("ERROR - cannot find tdrp_gen: " + options.tdrpGen,
+          file=sys.stderr)
+    sys.exit(1)
+
+########################################################################
+# read the contents of a file
+
+def readBytes(path):
+
+    fp = open(path, "rb")
+    contents = fp.read()
+    fp.close()
+    return contents
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()
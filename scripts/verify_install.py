@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+
+#===========================================================================
+#
+# Verify an installed LROSE tree, by running the apps.
+#
+# This script performs the following steps, for each ELF binary in
+# the bin dir:
+#
+#   1. resolve the shared libraries, using ldd, to find any that
+#      are missing
+#   2. run the app with -h, under a timeout, and time how long it
+#      takes to start up and exit
+#
+# The apps are checked in parallel, using a pool of threads.
+#
+# A table of the pass/fail status and the startup time for each app
+# is written at the end. If a baseline table from an earlier run is
+# given, apps that start up much more slowly than before are flagged.
+#
+# The exit code is 1 if any app fails.
+#
+# Use --help to see the command line options.
+#
+#===========================================================================
+
+from __future__ import print_function
+import os
+import sys
+import subprocess
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from optparse import OptionParser
+
+def main():
+
+    # globals
+
+    global thisScriptName
+    thisScriptName = os.path.basename(__file__)
+
+    global options
+
+    # parse the command line
+
+    usage = "usage: " + thisScriptName + " [options]"
+    prefixDefault = '/usr/local/lrose'
+    parser = OptionParser(usage)
+    parser.add_option('--debug',
+                      dest='debug', default=False,
+                      action="store_true",
+                      help='Set debugging on')
+    parser.add_option('--verbose',
+                      dest='verbose', default=False,
+                      action="store_true",
+                      help='Set verbose debugging on')
+    parser.add_option('--prefix',
+                      dest='prefix', default=prefixDefault,
+                      help='Install prefix, default: ' + prefixDefault)
+    parser.add_option('--binDir',
+                      dest='binDir', default='',
+                      help='Dir with the apps to check. ' + \
+                      'Default: bin under the prefix')
+    parser.add_option('--testArgs',
+                      dest='testArgs', default='-h',
+                      help='Args for running each app, default: -h. ' + \
+                      'Use -print_params to check the TDRP params as well.')
+    parser.add_option('--timeout',
+                      dest='timeout', default=10.0, type='float',
+                      help='Timeout for each app, in secs, default: 10')
+    parser.add_option('--nThreads',
+                      dest='nThreads', default=0, type='int',
+                      help='Number of apps to run at once. ' + \
+                      'Default: the number of CPUs')
+    parser.add_option('--baselinePath',
+                      dest='baselinePath', default='',
+                      help='Report from an earlier run. Apps that start ' + \
+                      'up more slowly than in the baseline are flagged.')
+    parser.add_option('--slowFactor',
+                      dest='slowFactor', default=2.0, type='float',
+                      help='Flag an app as SLOW if its startup time ' + \
+                      'exceeds the baseline by this factor, default: 2.0')
+    parser.add_option('--reportPath',
+                      dest='reportPath', default='',
+                      help='Path for the report file. Default: stdout only')
+
+    (options, args) = parser.parse_args()
+
+    if (options.verbose):
+        options.debug = True
+
+    if (len(options.binDir) == 0):
+        options.binDir = os.path.join(options.prefix, "bin")
+
+    if (options.nThreads < 1):
+        options.nThreads = getCpuCount()
+
+    if (os.path.isdir(options.binDir) == False):
+        print("ERROR - bin dir does not exist: ", options.binDir,
+              file=sys.stderr)
+        sys.exit(1)
+
+    if (options.debug):
+        print("Running %s:" % thisScriptName, file=sys.stderr)
+        print("  prefix: ", options.prefix, file=sys.stderr)
+        print("  binDir: ", options.binDir, file=sys.stderr)
+        print("  testArgs: ", options.testArgs, file=sys.stderr)
+        print("  timeout: ", options.timeout, file=sys.stderr)
+        print("  nThreads: ", options.nThreads, file=sys.stderr)
+        print("  baselinePath: ", options.baselinePath, file=sys.stderr)
+        print("  slowFactor: ", options.slowFactor, file=sys.stderr)
+        print("  reportPath: ", options.reportPath, file=sys.stderr)
+
+    # find the apps
+
+    appPaths = findApps(options.binDir)
+    if (len(appPaths) == 0):
+        print("ERROR - no apps found in: ", options.binDir, file=sys.stderr)
+        sys.exit(1)
+
+    # check the apps in parallel
+
+    startTime = time.time()
+    pool = ThreadPool(options.nThreads)
+    results = pool.map(checkApp, appPaths)
+    pool.close()
+    pool.join()
+    elapsedSecs = time.time() - startTime
+
+    # compare with the baseline
+
+    if (len(options.baselinePath) > 0):
+        checkBaseline(results, readBaseline(options.baselinePath))
+
+    # write the report
+
+    nFailed = writeReport(results, elapsedSecs)
+
+    if (nFailed > 0):
+        sys.exit(1)
+    sys.exit(0)
+
+########################################################################
+# find the ELF executables in the bin dir
+# the runtime libs dirs are not searched
+
+def findApps(binDir):
+
+    appPaths = []
+    for fileName in sorted(os.listdir(binDir)):
+        filePath = os.path.join(binDir, fileName)
+        if (os.path.isfile(filePath) == False or
+            os.access(filePath, os.X_OK) == False):
+            continue
+        try:
+            fp = open(filePath, "rb")
+            magic = fp.read(4)
+            fp.close()
+        except IOError:
+            continue
+        if (magic == b'\x7fELF'):
+            appPaths.append(filePath)
+
+    if (options.debug):
+        print("  n apps: ", len(appPaths), file=sys.stderr)
+
+    return appPaths
+
+########################################################################
+# check an app - runs in a pool thread
+#
+# Returns a dict with the name, status, startup secs and details.
+# The status is one of:
+#   ok       - ran and exited
+#   NOLIBS   - shared libraries are missing
+#   TIMEOUT  - did not exit before the timeout
+#   CRASHED  - killed by a signal
+#   FAILED   - could not be run
+
+def checkApp(appPath):
+
+    result = {}
+    result["name"] = os.path.basename(appPath)
+    result["secs"] = 0.0
+    result["detail"] = ""
+
+    # check for missing shared libraries
+
+    missing = getMissingLibs(appPath)
+    if (len(missing) > 0):
+        result["status"] = "NOLIBS"
+        result["detail"] = " ".join(missing)
+        return result
+
+    # run the app, with no display and no input
+    # the Qt apps use the offscreen platform
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    env.pop("DISPLAY", None)
+
+    cmd = [appPath] + options.testArgs.split()
+
+    startTime = time.time()
+    try:
+        devNull = open(os.devnull, "r")
+        pipe = subprocess.Popen(cmd, env=env, stdin=devNull,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+    except OSError as e:
+        result["status"] = "FAILED"
+        result["detail"] = str(e)
+        return result
+
+    # kill the app if it does not exit in time
+
+    timedOut = []
+    def killApp():
+        timedOut.append(True)
+        pipe.kill()
+    timer = threading.Timer(options.timeout, killApp)
+    timer.start()
+    try:
+        output = pipe.communicate()[0]
+    finally:
+        timer.cancel()
+        devNull.close()
+
+    result["secs"] = time.time() - startTime
+    output = output.decode('utf-8', 'replace')
+
+    if (len(timedOut) > 0):
+        result["status"] = "TIMEOUT"
+        result["detail"] = "killed after %g secs" % options.timeout
+    elif (output.find("error while loading shared libraries") >= 0):
+        result["status"] = "NOLIBS"
+        result["detail"] = getFirstLine(output, "error while loading")
+    elif (pipe.returncode < 0):
+        result["status"] = "CRASHED"
+        result["detail"] = "signal " + str(-pipe.returncode)
+    else:
+        result["status"] = "ok"
+        result["detail"] = "exit " + str(pipe.returncode)
+
+    if (options.verbose):
+        print("  checked: " + result["name"] + " " + result["status"],
+              file=sys.stderr)
+
+    return result
+
+########################################################################
+# get the shared libraries that ldd cannot find
+
+def getMissingLibs(appPath):
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+    try:
+        pipe = subprocess.Popen(["ldd", appPath], env=env,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        output = pipe.communicate()[0].decode('utf-8', 'replace')
+    except OSError as e:
+        return []
+
+    missing = []
+    for line in output.splitlines():
+        if (line.find("not found") >= 0):
+            missing.append(line.split("=>")[0].strip())
+
+    return missing
+
+########################################################################
+# get the first line of the output containing the key
+
+def getFirstLine(output, key):
+
+    for line in output.splitlines():
+        if (line.find(key) >= 0):
+            return line.strip()
+    return ""
+
+########################################################################
+# read the startup times from an earlier report
+# returns a dict of secs, keyed on the app name
+
+def readBaseline(baselinePath):
+
+    baseline = {}
+    try:
+        fp = open(baselinePath, "r")
+    except IOError as e:
+        print("WARNING - cannot read baseline: ", baselinePath,
+              file=sys.stderr)
+        return baseline
+
+    for line in fp.readlines():
+        toks = line.split()
+        if (len(toks) < 3 or toks[1] != "ok"):
+            continue
+        try:
+            baseline[toks[0]] = float(toks[2])
+        except ValueError:
+            continue
+    fp.close()
+
+    return baseline
+
+########################################################################
+# flag the apps that are slower than the baseline
+# very short times are not flagged, since they are mostly noise
+
+def checkBaseline(results, baseline):
+
+    minSecs = 0.05
+    for result in results:
+        if (result["status"] != "ok" or result["name"] not in baseline):
+            continue
+        baseSecs = baseline[result["name"]]
+        if (result["secs"] > minSecs and
+            result["secs"] > baseSecs * options.slowFactor):
+            result["status"] = "SLOW"
+            result["detail"] = "baseline %.3f secs" % baseSecs
+
+########################################################################
+# write the report, to stdout and to the report file
+# returns the number of failed apps
+
+def writeReport(results, elapsedSecs):
+
+    lines = []
+    lines.append("=" * 78)
+    lines.append("LROSE install verification")
+    lines.append("  bin dir: " + options.binDir)
+    lines.append("  test args: " + options.testArgs)
+    lines.append("  n threads: " + str(options.nThreads))
+    lines.append("  elapsed secs: %.2f" % elapsedSecs)
+    lines.append("=" * 78)
+    lines.append("%-30s %-8s %8s  %s" % ("app", "status", "secs", "detail"))
+    lines.append("-" * 78)
+
+    nFailed = 0
+    okSecs = []
+    for result in results:
+        lines.append("%-30s %-8s %8.3f  %s" %
+                     (result["name"], result["status"],
+                      result["secs"], result["detail"]))
+        if (result["status"] == "ok"):
+            okSecs.append(result["secs"])
+        else:
+            nFailed = nFailed + 1
+
+    lines.append("-" * 78)
+    lines.append("passed: " + str(len(results) - nFailed) +
+                 "  failed: " + str(nFailed))
+    if (len(okSecs) > 0):
+        okSecs.sort()
+        lines.append("startup secs: min %.3f  median %.3f  max %.3f" %
+                     (okSecs[0], okSecs[len(okSecs) // 2], okSecs[-1]))
+    lines.append("=" * 78)
+
+    report = "\n".join(lines) + "\n"
+    print(report)
+
+    if (len(options.reportPath) > 0):
+        try:
+            fp = open(options.reportPath, "w")
+            fp.write(report)
+            fp.close()
+            print("Report written to: " + options.reportPath, file=sys.stderr)
+        except IOError as e:
+            print("ERROR - cannot write report file: " + options.reportPath,
+                  file=sys.stderr)
+
+    return nFailed
+
+########################################################################
+# get the number of CPUs on the host
+
+def getCpuCount():
+
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+########################################################################
+# Run - entry point
+
+if __name__ == "__main__":
+    main()